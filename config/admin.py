@@ -20,6 +20,12 @@ class CustomAdminSite(admin.AdminSite):
         ]
         return urls
 
+    def index(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        if request.user.is_superuser:
+            extra_context['soft_cache_metrics'] = cache_manager.get_metrics()
+        return super().index(request, extra_context=extra_context)
+
     def invalidate_cache(self, request):
         cache_manager.invalidate()
         update_all_cached_values.delay()
@@ -207,6 +207,8 @@ STATICFILES_DIRS = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = root('media')
+# uploaded files urls in api are built from it instead of request host, so cached payloads don't depend on request
+SITE_URL = env('SITE_URL', default='')
 
 
 CELERY_ENABLED = env.bool('CELERY_ENABLED', default=True)
@@ -286,7 +288,45 @@ ADMIN_REORDER = (
     'dailycheckapp_contact',
 )
 
-RANDOM_SCHOOLS_DEFAULT_AMOUNT = env('RANDOM_SCHOOLS_DEFAULT_AMOUNT', default=20000)
+# Maintain country weekly counters from schools statuses deltas instead of full recalculation
+COUNTRY_STATISTICS_INCREMENTAL = env.bool('COUNTRY_STATISTICS_INCREMENTAL', default=False)
+# Countries with more schools are aggregated by parallel tasks, each one processing a range of schools
+AGGREGATION_SHARD_SIZE = env.int('AGGREGATION_SHARD_SIZE', default=50000)
+# Global statistics are recalculated this amount of seconds after countries data change, so changes are batched
+GLOBAL_STATISTICS_UPDATE_DELAY = env.int('GLOBAL_STATISTICS_UPDATE_DELAY', default=60)
+
+# Soft cached api responses are refreshed in background when outdated and removed when not requested for this time
+SOFT_CACHE_TTL = env.int('SOFT_CACHE_TTL', default=30 * 24 * 60 * 60)
+# Outdated value refresh is queued once per this time, lease is released earlier when value is updated
+SOFT_CACHE_REFRESH_LEASE_TIMEOUT = env.int('SOFT_CACHE_REFRESH_LEASE_TIMEOUT', default=10 * 60)
+# Missing value is calculated by single request; others wait for it up to SOFT_CACHE_LEADER_WAIT seconds,
+# zero disables waiting
+SOFT_CACHE_COMPUTE_LEASE_TIMEOUT = env.int('SOFT_CACHE_COMPUTE_LEASE_TIMEOUT', default=2 * 60)
+SOFT_CACHE_LEADER_WAIT = env.float('SOFT_CACHE_LEADER_WAIT', default=0)
+# Fresh soft cached values of hot endpoints can be kept in process memory in front of redis for up to
+# SOFT_CACHE_LOCAL_TTL seconds. Keys are matched by prefix, each prefix has own max value size in bytes;
+# SOFT_CACHE_LOCAL_MAX_SIZE limits total size of values kept by single process
+SOFT_CACHE_LOCAL_ENABLED = env.bool('SOFT_CACHE_LOCAL_ENABLED', default=False)
+SOFT_CACHE_LOCAL_TTL = env.int('SOFT_CACHE_LOCAL_TTL', default=60)
+SOFT_CACHE_LOCAL_MAX_SIZE = env.int('SOFT_CACHE_LOCAL_MAX_SIZE', default=64 * 1024 * 1024)
+SOFT_CACHE_LOCAL_KEYS = {
+    'GLOBAL_STATS': 64 * 1024,
+    'COUNTRIES_LIST_': 2 * 1024 * 1024,
+    'COUNTRY_BOUNDARY_': 32 * 1024 * 1024,
+    'RANDOM_SCHOOLS_': 8 * 1024 * 1024,
+}
+
+# Schools requested by map viewport are cached for this time, keys include country data version
+SCHOOLS_VIEWPORT_CACHE_TIMEOUT = env.int('SCHOOLS_VIEWPORT_CACHE_TIMEOUT', default=60 * 60)
+
+RANDOM_SCHOOLS_DEFAULT_AMOUNT = env.int('RANDOM_SCHOOLS_DEFAULT_AMOUNT', default=20000)
+RANDOM_SCHOOLS_MAX_AMOUNT = env.int('RANDOM_SCHOOLS_MAX_AMOUNT', default=100000)
+
+# Schools are exported by server side cursor, this amount of rows is fetched from database at once
+SCHOOLS_EXPORT_CHUNK_SIZE = env.int('SCHOOLS_EXPORT_CHUNK_SIZE', default=5000)
+
+# Imported files with at least this amount of valid rows are saved through staging table filled by COPY
+SCHOOLS_IMPORT_COPY_MIN_ROWS = env.int('SCHOOLS_IMPORT_COPY_MIN_ROWS', default=5000)
 
 CONTACT_MANAGERS = env.list('CONTACT_MANAGERS', default=['test@test.test'])
 DAILYCHECKAPP_CONTACT_MANAGERS = env.list('DAILYCHECKAPP_CONTACT_MANAGERS', default=['test@test.test'])
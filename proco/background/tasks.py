@@ -6,6 +6,7 @@ from celery import current_task
 
 from proco.background.models import BackgroundTask
 from proco.locations.models import Country
+from proco.schools.tasks import update_country_schools_map
 from proco.taskapp import app
 
 
@@ -20,6 +21,7 @@ def reset_countries_data(ids: List):
         task.info(f'{obj} started')
         obj._clear_data_country()
         obj.invalidate_country_related_cache()
+        update_country_schools_map.delay(obj.id)
         task.info(f'{obj} completed')
 
     task.status = BackgroundTask.STATUSES.completed
@@ -39,6 +41,7 @@ def validate_countries(ids: List):
         if not obj.last_weekly_status.is_verified:
             obj.last_weekly_status.update_country_status_to_joined()
             obj.invalidate_country_related_cache()
+            update_country_schools_map.delay(obj.id)
             task.info(f'{obj} completed')
         else:
             task.info(f'{obj} already verified')
@@ -1,8 +1,12 @@
 from django.contrib import admin
 
 from proco.connection_statistics.models import (
+    AggregationRun,
     CountryDailyStatus,
     CountryWeeklyStatus,
+    DataExport,
+    GlobalWeeklyStatus,
+    IngestionCheckpoint,
     RealTimeConnectivity,
     SchoolDailyStatus,
     SchoolWeeklyStatus,
@@ -111,3 +115,55 @@ class RealTimeConnectivityAdmin(admin.ModelAdmin):
 
     def has_view_permission(self, request, obj=None):
         return True
+
+
+@admin.register(AggregationRun)
+class AggregationRunAdmin(admin.ModelAdmin):
+    list_display = ('date', 'today', 'status', 'countries_scheduled', 'countries_skipped', 'shards',
+                    'created', 'completed_at')
+    list_filter = ('status', 'today')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(GlobalWeeklyStatus)
+class GlobalWeeklyStatusAdmin(admin.ModelAdmin):
+    list_display = ('year', 'week', 'schools_total', 'schools_mapped', 'schools_with_known_connectivity',
+                    'countries_joined', 'countries_connected_to_realtime', 'modified')
+    ordering = ('-year', '-week')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DataExport)
+class DataExportAdmin(CountryNameDisplayAdminMixin, admin.ModelAdmin):
+    list_display = ('get_country_name', 'dataset', 'file_format', 'date_from', 'date_to', 'is_snapshot', 'status',
+                    'rows_count', 'created', 'completed_at')
+    list_filter = ('status', 'dataset', 'file_format', 'is_snapshot', CountryFilterList)
+    list_select_related = ('country',)
+    readonly_fields = ('background_task', 'requested_by', 'rows_count', 'errors', 'completed_at')
+    raw_id_fields = ('country',)
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(IngestionCheckpoint)
+class IngestionCheckpointAdmin(admin.ModelAdmin):
+    # moving checkpoint back replays measurements after it, already stored ones are skipped
+    list_display = ('source', 'timestamp', 'last_id', 'modified')
+    readonly_fields = ('source',)
+    ordering = ('source',)
+
+    def has_add_permission(self, request):
+        return False
@@ -1,67 +1,117 @@
-from django.db.models import Count, Q
+from django.db.models import Avg, Count, Q
 
-from proco.connection_statistics.models import SchoolWeeklyStatus
+from proco.connection_statistics.models import CountryWeeklyStatus, CountryWeeklyStatusDelta, SchoolWeeklyStatus
 from proco.schools.constants import ColorMapSchema, statuses_schema
 
+CONNECTIVITY_BY_SPEED_FILTERS = {
+    ColorMapSchema.GOOD: Q(
+        connectivity_speed__gte=statuses_schema.CONNECTIVITY_SPEED_FOR_GOOD_CONNECTIVITY_STATUS,
+    ),
+    ColorMapSchema.MODERATE: Q(
+        connectivity_speed__gt=0,
+        connectivity_speed__lt=statuses_schema.CONNECTIVITY_SPEED_FOR_GOOD_CONNECTIVITY_STATUS,
+    ),
+    ColorMapSchema.NO: Q(connectivity_speed=0),
+    ColorMapSchema.UNKNOWN: Q(connectivity_speed__isnull=True),
+}
 
-def aggregate_connectivity_by_speed(qs):
-    return qs.aggregate(**{
-        ColorMapSchema.GOOD: Count('school', filter=Q(
-            connectivity_speed__gte=statuses_schema.CONNECTIVITY_SPEED_FOR_GOOD_CONNECTIVITY_STATUS,
-        )),
-        ColorMapSchema.MODERATE: Count('school', filter=Q(
-            connectivity_speed__gt=0,
-            connectivity_speed__lt=statuses_schema.CONNECTIVITY_SPEED_FOR_GOOD_CONNECTIVITY_STATUS,
-        )),
-        ColorMapSchema.NO: Count('school', filter=Q(connectivity_speed=0)),
-        ColorMapSchema.UNKNOWN: Count('school', filter=Q(connectivity_speed__isnull=True)),
-    })
-
-
-def aggregate_connectivity_by_availability(qs):
-    result = qs.aggregate(**{
-        ColorMapSchema.GOOD: Count('school', filter=Q(connectivity=True)),
-        ColorMapSchema.NO: Count('school', filter=Q(connectivity=False)),
-        ColorMapSchema.UNKNOWN: Count('school', filter=Q(connectivity__isnull=True)),
-    })
-    result[ColorMapSchema.MODERATE] = 0
-    return result
-
-
-def aggregate_coverage_by_types(qs):
-    return qs.aggregate(**{
-        ColorMapSchema.GOOD: Count('school', filter=Q(
-            coverage_type__in=[SchoolWeeklyStatus.COVERAGE_4G, SchoolWeeklyStatus.COVERAGE_3G],
-        )),
-        ColorMapSchema.MODERATE: Count('school', filter=Q(coverage_type=SchoolWeeklyStatus.COVERAGE_2G)),
-        ColorMapSchema.NO: Count('school', filter=Q(coverage_type=SchoolWeeklyStatus.COVERAGE_NO)),
-        ColorMapSchema.UNKNOWN: Count('school', filter=Q(coverage_type=SchoolWeeklyStatus.COVERAGE_UNKNOWN)),
-    })
-
-
-def aggregate_coverage_by_availability(qs):
-    result = qs.aggregate(**{
-        ColorMapSchema.GOOD: Count('school', filter=Q(coverage_availability=True)),
-        ColorMapSchema.NO: Count('school', filter=Q(coverage_availability=False)),
-        ColorMapSchema.UNKNOWN: Count('school', filter=Q(coverage_availability__isnull=True)),
-    })
-    result[ColorMapSchema.MODERATE] = 0
-    return result
-
-
-def aggregate_connectivity_default(qs):
+CONNECTIVITY_BY_AVAILABILITY_FILTERS = {
+    ColorMapSchema.GOOD: Q(connectivity=True),
+    ColorMapSchema.NO: Q(connectivity=False),
+    ColorMapSchema.UNKNOWN: Q(connectivity__isnull=True),
+}
+
+COVERAGE_BY_TYPES_FILTERS = {
+    ColorMapSchema.GOOD: Q(coverage_type__in=[SchoolWeeklyStatus.COVERAGE_4G, SchoolWeeklyStatus.COVERAGE_3G]),
+    ColorMapSchema.MODERATE: Q(coverage_type=SchoolWeeklyStatus.COVERAGE_2G),
+    ColorMapSchema.NO: Q(coverage_type=SchoolWeeklyStatus.COVERAGE_NO),
+    ColorMapSchema.UNKNOWN: Q(coverage_type=SchoolWeeklyStatus.COVERAGE_UNKNOWN),
+}
+
+COVERAGE_BY_AVAILABILITY_FILTERS = {
+    ColorMapSchema.GOOD: Q(coverage_availability=True),
+    ColorMapSchema.NO: Q(coverage_availability=False),
+    ColorMapSchema.UNKNOWN: Q(coverage_availability__isnull=True),
+}
+
+# flags used to understand which kind of data is available for country
+AVAILABILITY_FILTERS = {
+    'connectivity_speed': Q(connectivity_speed__gte=0),
+    'connectivity': Q(connectivity__isnull=False),
+    'coverage_type': ~Q(coverage_type=SchoolWeeklyStatus.COVERAGE_TYPES.unknown),
+    'coverage_availability': Q(coverage_availability__isnull=False),
+}
+
+# every school is unknown when country has no data
+UNKNOWN_FILTERS = {
+    ColorMapSchema.UNKNOWN: Q(id__isnull=False),
+}
+
+CONNECTIVITY_FILTERS_BY_AVAILABILITY = {
+    CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.realtime_speed: CONNECTIVITY_BY_SPEED_FILTERS,
+    CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.static_speed: CONNECTIVITY_BY_SPEED_FILTERS,
+    CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.connectivity: CONNECTIVITY_BY_AVAILABILITY_FILTERS,
+    CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.no_connectivity: UNKNOWN_FILTERS,
+}
+
+COVERAGE_FILTERS_BY_AVAILABILITY = {
+    CountryWeeklyStatus.COVERAGE_TYPES_AVAILABILITY.coverage_type: COVERAGE_BY_TYPES_FILTERS,
+    CountryWeeklyStatus.COVERAGE_TYPES_AVAILABILITY.coverage_availability: COVERAGE_BY_AVAILABILITY_FILTERS,
+    CountryWeeklyStatus.COVERAGE_TYPES_AVAILABILITY.no_coverage: UNKNOWN_FILTERS,
+}
+
+STATISTICS_FILTERS = {
+    'connectivity_by_speed': CONNECTIVITY_BY_SPEED_FILTERS,
+    'connectivity_by_availability': CONNECTIVITY_BY_AVAILABILITY_FILTERS,
+    'coverage_by_types': COVERAGE_BY_TYPES_FILTERS,
+    'coverage_by_availability': COVERAGE_BY_AVAILABILITY_FILTERS,
+}
+
+
+def get_default_statistics(total):
     return {
         ColorMapSchema.GOOD: 0,
         ColorMapSchema.MODERATE: 0,
         ColorMapSchema.NO: 0,
-        ColorMapSchema.UNKNOWN: qs.count(),
+        ColorMapSchema.UNKNOWN: total,
     }
 
 
-def aggregate_coverage_default(qs):
-    return {
-        ColorMapSchema.GOOD: 0,
-        ColorMapSchema.MODERATE: 0,
-        ColorMapSchema.NO: 0,
-        ColorMapSchema.UNKNOWN: qs.count(),
+def aggregate_country_statistics(qs):
+    # everything required for country pie charts in one scan over statuses
+    aggregates = {
+        'total': Count('*'),
+        'connectivity_speed': Avg('connectivity_speed', filter=Q(connectivity_speed__gt=0)),
+        'connectivity_latency': Avg('connectivity_latency', filter=Q(connectivity_latency__gt=0)),
     }
+    for name, availability_filter in AVAILABILITY_FILTERS.items():
+        aggregates[f'has_{name}'] = Count('school', filter=availability_filter)
+    for group, filters in STATISTICS_FILTERS.items():
+        for status, status_filter in filters.items():
+            aggregates[f'{group}_{status}'] = Count('school', filter=status_filter)
+
+    result = qs.aggregate(**aggregates)
+
+    statistics = {
+        'total': result['total'],
+        'connectivity_speed': result['connectivity_speed'],
+        'connectivity_latency': result['connectivity_latency'],
+    }
+    for name in AVAILABILITY_FILTERS.keys():
+        statistics[f'has_{name}'] = result[f'has_{name}'] > 0
+    for group, filters in STATISTICS_FILTERS.items():
+        statistics[group] = get_default_statistics(0)
+        statistics[group].update({status: result[f'{group}_{status}'] for status in filters.keys()})
+    return statistics
+
+
+def aggregate_country_counters(qs, connectivity_availability, coverage_availability):
+    # country weekly counters for given statuses, using already known country availability
+    aggregates = {'schools_total': Count('*')}
+    for status, status_filter in CONNECTIVITY_FILTERS_BY_AVAILABILITY[connectivity_availability].items():
+        aggregates[f'schools_connectivity_{status}'] = Count('school', filter=status_filter)
+    for status, status_filter in COVERAGE_FILTERS_BY_AVAILABILITY[coverage_availability].items():
+        aggregates[f'schools_coverage_{status}'] = Count('school', filter=status_filter)
+
+    result = qs.aggregate(**aggregates)
+    return {counter: result.get(counter, 0) for counter in CountryWeeklyStatusDelta.COUNTERS}
@@ -1,15 +1,17 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db.models import Sum, Count
+from django.db import transaction
+from django.db.models import Q
 from django.db.models.functions.text import Lower
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_control
 
+from rest_framework import mixins, status, viewsets
 from rest_framework.generics import ListAPIView, RetrieveAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.utils.urls import remove_query_param
 from rest_framework.views import APIView
@@ -17,73 +19,50 @@ from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 
 from proco.connection_statistics.filters import DateMonthFilter, DateWeekNumberFilter, DateYearFilter
-from proco.connection_statistics.models import CountryDailyStatus, CountryWeeklyStatus, SchoolDailyStatus
+from proco.connection_statistics.models import (
+    CountryDailyStatus,
+    CountryWeeklyStatus,
+    DataExport,
+    GlobalWeeklyStatus,
+    SchoolDailyStatus,
+)
 from proco.connection_statistics.serializers import (
     CountryDailyStatusSerializer,
     CountryWeeklyStatusSerializer,
+    DataExportSerializer,
+    GlobalStatsSerializer,
     SchoolDailyStatusSerializer,
 )
+from proco.connection_statistics.tasks import export_data
+from proco.connection_statistics.utils import update_global_weekly_status
 from proco.locations.models import Country
-from proco.schools.models import School
-from proco.utils.cache import cache_manager
+from proco.utils.cache import CacheVersions, cache_manager
+from proco.utils.mixins import UseCachedDataMixin
+
+
+def calculate_global_statistic():
+    global_status = GlobalWeeklyStatus.objects.first()
+    if not global_status:
+        # statistics were not calculated by aggregation yet
+        global_status = update_global_weekly_status()
+    return GlobalStatsSerializer(global_status).data
 
 
 @method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
-class GlobalStatsAPIView(APIView):
+class GlobalStatsAPIView(UseCachedDataMixin, APIView):
     permission_classes = (AllowAny,)
 
     def get(self, request, *args, **kwargs):
-        def calculate_global_statistic():
-            schools_qs = School.objects.all()
-            country_qs = Country.objects.all()
-            countries_statuses_aggregated = Country.objects.aggregate_integration_statuses()
-            total_schools = schools_qs.count()
-            schools_without_unknown_connectivity = schools_qs.exclude(
-                last_weekly_status__connectivity_speed__isnull=True,
-            ).count()    
-
-            schools_mapped = schools_qs.filter(geopoint__isnull=False).count()
-            schools_without_connectivity = Country.objects.aggregate(
-                total=Sum('last_weekly_status__schools_connectivity_no'),
-            )['total']
-            percent_schools_without_connectivity = schools_without_connectivity / schools_without_unknown_connectivity
-
-            
-            all_countries =  country_qs.exclude(data_source__exact='').count()
-            country_with_connectivity = countries_statuses_aggregated['countries_with_static_data'] + countries_statuses_aggregated['countries_connected_to_realtime'] #countries_statuses_aggregated['countries_with_static_and_realtime_data']
-            
-            total_schools_with_connectivity = schools_without_unknown_connectivity #- schools_without_connectivity
-
-
-            last_date_updated = CountryWeeklyStatus.objects.all().order_by('-date').first().date
-
-            data = {
-                'total_schools': total_schools,
-                'schools_mapped': schools_mapped,
-                'percent_schools_without_connectivity': percent_schools_without_connectivity,
-                'countries_joined': countries_statuses_aggregated['countries_joined'],                
-                'countries_connected_to_realtime': countries_statuses_aggregated['countries_connected_to_realtime'],                 
-                'countries_with_static_data': countries_statuses_aggregated['countries_with_static_data'],
-                'schools_without_unknown_connectivity': schools_without_unknown_connectivity,
-                'all_countries': all_countries,
-                'schools_with_connectivity':total_schools_with_connectivity,
-                'total_country_with_connectivity': country_with_connectivity,
-                'percentage_schools_with_connectivity':total_schools_with_connectivity / schools_without_unknown_connectivity,
-                'last_date_updated': last_date_updated.strftime('%B %Y'),
-            }
-            return data
-
-        request_path = remove_query_param(request.get_full_path(), 'cache')
-        if not request.query_params.get('cache', 'on').lower() in ['on', 'true']:
-            data = calculate_global_statistic()
-            cache_manager.set('GLOBAL_STATS', data, request_path=request_path)
-        else:
-            data = cache_manager.get('GLOBAL_STATS')
-            if not data:
-                data = calculate_global_statistic()
-                cache_manager.set('GLOBAL_STATS', data, request_path=request_path)
-
-        return Response(data=data)
+        if self.use_cached_data():
+            response = self.get_cached_response(request, 'GLOBAL_STATS')
+            if response is not None:
+                return response
+
+        request_path = remove_query_param(request.get_full_path(), self.CACHE_KEY)
+        versions = cache_manager.get_versions((CacheVersions.COUNTRIES,))
+        data = calculate_global_statistic()
+        value = cache_manager.set('GLOBAL_STATS', data, request_path=request_path, versions=versions)
+        return self.set_cached_value_headers(Response(data=data), value)
 
 
 class CountryWeekStatsAPIView(RetrieveAPIView):
@@ -145,3 +124,44 @@ class SchoolDailyStatsListAPIView(ListAPIView):
     def get_queryset(self):
         queryset = super(SchoolDailyStatsListAPIView, self).get_queryset()
         return queryset.filter(school_id=self.kwargs['school_id'])
+
+
+class DataExportViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Completed snapshots are available for everyone, requested exports only for their author.
+    Export without date range is answered by snapshot if it's already built.
+    """
+    queryset = DataExport.objects.all().select_related('background_task')
+    serializer_class = DataExportSerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_fields = ('country', 'dataset', 'file_format', 'is_snapshot', 'status')
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [IsAuthenticated()]
+        return [AllowAny()]
+
+    def get_queryset(self):
+        available = Q(is_snapshot=True, status=DataExport.STATUSES.completed)
+        if self.request.user.is_authenticated:
+            available |= Q(requested_by=self.request.user)
+        return super().get_queryset().filter(available)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        if not data.get('date_from') and not data.get('date_to'):
+            snapshot = DataExport.get_snapshot(data['country'], data['dataset'], data['file_format'])
+            if snapshot:
+                return Response(self.get_serializer(snapshot).data)
+
+        data_export = serializer.save(requested_by=request.user)
+        transaction.on_commit(lambda: export_data.delay(data_export.id))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
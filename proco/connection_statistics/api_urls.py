@@ -1,10 +1,16 @@
-from django.urls import path
+from django.urls import include, path
+
+from rest_framework.routers import SimpleRouter
 
 from proco.connection_statistics import api
 
+data_exports = SimpleRouter()
+data_exports.register(r'data-exports', api.DataExportViewSet, basename='data-exports')
+
 app_name = 'connection_statistics'
 
 urlpatterns = [
+    path('', include(data_exports.urls)),
     path('global-stat/', api.GlobalStatsAPIView.as_view(), name='global-stat'),
     # todo: code should be only in lower case
     path(
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ConnectionStatisticsConfig(AppConfig):
     name = 'proco.connection_statistics'
     verbose_name = 'Connection Statistics'
+
+    def ready(self):
+        from proco.connection_statistics import warmers  # NOQA
@@ -0,0 +1,145 @@
+import gzip
+import os
+import tempfile
+
+from django.core.files import File
+from django.db import connection
+from django.db.models import FloatField, Func
+from django.utils import timezone
+
+from proco.connection_statistics.models import DataExport, SchoolDailyStatus, SchoolWeeklyStatus
+from proco.schools.models import School
+
+EXPORT_COLUMNS = {
+    DataExport.DATASETS.schools: (
+        'id', 'external_id', 'giga_id_school', 'name',
+        'admin_1_name', 'admin_2_name', 'admin_3_name', 'admin_4_name',
+        'education_level', 'environment', 'school_type', 'longitude', 'latitude',
+    ),
+    DataExport.DATASETS.school_weekly_status: (
+        'school_id', 'year', 'week', 'date',
+        'num_students', 'num_teachers', 'num_classroom', 'num_latrines', 'num_computers',
+        'running_water', 'electricity_availability', 'computer_lab',
+        'connectivity', 'connectivity_type', 'connectivity_speed', 'connectivity_latency',
+        'coverage_availability', 'coverage_type',
+    ),
+    DataExport.DATASETS.school_daily_status: (
+        'school_id', 'date', 'connectivity_speed', 'connectivity_latency',
+    ),
+}
+
+ARROW_TYPES_BY_FIELD_TYPE = {
+    'AutoField': 'int64',
+    'ForeignKey': 'int64',
+    'PositiveIntegerField': 'int64',
+    'PositiveSmallIntegerField': 'int64',
+    'FloatField': 'float64',
+    'BooleanField': 'bool_',
+    'NullBooleanField': 'bool_',
+    'DateField': 'date32',
+}
+
+
+def is_parquet_available():
+    try:
+        import pyarrow.csv  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_export_queryset(data_export: DataExport):
+    if data_export.dataset == DataExport.DATASETS.schools:
+        queryset = School.objects.filter(country_id=data_export.country_id).annotate(
+            longitude=Func('geopoint', function='ST_X', output_field=FloatField()),
+            latitude=Func('geopoint', function='ST_Y', output_field=FloatField()),
+        )
+    else:
+        model = {
+            DataExport.DATASETS.school_weekly_status: SchoolWeeklyStatus,
+            DataExport.DATASETS.school_daily_status: SchoolDailyStatus,
+        }[data_export.dataset]
+        queryset = model.objects.filter(school__country_id=data_export.country_id)
+        if data_export.date_from:
+            queryset = queryset.filter(date__gte=data_export.date_from)
+        if data_export.date_to:
+            queryset = queryset.filter(date__lte=data_export.date_to)
+
+    return queryset.order_by('id').values_list(*EXPORT_COLUMNS[data_export.dataset])
+
+
+def copy_to_csv(queryset, csv_file) -> int:
+    """
+    Write queryset rows to file as csv with header by postgres COPY, rows aren't loaded into python.
+    Returns amount of written rows.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        copy_sql = cursor.mogrify(f'COPY ({sql}) TO STDOUT WITH (FORMAT CSV, HEADER)', params).decode()  # noqa: S608
+        cursor.copy_expert(copy_sql, csv_file)
+        return cursor.rowcount
+
+
+def get_arrow_schema(queryset):
+    import pyarrow
+
+    columns = []
+    for column in queryset.query.values_select + tuple(queryset.query.annotation_select):
+        if column in queryset.query.annotation_select:
+            field = queryset.query.annotation_select[column].output_field
+        else:
+            field = queryset.model._meta.get_field(column)
+        arrow_type = getattr(pyarrow, ARROW_TYPES_BY_FIELD_TYPE.get(field.get_internal_type(), 'string'))()
+        columns.append(pyarrow.field(column, arrow_type))
+    return pyarrow.schema(columns)
+
+
+def convert_csv_to_parquet(csv_path, parquet_path, schema):
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    # postgres writes booleans as t/f, nulls as unquoted empty values and empty strings as quoted ones
+    reader = pyarrow.csv.open_csv(csv_path, convert_options=pyarrow.csv.ConvertOptions(
+        column_types=schema,
+        true_values=['t'],
+        false_values=['f'],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+    ))
+    with pyarrow.parquet.ParquetWriter(parquet_path, schema) as writer:
+        for batch in reader:
+            writer.write_table(pyarrow.Table.from_batches([batch], schema=schema))
+
+
+def write_data_export(data_export: DataExport, log=None):
+    log = log or (lambda text: None)
+    queryset = get_export_queryset(data_export)
+    date = timezone.now().date().strftime('%Y-%m-%d')
+    filename = f'{data_export.country.code.lower()}_{data_export.dataset}_{date}'
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, f'{filename}.csv')
+        if data_export.file_format == DataExport.FORMATS.parquet:
+            with open(csv_path, 'wb') as csv_file:
+                rows_count = copy_to_csv(queryset, csv_file)
+            log(f'{rows_count} rows copied')
+
+            file_path = os.path.join(directory, f'{filename}.parquet')
+            convert_csv_to_parquet(csv_path, file_path, get_arrow_schema(queryset))
+            log('converted to parquet')
+        else:
+            file_path = f'{csv_path}.gz'
+            with gzip.open(file_path, 'wb') as csv_file:
+                rows_count = copy_to_csv(queryset, csv_file)
+            log(f'{rows_count} rows copied')
+
+        with open(file_path, 'rb') as export_file:
+            data_export.file.save(os.path.basename(file_path), File(export_file), save=False)
+        log(f'{data_export.file.name} uploaded')
+
+    data_export.rows_count = rows_count
+    data_export.status = DataExport.STATUSES.completed
+    data_export.completed_at = timezone.now()
+    data_export.save()
+    return data_export
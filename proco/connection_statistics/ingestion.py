@@ -0,0 +1,224 @@
+import logging
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from proco.connection_statistics.models import RealTimeConnectivity
+from proco.locations.models import Country
+from proco.schools.models import School
+
+logger = logging.getLogger('django.' + __name__)
+
+INGESTION_BATCH_SIZE = 5000
+
+# measurement normalized by source: speed in bps, latency in ms
+MeasurementData = namedtuple('MeasurementData', [
+    'external_id', 'country_code', 'timestamp', 'connectivity_speed', 'connectivity_latency',
+])
+
+
+class SchoolResolver(object):
+    # external id -> school id map, filled lazily for external ids met in measurements
+    def __init__(self):
+        self.countries_codes = set(Country.objects.values_list('code', flat=True))
+        self.by_country = {}
+        self.by_external_id = {}
+        self.loaded_external_ids = set()
+
+    def load(self, external_ids: Iterable[str]):
+        external_ids = set(external_ids) - self.loaded_external_ids
+        if not external_ids:
+            return
+
+        schools = School.objects.filter(external_id__in=external_ids).order_by('id').values_list(
+            'id', 'external_id', 'country__code',
+        )
+        for school_id, external_id, country_code in schools:
+            self.by_country[(country_code, external_id)] = school_id
+            self.by_external_id[external_id] = school_id
+        self.loaded_external_ids.update(external_ids)
+
+    def get(self, external_id: str, country_code: Optional[str]) -> Optional[int]:
+        # school should be in measurement country if it's known, otherwise any school can be matched
+        if country_code in self.countries_codes:
+            return self.by_country.get((country_code, external_id))
+        return self.by_external_id.get(external_id)
+
+
+class MeasurementSource(object):
+    """
+    Adapter for realtime measurements feed.
+
+    Source reads raw entries newer than stored position in position order, maps them to MeasurementData
+    and stores position of the last processed entry.
+    """
+    name = None
+
+    def read(self) -> Iterator:
+        raise NotImplementedError
+
+    def parse(self, entry) -> Optional[MeasurementData]:
+        # None means entry is not valid and should be skipped
+        raise NotImplementedError
+
+    def save_position(self, entry):
+        pass
+
+    def on_empty(self):
+        # called when no entries were read at all
+        pass
+
+
+class DatabaseMeasurementSource(MeasurementSource):
+    """
+    Source reading model entries in keyset pages ordered by (timestamp, id).
+    Rows are passed to parse as (id, timestamp, *fields) tuples.
+
+    When window is given, entries within it are read again and stored position is left untouched.
+    """
+    model = None
+    timestamp_field = 'timestamp'
+    fields = ()
+
+    def __init__(self, page_size=INGESTION_BATCH_SIZE, window: Tuple[datetime, datetime] = None):
+        self.page_size = page_size
+        self.window = window
+
+    def get_filters(self) -> Q:
+        return Q()
+
+    def get_annotations(self) -> dict:
+        return {}
+
+    def get_position(self) -> Tuple[datetime, Optional[int]]:
+        raise NotImplementedError
+
+    def set_position(self, timestamp: datetime, entry_id: int):
+        raise NotImplementedError
+
+    def get_page(self, last_timestamp: datetime, last_id: Optional[int]) -> List[Tuple]:
+        entries = self.model.objects.filter(self.get_filters())
+        if self.window:
+            entries = entries.filter(**{f'{self.timestamp_field}__lte': self.window[1]})
+        if last_id is None:
+            entries = entries.filter(**{f'{self.timestamp_field}__gt': last_timestamp})
+        else:
+            entries = entries.filter(
+                Q(**{f'{self.timestamp_field}__gt': last_timestamp})
+                | Q(**{self.timestamp_field: last_timestamp, 'id__gt': last_id}),
+            )
+
+        # only required columns, json blobs are not transferred
+        return list(entries.annotate(**self.get_annotations()).order_by(self.timestamp_field, 'id').values_list(
+            'id', self.timestamp_field, *self.fields,
+        )[:self.page_size])
+
+    def read(self) -> Iterator[Tuple]:
+        if self.window:
+            last_timestamp, last_id = self.window[0], None
+        else:
+            last_timestamp, last_id = self.get_position()
+        while True:
+            page = self.get_page(last_timestamp, last_id)
+            yield from page
+            if len(page) < self.page_size:
+                break
+            last_id, last_timestamp = page[-1][0], page[-1][1]
+
+    def save_position(self, entry):
+        if not self.window:
+            self.set_position(entry[1], entry[0])
+
+    def on_empty(self):
+        if not self.window:
+            self.set_position(timezone.now(), None)
+
+
+class IngestionEngine(object):
+    def __init__(self, source: MeasurementSource, batch_size=INGESTION_BATCH_SIZE):
+        self.source = source
+        self.batch_size = batch_size
+        self.schools = SchoolResolver()
+        self.stats = {
+            'source': source.name,
+            'read': 0,
+            'invalid': 0,
+            'unknown_school': 0,
+            'duplicates': 0,
+            'created': 0,
+        }
+
+    def run(self) -> dict:
+        started_at = time.monotonic()
+
+        batch = []
+        for entry in self.source.read():
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+
+        if not self.stats['read']:
+            self.source.on_empty()
+
+        self.stats['duration'] = time.monotonic() - started_at
+        self.stats['per_second'] = self.stats['read'] / self.stats['duration'] if self.stats['duration'] else 0
+        logger.info('%s measurements ingested: %s', self.source.name, self.stats)
+        return self.stats
+
+    def process_batch(self, entries: list):
+        measurements = []
+        for entry in entries:
+            measurement = self.source.parse(entry)
+            if measurement is None:
+                self.stats['invalid'] += 1
+            else:
+                measurements.append(measurement)
+
+        self.schools.load(measurement.external_id for measurement in measurements)
+
+        realtime = {}
+        for measurement in measurements:
+            school_id = self.schools.get(measurement.external_id, measurement.country_code)
+            if school_id is None:
+                logger.debug('skipping %s measurement: unknown school %s', self.source.name, measurement.external_id)
+                self.stats['unknown_school'] += 1
+                continue
+
+            key = (school_id, measurement.timestamp)
+            if key in realtime:
+                self.stats['duplicates'] += 1
+                continue
+
+            realtime[key] = RealTimeConnectivity(
+                created=measurement.timestamp,
+                connectivity_speed=measurement.connectivity_speed,
+                connectivity_latency=measurement.connectivity_latency,
+                school_id=school_id,
+            )
+
+        if realtime:
+            # entries already stored are dropped, so same data can be safely processed again
+            existing = RealTimeConnectivity.objects.filter(
+                school_id__in={school_id for school_id, _timestamp in realtime.keys()},
+                created__gte=min(timestamp for _school_id, timestamp in realtime.keys()),
+                created__lte=max(timestamp for _school_id, timestamp in realtime.keys()),
+            ).order_by().values_list('school_id', 'created')
+            for key in existing:
+                if realtime.pop(key, None):
+                    self.stats['duplicates'] += 1
+
+        # position is saved together with every batch, so interrupted ingestion continues exactly from here
+        with transaction.atomic():
+            RealTimeConnectivity.objects.bulk_create(realtime.values())
+            self.source.save_position(entries[-1])
+
+        self.stats['read'] += len(entries)
+        self.stats['created'] += len(realtime)
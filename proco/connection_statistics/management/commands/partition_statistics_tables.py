@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+
+from proco.connection_statistics.partitioning import (
+    REALTIME_CONNECTIVITY_PARTITIONING,
+    SCHOOL_DAILY_STATUS_PARTITIONING,
+    migrate_to_partitioned,
+)
+
+TABLES = {
+    'realtime': REALTIME_CONNECTIVITY_PARTITIONING,
+    'daily': SCHOOL_DAILY_STATUS_PARTITIONING,
+}
+
+
+class Command(BaseCommand):
+    help = 'Move real time connectivity and school daily statuses into partitioned tables without downtime.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=sorted(TABLES.keys()), help='Only one table to be migrated')
+        parser.add_argument('--chunk-size', type=int, default=100000)
+        parser.add_argument('--drop-legacy', action='store_true', help='Drop previous table after switching')
+
+    def handle(self, *args, **options):
+        tables = [TABLES[options['table']]] if options['table'] else TABLES.values()
+        for partitioned_table in tables:
+            migrate_to_partitioned(
+                partitioned_table,
+                chunk_size=options['chunk_size'],
+                drop_legacy=options['drop_legacy'],
+                log=self.stdout.write,
+            )
@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from proco.connection_statistics.ingestion import IngestionEngine
+from proco.realtime_dailycheckapp.utils import DailyCheckAppMeasurementSource
+from proco.realtime_unicef.utils import UnicefMeasurementSource
+
+SOURCES = {
+    UnicefMeasurementSource.name: UnicefMeasurementSource,
+    DailyCheckAppMeasurementSource.name: DailyCheckAppMeasurementSource,
+}
+
+
+class Command(BaseCommand):
+    help = 'Ingest realtime measurements from the given time window again. Already stored ones are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', type=str, choices=sorted(SOURCES.keys()))
+        parser.add_argument('since', type=str, help='ISO datetime, measurements after it are replayed')
+        parser.add_argument('until', type=str, help='ISO datetime, measurements up to it are replayed')
+
+    def handle(self, *args, **options):
+        since, until = parse_datetime(options['since']), parse_datetime(options['until'])
+        if not since or not until or since.tzinfo is None or until.tzinfo is None:
+            raise CommandError('since and until should be ISO datetimes with timezone')
+        if since >= until:
+            raise CommandError('since should be earlier than until')
+
+        source = SOURCES[options['source']](window=(since, until))
+        stats = IngestionEngine(source).run()
+        self.stdout.write(f'{stats["read"]} measurements read, {stats["created"]} created, '
+                          f'{stats["duplicates"]} duplicates skipped')
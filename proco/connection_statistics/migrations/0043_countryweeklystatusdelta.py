@@ -0,0 +1,30 @@
+# Generated by Django 2.2.19 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0011_auto_20210415_0731'),
+        ('connection_statistics', '0042_auto_20220922_1338'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryWeeklyStatusDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('schools_total', 'schools_total'), ('schools_connectivity_good', 'schools_connectivity_good'), ('schools_connectivity_moderate', 'schools_connectivity_moderate'), ('schools_connectivity_no', 'schools_connectivity_no'), ('schools_connectivity_unknown', 'schools_connectivity_unknown'), ('schools_coverage_good', 'schools_coverage_good'), ('schools_coverage_moderate', 'schools_coverage_moderate'), ('schools_coverage_no', 'schools_coverage_no'), ('schools_coverage_unknown', 'schools_coverage_unknown')], max_length=64)),
+                ('value', models.IntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_status_deltas', to='locations.Country')),
+            ],
+            options={
+                'verbose_name': 'Country Summary Delta',
+                'verbose_name_plural': 'Country Summary Deltas',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.19 on 2026-10-18 14:20
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0043_countryweeklystatusdelta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('date', models.DateField()),
+                ('today', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=10)),
+                ('countries_scheduled', models.PositiveIntegerField(default=0)),
+                ('countries_skipped', models.PositiveIntegerField(default=0)),
+                ('shards', models.PositiveIntegerField(default=0)),
+                ('stages', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('realtime_last_id', models.BigIntegerField(blank=True, null=True)),
+                ('daily_last_id', models.BigIntegerField(blank=True, null=True)),
+                ('aggregation_started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Aggregation Run',
+                'verbose_name_plural': 'Aggregation Runs',
+                'ordering': ('-id',),
+            },
+        ),
+    ]
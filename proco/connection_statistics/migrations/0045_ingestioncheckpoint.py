@@ -0,0 +1,31 @@
+# Generated by Django 2.2.19 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0044_aggregationrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('source', models.CharField(max_length=64, unique=True)),
+                ('timestamp', models.DateTimeField()),
+                ('last_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ingestion Checkpoint',
+                'verbose_name_plural': 'Ingestion Checkpoints',
+                'ordering': ('source',),
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.19 on 2026-10-18 16:10
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+import proco.utils.dates
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0045_ingestioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalWeeklyStatus',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('year', models.PositiveSmallIntegerField(default=proco.utils.dates.get_current_year)),
+                ('week', models.PositiveSmallIntegerField(default=proco.utils.dates.get_current_week)),
+                ('date', models.DateField()),
+                ('schools_total', models.PositiveIntegerField(default=0)),
+                ('schools_mapped', models.PositiveIntegerField(default=0)),
+                ('schools_with_known_connectivity', models.PositiveIntegerField(default=0)),
+                ('schools_connectivity_no', models.PositiveIntegerField(default=0)),
+                ('countries_with_data_source', models.PositiveIntegerField(default=0)),
+                ('countries_joined', models.PositiveIntegerField(default=0)),
+                ('countries_connected_to_realtime', models.PositiveIntegerField(default=0)),
+                ('countries_with_static_data', models.PositiveIntegerField(default=0)),
+                ('last_date_updated', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Global Summary',
+                'verbose_name_plural': 'Global Summary',
+                'ordering': ('-year', '-week'),
+                'unique_together': {('year', 'week')},
+            },
+        ),
+    ]
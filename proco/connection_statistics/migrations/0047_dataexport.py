@@ -0,0 +1,47 @@
+# Generated by Django 2.2.19 on 2026-10-18 17:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import proco.connection_statistics.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('background', '0001_initial'),
+        ('locations', '0012_simplifiedgeometry'),
+        ('connection_statistics', '0046_globalweeklystatus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataExport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('dataset', models.CharField(choices=[('schools', 'Schools'), ('school_weekly_status', 'School Weekly Connectivity Summary'), ('school_daily_status', 'School Daily Connectivity Summary')], max_length=32)),
+                ('file_format', models.CharField(choices=[('csv', 'CSV, gzip compressed'), ('parquet', 'Parquet')], default='csv', max_length=16)),
+                ('date_from', models.DateField(blank=True, null=True)),
+                ('date_to', models.DateField(blank=True, null=True)),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('started', 'Started'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('file', models.FileField(blank=True, upload_to=proco.connection_statistics.models.get_data_export_path)),
+                ('rows_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('errors', models.TextField(blank=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('background_task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='background.BackgroundTask')),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='data_exports', to='locations.Country')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Data Export',
+                'verbose_name_plural': 'Data Exports',
+                'ordering': ('-id',),
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0047_dataexport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aggregationrun',
+            name='errors',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='aggregationrun',
+            name='status',
+            field=models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=10),
+        ),
+    ]
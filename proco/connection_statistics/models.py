@@ -1,5 +1,9 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import ugettext as _
 
@@ -7,6 +11,7 @@ from isoweek import Week
 from model_utils import Choices
 from model_utils.models import TimeStampedModel
 
+from proco.background.models import BackgroundTask
 from proco.locations.models import Country
 from proco.schools.constants import statuses_schema
 from proco.schools.models import School
@@ -105,6 +110,63 @@ class CountryWeeklyStatus(ConnectivityStatistics, TimeStampedModel, models.Model
         self.country.save(update_fields=('date_of_join',))
 
 
+class GlobalWeeklyStatus(TimeStampedModel):
+    # statistics over all schools and countries, updated after aggregation and imports
+    year = models.PositiveSmallIntegerField(default=get_current_year)
+    week = models.PositiveSmallIntegerField(default=get_current_week)
+    date = models.DateField()
+
+    schools_total = models.PositiveIntegerField(default=0)
+    schools_mapped = models.PositiveIntegerField(default=0)
+    schools_with_known_connectivity = models.PositiveIntegerField(default=0)
+    schools_connectivity_no = models.PositiveIntegerField(default=0)
+
+    countries_with_data_source = models.PositiveIntegerField(default=0)
+    countries_joined = models.PositiveIntegerField(default=0)
+    countries_connected_to_realtime = models.PositiveIntegerField(default=0)
+    countries_with_static_data = models.PositiveIntegerField(default=0)
+
+    # date of the latest country weekly status
+    last_date_updated = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Global Summary')
+        verbose_name_plural = _('Global Summary')
+        ordering = ('-year', '-week')
+        unique_together = ('year', 'week')
+
+    def __str__(self):
+        return f'{self.year} Week {self.week} Schools - {self.schools_total}'
+
+    def save(self, **kwargs):
+        self.date = Week(self.year, self.week).monday()
+        super().save(**kwargs)
+
+
+class CountryWeeklyStatusDelta(models.Model):
+    # school counters changes, collected in incremental mode and applied to country weekly status in batches
+    COUNTERS = (
+        'schools_total',
+        'schools_connectivity_good', 'schools_connectivity_moderate',
+        'schools_connectivity_no', 'schools_connectivity_unknown',
+        'schools_coverage_good', 'schools_coverage_moderate',
+        'schools_coverage_no', 'schools_coverage_unknown',
+    )
+
+    country = models.ForeignKey(Country, related_name='weekly_status_deltas', on_delete=models.CASCADE)
+    field = models.CharField(max_length=64, choices=[(counter, counter) for counter in COUNTERS])
+    value = models.IntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Country Summary Delta')
+        verbose_name_plural = _('Country Summary Deltas')
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.country.name} {self.field} {self.value:+d}'
+
+
 class SchoolWeeklyStatus(ConnectivityStatistics, TimeStampedModel, models.Model):
     # unable to use choives as should be (COVERAGE_TYPES.4g), because digit goes first
     COVERAGE_UNKNOWN = 'unknown'
@@ -214,3 +276,139 @@ class RealTimeConnectivity(ConnectivityStatistics, TimeStampedModel, models.Mode
 
     def __str__(self):
         return f'{self.created} {self.school.name} Speed - {self.connectivity_speed}'
+
+
+class AggregationRun(TimeStampedModel):
+    STATUSES = Choices(
+        ('running', _('Running')),
+        ('completed', _('Completed')),
+        ('failed', _('Failed')),
+    )
+
+    date = models.DateField()
+    today = models.BooleanField(default=True)
+    status = models.CharField(default=STATUSES.running, choices=STATUSES, max_length=10)
+    countries_scheduled = models.PositiveIntegerField(default=0)
+    countries_skipped = models.PositiveIntegerField(default=0)
+    shards = models.PositiveIntegerField(default=0)
+    # durations in seconds by stage name
+    stages = JSONField(default=dict)
+    # watermarks used to find countries with new data during next run
+    realtime_last_id = models.BigIntegerField(null=True, blank=True)
+    daily_last_id = models.BigIntegerField(null=True, blank=True)
+    aggregation_started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    errors = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = _('Aggregation Run')
+        verbose_name_plural = _('Aggregation Runs')
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'{self.date} {self.status}'
+
+    @classmethod
+    def update_run(cls, run_id, stages=None, **fields):
+        # tasks of the same run are executed concurrently, row is locked to not lose stages
+        with transaction.atomic():
+            run = cls.objects.select_for_update().get(id=run_id)
+            run.stages.update(stages or {})
+            for name, value in fields.items():
+                setattr(run, name, value)
+            run.save()
+        return run
+
+
+class IngestionCheckpoint(TimeStampedModel):
+    # position of the last ingested measurement for every realtime source
+    source = models.CharField(max_length=64, unique=True)
+    timestamp = models.DateTimeField()
+    last_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Ingestion Checkpoint')
+        verbose_name_plural = _('Ingestion Checkpoints')
+        ordering = ('source',)
+
+    def __str__(self):
+        return f'{self.source} {self.timestamp} {self.last_id}'
+
+    @classmethod
+    def get_position(cls, source: str):
+        checkpoint = cls.objects.filter(source=source).first()
+        if not checkpoint:
+            return None
+        return checkpoint.timestamp, checkpoint.last_id
+
+    @classmethod
+    def set_position(cls, source: str, timestamp, last_id=None):
+        cls.objects.update_or_create(source=source, defaults={'timestamp': timestamp, 'last_id': last_id})
+
+
+def get_data_export_path(instance, filename):
+    return f'exports/{instance.country.code.lower()}/{uuid.uuid4()}/{filename}'
+
+
+class DataExport(TimeStampedModel):
+    """
+    Bulk export of country data into a file in media storage.
+    Snapshots of full history are created nightly, so most of exports are already built.
+    """
+    STATUSES = Choices(
+        ('pending', _('Pending')),
+        ('started', _('Started')),
+        ('completed', _('Completed')),
+        ('failed', _('Failed')),
+    )
+    PROCESS_STATUSES = [STATUSES.pending, STATUSES.started]
+    DATASETS = Choices(
+        ('schools', _('Schools')),
+        ('school_weekly_status', _('School Weekly Connectivity Summary')),
+        ('school_daily_status', _('School Daily Connectivity Summary')),
+    )
+    FORMATS = Choices(
+        ('csv', _('CSV, gzip compressed')),
+        ('parquet', _('Parquet')),
+    )
+
+    country = models.ForeignKey(Country, related_name='data_exports', on_delete=models.CASCADE)
+    dataset = models.CharField(max_length=32, choices=DATASETS)
+    file_format = models.CharField(max_length=16, choices=FORMATS, default=FORMATS.csv)
+    # date range is applied to statuses datasets, empty bounds mean full history
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    is_snapshot = models.BooleanField(default=False)
+
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    background_task = models.ForeignKey(BackgroundTask, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUSES, default=STATUSES.pending)
+    file = models.FileField(upload_to=get_data_export_path, blank=True)
+    rows_count = models.PositiveIntegerField(null=True, blank=True)
+    errors = models.TextField(blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Data Export')
+        verbose_name_plural = _('Data Exports')
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'{self.country} {self.dataset} {self.file_format} - {self.status}'
+
+    @classmethod
+    def get_snapshot(cls, country, dataset, file_format):
+        return cls.objects.filter(
+            country=country, dataset=dataset, file_format=file_format,
+            is_snapshot=True, status=cls.STATUSES.completed,
+        ).first()
+
+    def delete_outdated_snapshots(self):
+        outdated_snapshots = DataExport.objects.filter(
+            country_id=self.country_id, dataset=self.dataset, file_format=self.file_format,
+            is_snapshot=True, id__lt=self.id,
+        ).exclude(status__in=self.PROCESS_STATUSES)
+
+        for snapshot in outdated_snapshots:
+            snapshot.file.delete(save=False)
+            snapshot.delete()
@@ -0,0 +1,274 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from proco.connection_statistics.models import RealTimeConnectivity, SchoolDailyStatus
+
+logger = logging.getLogger('django.' + __name__)
+
+
+class PartitionedTable(object):
+    """
+    Native postgres range partitioning of model table by date/datetime column.
+
+    Partitions are named <table>_p<YYYYMMDD> for daily and <table>_p<YYYYMM> for monthly intervals;
+    rows not fitting into any partition are kept in <table>_default until partition for them is created.
+    """
+    DAY = 'day'
+    MONTH = 'month'
+
+    def __init__(self, model, column: str, interval: str, ahead: timedelta):
+        self.model = model
+        self.column = column
+        self.interval = interval
+        # how far into future partitions are created in advance
+        self.ahead = ahead
+
+    @property
+    def table(self) -> str:
+        return self.model._meta.db_table
+
+    @property
+    def default_partition(self) -> str:
+        return f'{self.table}_default'
+
+    @property
+    def name_format(self) -> str:
+        return '%Y%m' if self.interval == self.MONTH else '%Y%m%d'
+
+    def get_partition_start(self, value) -> date:
+        if isinstance(value, datetime):
+            value = timezone.localtime(value, timezone.utc).date() if timezone.is_aware(value) else value.date()
+        if self.interval == self.MONTH:
+            return value.replace(day=1)
+        return value
+
+    def get_next_start(self, start: date) -> date:
+        if self.interval == self.MONTH:
+            return (start + timedelta(days=32)).replace(day=1)
+        return start + timedelta(days=1)
+
+    def get_partition_name(self, start: date) -> str:
+        return f'{self.table}_p{start.strftime(self.name_format)}'
+
+    def parse_partition_start(self, name: str) -> Optional[date]:
+        prefix = f'{self.table}_p'
+        if not name.startswith(prefix):
+            return None
+        try:
+            return datetime.strptime(name[len(prefix):], self.name_format).date()
+        except ValueError:
+            return None
+
+
+REALTIME_CONNECTIVITY_PARTITIONING = PartitionedTable(
+    RealTimeConnectivity, 'created', PartitionedTable.DAY, ahead=timedelta(days=7),
+)
+SCHOOL_DAILY_STATUS_PARTITIONING = PartitionedTable(
+    SchoolDailyStatus, 'date', PartitionedTable.MONTH, ahead=timedelta(days=62),
+)
+PARTITIONED_TABLES = (REALTIME_CONNECTIVITY_PARTITIONING, SCHOOL_DAILY_STATUS_PARTITIONING)
+
+
+def is_partitioned(partitioned_table: PartitionedTable) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [partitioned_table.table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def get_partitions(parent: str) -> List[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [parent],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(partitioned_table: PartitionedTable, start: date, parent: str = None) -> bool:
+    parent = parent or partitioned_table.table
+    name = partitioned_table.get_partition_name(start)
+    if name in get_partitions(parent):
+        return False
+
+    start_literal = start.isoformat()
+    end_literal = partitioned_table.get_next_start(start).isoformat()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        # rows written before partition was created are moved from default one, otherwise attach fails
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {partitioned_table.default_partition}
+                WHERE {partitioned_table.column} >= %s AND {partitioned_table.column} < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,  # noqa: S608
+            [start_literal, end_literal],
+        )
+        cursor.execute(
+            f"ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES FROM ('{start_literal}') TO ('{end_literal}')",
+        )
+
+    logger.info('partition %s created', name)
+    return True
+
+
+def ensure_partitions(partitioned_table: PartitionedTable, since, until, parent: str = None) -> int:
+    created = 0
+    start = partitioned_table.get_partition_start(since)
+    last_start = partitioned_table.get_partition_start(until)
+    while start <= last_start:
+        created += create_partition(partitioned_table, start, parent=parent)
+        start = partitioned_table.get_next_start(start)
+    return created
+
+
+def ensure_future_partitions() -> int:
+    created = 0
+    now = timezone.now()
+    for partitioned_table in PARTITIONED_TABLES:
+        if is_partitioned(partitioned_table):
+            created += ensure_partitions(partitioned_table, now, now + partitioned_table.ahead)
+    return created
+
+
+def drop_partitions_before(partitioned_table: PartitionedTable, cutoff: date) -> int:
+    # partition is dropped only when all its range is before cutoff
+    dropped = 0
+    with connection.cursor() as cursor:
+        for name in get_partitions(partitioned_table.table):
+            start = partitioned_table.parse_partition_start(name)
+            if start is None or partitioned_table.get_next_start(start) > cutoff:
+                continue
+
+            cursor.execute(f'DROP TABLE {name}')
+            logger.info('partition %s dropped', name)
+            dropped += 1
+
+        cursor.execute(
+            f'DELETE FROM {partitioned_table.default_partition} WHERE {partitioned_table.column} < %s',  # noqa: S608
+            [cutoff.isoformat()],
+        )
+    return dropped
+
+
+def migrate_to_partitioned(
+    partitioned_table: PartitionedTable, chunk_size=100000, drop_legacy=False, log: Callable[[str], None] = None,
+):
+    """
+    Move existing table data into partitioned one while application keeps writing into it.
+
+    Data is copied by id chunks, every one in its own transaction. Rows created or modified during copying
+    are copied again in the final short transaction which holds exclusive lock and swaps tables;
+    rows removed after copying is finished can survive, they are dropped together with old partitions.
+    Previous table is kept as <table>_legacy unless drop_legacy is set.
+    """
+    log = log or logger.info
+    table = partitioned_table.table
+    column = partitioned_table.column
+    new_table = f'{table}_partitioned'
+    legacy_table = f'{table}_legacy'
+    migration_index = f'{table}_modified_migration'
+
+    if is_partitioned(partitioned_table):
+        log(f'{table} is already partitioned')
+        return
+
+    with connection.cursor() as cursor:
+        # leftovers of interrupted migration
+        cursor.execute(f'DROP TABLE IF EXISTS {new_table} CASCADE')
+        cursor.execute(f'DROP TABLE IF EXISTS {partitioned_table.default_partition}')
+
+        cursor.execute(f'CREATE TABLE {new_table} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})')
+        # unique constraints of partitioned table should include partition key
+        cursor.execute(f'ALTER TABLE {new_table} ADD PRIMARY KEY (id, {column})')
+        for fields in partitioned_table.model._meta.unique_together:
+            columns = ', '.join(partitioned_table.model._meta.get_field(field).column for field in fields)
+            cursor.execute(f'ALTER TABLE {new_table} ADD UNIQUE ({columns})')
+        cursor.execute(f'CREATE INDEX ON {new_table} ({column})')
+        cursor.execute(f'CREATE INDEX ON {new_table} (school_id)')
+        cursor.execute(
+            f'ALTER TABLE {new_table} ADD FOREIGN KEY (school_id) '
+            f'REFERENCES {partitioned_table.model._meta.get_field("school").related_model._meta.db_table} (id) '
+            f'DEFERRABLE INITIALLY DEFERRED',
+        )
+        cursor.execute(f'CREATE TABLE {partitioned_table.default_partition} PARTITION OF {new_table} DEFAULT')
+
+        # rows changed during copying are found by this index in final transaction
+        concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY'
+        cursor.execute(f'CREATE INDEX {concurrently} IF NOT EXISTS {migration_index} ON {table} (modified)')
+
+        copy_started_at = timezone.now()
+        cursor.execute(f'SELECT MIN({column}), MAX({column}), MAX(id) FROM {table}')  # noqa: S608
+        min_value, max_value, max_id = cursor.fetchone()
+
+    now = timezone.now()
+    ensure_partitions(
+        partitioned_table,
+        min_value or now,
+        max(partitioned_table.get_partition_start(max_value or now), partitioned_table.get_partition_start(now))
+        + partitioned_table.ahead,
+        parent=new_table,
+    )
+    log(f'{table}: {len(get_partitions(new_table)) - 1} partitions created')
+
+    copied_id = 0
+    while copied_id < (max_id or 0):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {new_table} SELECT * FROM {table} WHERE id > %s AND id <= %s',  # noqa: S608
+                [copied_id, copied_id + chunk_size],
+            )
+        copied_id += chunk_size
+        log(f'{table}: {min(copied_id, max_id)} of {max_id} copied')
+
+    with connection.cursor() as cursor:
+        # rows removed during copying; done before lock as it scans whole table
+        cursor.execute(
+            f"""
+            DELETE FROM {new_table} WHERE NOT EXISTS (
+                SELECT 1 FROM {table} WHERE {table}.id = {new_table}.id
+            )
+            """,  # noqa: S608
+        )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+
+        changed_rows = f'SELECT id FROM {table} WHERE id > %s OR modified >= %s'  # noqa: S608
+        cursor.execute(
+            f'DELETE FROM {new_table} WHERE id IN ({changed_rows})',  # noqa: S608
+            [max_id or 0, copy_started_at],
+        )
+        cursor.execute(
+            f'INSERT INTO {new_table} SELECT * FROM {table} WHERE id IN ({changed_rows})',  # noqa: S608
+            [max_id or 0, copy_started_at],
+        )
+
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {legacy_table}')
+        cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+        if sequence:
+            # sequence would be removed together with legacy table otherwise
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+        cursor.execute(f'DROP INDEX {migration_index}')
+
+    log(f'{table} switched to partitioned table')
+
+    if drop_legacy:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {legacy_table}')
+        log(f'{legacy_table} dropped')
@@ -1,8 +1,11 @@
 from rest_framework import serializers
 
+from proco.connection_statistics.exports import is_parquet_available
 from proco.connection_statistics.models import (
     CountryDailyStatus,
     CountryWeeklyStatus,
+    DataExport,
+    GlobalWeeklyStatus,
     SchoolDailyStatus,
     SchoolWeeklyStatus,
 )
@@ -103,3 +106,77 @@ class SchoolDailyStatusSerializer(serializers.ModelSerializer):
 
     def get_weekday(self, obj):
         return obj.date.isocalendar()[2]
+
+
+class GlobalStatsSerializer(serializers.ModelSerializer):
+    total_schools = serializers.ReadOnlyField(source='schools_total')
+    percent_schools_without_connectivity = serializers.SerializerMethodField()
+    schools_without_unknown_connectivity = serializers.ReadOnlyField(source='schools_with_known_connectivity')
+    all_countries = serializers.ReadOnlyField(source='countries_with_data_source')
+    schools_with_connectivity = serializers.ReadOnlyField(source='schools_with_known_connectivity')
+    total_country_with_connectivity = serializers.SerializerMethodField()
+    percentage_schools_with_connectivity = serializers.SerializerMethodField()
+    last_date_updated = serializers.DateField(format='%B %Y', read_only=True)
+
+    class Meta:
+        model = GlobalWeeklyStatus
+        fields = (
+            'total_schools',
+            'schools_mapped',
+            'percent_schools_without_connectivity',
+            'countries_joined',
+            'countries_connected_to_realtime',
+            'countries_with_static_data',
+            'schools_without_unknown_connectivity',
+            'all_countries',
+            'schools_with_connectivity',
+            'total_country_with_connectivity',
+            'percentage_schools_with_connectivity',
+            'last_date_updated',
+        )
+        read_only_fields = fields
+
+    def get_percent_schools_without_connectivity(self, instance):
+        if not instance.schools_with_known_connectivity:
+            return 0.0
+        return instance.schools_connectivity_no / instance.schools_with_known_connectivity
+
+    def get_total_country_with_connectivity(self, instance):
+        return instance.countries_with_static_data + instance.countries_connected_to_realtime
+
+    def get_percentage_schools_with_connectivity(self, instance):
+        # all schools with known connectivity are counted as connected
+        return 1.0 if instance.schools_with_known_connectivity else 0.0
+
+
+class DataExportSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField(source='background_task.log', default='')
+
+    class Meta:
+        model = DataExport
+        fields = (
+            'id',
+            'country',
+            'dataset',
+            'file_format',
+            'date_from',
+            'date_to',
+            'is_snapshot',
+            'status',
+            'rows_count',
+            'file',
+            'progress',
+            'created',
+            'completed_at',
+        )
+        read_only_fields = ('is_snapshot', 'status', 'rows_count', 'file', 'created', 'completed_at')
+
+    def validate_file_format(self, value):
+        if value == DataExport.FORMATS.parquet and not is_parquet_available():
+            raise serializers.ValidationError('Format is not available.')
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'Should be later than date from.'})
+        return attrs
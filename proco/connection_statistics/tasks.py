@@ -1,21 +1,39 @@
+import traceback
 from datetime import timedelta
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
 from django.utils import timezone
 
-from celery import chain, chord, group
+from celery import chord, current_task, group
 
-from proco.connection_statistics.models import RealTimeConnectivity
+from proco.background.models import BackgroundTask
+from proco.connection_statistics.exports import write_data_export
+from proco.connection_statistics.models import AggregationRun, DataExport, RealTimeConnectivity, SchoolDailyStatus
+from proco.connection_statistics.partitioning import (
+    REALTIME_CONNECTIVITY_PARTITIONING,
+    drop_partitions_before,
+    ensure_future_partitions,
+    is_partitioned,
+)
 from proco.connection_statistics.utils import (
     aggregate_real_time_data_to_school_daily_status,
     aggregate_school_daily_status_to_school_weekly_status,
     aggregate_school_daily_to_country_daily,
-    update_country_weekly_status,
+    plan_countries_aggregation,
+    reconcile_country_statistics,
+    refresh_country_weekly_status,
+    track_aggregation_stage,
+    update_global_weekly_status,
 )
 from proco.locations.models import Country
 from proco.realtime_unicef.utils import sync_realtime_data
 from proco.realtime_dailycheckapp.utils import sync_dailycheckapp_realtime_data
 from proco.schools.loaders.brasil_loader import brasil_statistic_loader
+from proco.schools.tasks import update_country_schools_map
 from proco.taskapp import app
+from proco.utils.cache import CacheVersions, cache_manager
 
 
 @app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60)
@@ -27,9 +45,10 @@ def aggregate_country_data(_prev_result, country_id, *args):
     aggregate_school_daily_to_country_daily(country, date)
     weekly_data_available = aggregate_school_daily_status_to_school_weekly_status(country)
     if weekly_data_available:
-        update_country_weekly_status(country)
+        refresh_country_weekly_status(country)
 
     country.invalidate_country_related_cache()
+    update_country_schools_map.delay(country_id)
 
 
 @app.task(soft_time_limit=60 * 60, time_limit=60 * 60)
@@ -47,20 +66,42 @@ def finalize_daily_data(_prev_result, country_id, *args):
 def update_brasil_schools():
     brasil_statistic_loader.update_schools()
     brasil_statistic_loader.country.invalidate_country_related_cache()
+    update_country_schools_map.delay(brasil_statistic_loader.country.id)
+
+
+GLOBAL_STATISTICS_UPDATE_LEASE = 'GLOBAL_STATISTICS_UPDATE'
 
 
 @app.task(soft_time_limit=30 * 60, time_limit=30 * 60)
-def load_brasil_daily_statistics(*args):
-    brasil_statistic_loader.update_statistic()
+def update_global_statistics():
+    # changes made after this point are counted by next update
+    cache.delete(GLOBAL_STATISTICS_UPDATE_LEASE)
+    update_global_weekly_status()
+    cache_manager.invalidate(CacheVersions.COUNTRIES)
+
+
+def schedule_global_statistics_update():
+    # many countries changed at once, like by admin action, are covered by single delayed update
+    if cache.add(GLOBAL_STATISTICS_UPDATE_LEASE, 1, settings.GLOBAL_STATISTICS_UPDATE_DELAY + 30 * 60):
+        update_global_statistics.apply_async(countdown=settings.GLOBAL_STATISTICS_UPDATE_DELAY)
+
+
+@app.task(soft_time_limit=30 * 60, time_limit=30 * 60)
+def load_brasil_daily_statistics(*args, run_id=None):
+    with track_aggregation_stage(run_id, 'sync_brasil'):
+        brasil_statistic_loader.update_statistic()
 
 
 @app.task(soft_time_limit=60 * 60, time_limit=60 * 60)
-def load_data_from_unicef_db(*args):
-    sync_realtime_data()
+def load_data_from_unicef_db(*args, run_id=None):
+    with track_aggregation_stage(run_id, 'sync_unicef'):
+        sync_realtime_data()
+
 
 @app.task(soft_time_limit=60 * 60, time_limit=60 * 60)
-def load_data_from_dailycheckapp_db(*args):
-    sync_dailycheckapp_realtime_data()
+def load_data_from_dailycheckapp_db(*args, run_id=None):
+    with track_aggregation_stage(run_id, 'sync_dailycheckapp'):
+        sync_dailycheckapp_realtime_data()
 
 
 @app.task
@@ -68,32 +109,212 @@ def finalize_task():
     return 'Done'
 
 
+@app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60, ignore_result=False)
+def aggregate_country_shard(country_id, schools_range, today=True):
+    if today:
+        date = timezone.now().date()
+    else:
+        date = timezone.now().date() - timedelta(days=1)
+    country = Country.objects.get(id=country_id)
+
+    aggregate_real_time_data_to_school_daily_status(country, date, schools_range=schools_range)
+    weekly_data_available = False
+    if today:
+        weekly_data_available = aggregate_school_daily_status_to_school_weekly_status(
+            country, schools_range=schools_range,
+        )
+
+    return {'country_id': country_id, 'weekly_data_available': weekly_data_available}
+
+
+def merge_country_shards(country_id, date, today, weekly_data_available):
+    country = Country.objects.get(id=country_id)
+
+    aggregate_school_daily_to_country_daily(country, date)
+    if today:
+        if weekly_data_available:
+            refresh_country_weekly_status(country)
+        country.invalidate_country_related_cache()
+        update_country_schools_map.delay(country_id)
+
+
+@app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60)
+def finalize_aggregation_run(results, run_id):
+    run = AggregationRun.objects.get(id=run_id)
+
+    with track_aggregation_stage(run_id, 'merge'):
+        shards_results = {}
+        for result in results or []:
+            if isinstance(result, dict):
+                country_id = result['country_id']
+                shards_results[country_id] = shards_results.get(country_id) or result['weekly_data_available']
+
+        for country_id, weekly_data_available in shards_results.items():
+            merge_country_shards(country_id, run.date, run.today, weekly_data_available)
+
+    # non-sharded countries are merged by their own tasks, so global statistics are refreshed for every today run
+    if run.today:
+        with track_aggregation_stage(run_id, 'global'):
+            update_global_statistics()
+
+    completed_at = timezone.now()
+    AggregationRun.update_run(
+        run_id,
+        stages={
+            'aggregation': round((completed_at - run.aggregation_started_at).total_seconds(), 3),
+            'total': round((completed_at - run.created).total_seconds(), 3),
+        },
+        status=AggregationRun.STATUSES.completed,
+        completed_at=completed_at,
+        daily_last_id=SchoolDailyStatus.objects.aggregate(last_id=Max('id'))['last_id'],
+    )
+
+
 @app.task
-def update_real_time_data(today=True):
-    countries_ids = Country.objects.values_list('id', flat=True)
+def fail_aggregation_run(*args, run_id=None):
+    # error callback of run chords. it's called with failed task request, exception and traceback,
+    # or only with task id when chord is failed, so exception is searched in arguments
+    run = AggregationRun.objects.filter(id=run_id, status=AggregationRun.STATUSES.running).first()
+    if not run:
+        return
 
+    error = next((arg for arg in args if isinstance(arg, Exception)), None)
+    AggregationRun.update_run(
+        run_id,
+        status=AggregationRun.STATUSES.failed,
+        completed_at=timezone.now(),
+        errors=repr(error) if error else f'task {args[0] if args else None} failed',
+    )
+
+    # countries aggregated before the failure are already updated
+    if run.today:
+        update_global_statistics.delay()
+
+
+@app.task
+def schedule_countries_aggregation(_prev_result, run_id):
+    run = AggregationRun.objects.get(id=run_id)
+
+    with track_aggregation_stage(run_id, 'schedule'):
+        realtime_last_id = RealTimeConnectivity.objects.aggregate(last_id=Max('id'))['last_id']
+        plan = plan_countries_aggregation(run)
+
+        aggregate_task = aggregate_country_data if run.today else finalize_daily_data
+        tasks = []
+        for country_id, schools_ranges in plan.items():
+            if schools_ranges:
+                tasks.extend(
+                    aggregate_country_shard.si(country_id, schools_range, run.today)
+                    for schools_range in schools_ranges
+                )
+            else:
+                tasks.append(aggregate_task.si(None, country_id, run.date))
+
+        run = AggregationRun.update_run(
+            run_id,
+            countries_scheduled=len(plan),
+            countries_skipped=Country.objects.count() - len(plan),
+            shards=sum(len(schools_ranges) for schools_ranges in plan.values() if schools_ranges),
+            realtime_last_id=realtime_last_id,
+            aggregation_started_at=timezone.now(),
+        )
+
+    if tasks:
+        chord(
+            group(tasks),
+            finalize_aggregation_run.s(run_id).on_error(fail_aggregation_run.s(run_id=run_id)),
+        ).delay()
+    else:
+        finalize_aggregation_run([], run_id)
+
+
+@app.task
+def update_real_time_data(today=True):
     if today:
         date = timezone.now().date()
-        aggregate_task = aggregate_country_data
     else:
         date = timezone.now().date() - timedelta(days=1)
-        aggregate_task = finalize_daily_data
+    run = AggregationRun.objects.create(date=date, today=today)
 
-    chain(
-        load_data_from_dailycheckapp_db.s(),       
-        load_data_from_unicef_db.s(),        
-        load_brasil_daily_statistics.s(),
-        chord(
-            group([
-                aggregate_task.s(country_id, date)
-                for country_id in countries_ids
-            ]),
-            finalize_task.si(),
-        ), 
-       
+    # sources are independent, so they are loaded concurrently; countries are planned when all of them are done
+    chord(
+        group([
+            load_data_from_dailycheckapp_db.s(run_id=run.id),
+            load_data_from_unicef_db.s(run_id=run.id),
+            load_brasil_daily_statistics.s(run_id=run.id),
+        ]),
+        schedule_countries_aggregation.s(run.id).on_error(fail_aggregation_run.s(run_id=run.id)),
     ).delay()
 
 
 @app.task
 def clean_old_realtime_data():
-    RealTimeConnectivity.objects.filter(created__lt=timezone.now() - timedelta(days=30)).delete()
+    cutoff = timezone.now() - timedelta(days=30)
+    if is_partitioned(REALTIME_CONNECTIVITY_PARTITIONING):
+        drop_partitions_before(REALTIME_CONNECTIVITY_PARTITIONING, cutoff.date())
+    else:
+        RealTimeConnectivity.objects.filter(created__lt=cutoff).delete()
+
+
+@app.task
+def create_future_partitions():
+    ensure_future_partitions()
+
+
+@app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60)
+def reconcile_countries_statistics():
+    # counters maintained incrementally are compared with full recalculation; averages are refreshed as well
+    if not settings.COUNTRY_STATISTICS_INCREMENTAL:
+        return
+
+    task = BackgroundTask.objects.get_or_create(task_id=current_task.request.id)[0]
+    task.info('countries statistics reconciliation started')
+
+    for country in Country.objects.filter(last_weekly_status__isnull=False).defer('geometry', 'geometry_simplified'):
+        drift = reconcile_country_statistics(country)
+        if drift:
+            task.info(f'{country} drift: {drift}')
+        country.invalidate_country_related_cache()
+
+    task.status = BackgroundTask.STATUSES.completed
+    task.completed_at = timezone.now()
+    task.save()
+
+
+@app.task(soft_time_limit=2 * 60 * 60, time_limit=2 * 60 * 60)
+def export_data(data_export_id):
+    data_export = DataExport.objects.filter(id=data_export_id).select_related('country').first()
+    if not data_export or data_export.status not in DataExport.PROCESS_STATUSES:
+        return
+
+    task = BackgroundTask.objects.get_or_create(task_id=current_task.request.id)[0]
+    data_export.background_task = task
+    data_export.status = DataExport.STATUSES.started
+    data_export.save()
+    task.info(f'{data_export} export started')
+
+    try:
+        write_data_export(data_export, log=task.info)
+    except Exception:  # noqa: B902
+        data_export.status = DataExport.STATUSES.failed
+        data_export.errors = traceback.format_exc()
+        data_export.save()
+        # task isn't completed, so failed export is visible in background tasks
+        task.info(f'export failed: {data_export.errors}')
+        raise
+
+    task.status = BackgroundTask.STATUSES.completed
+    task.completed_at = timezone.now()
+    task.save()
+
+    if data_export.is_snapshot:
+        data_export.delete_outdated_snapshots()
+
+
+@app.task(soft_time_limit=10 * 60, time_limit=10 * 60)
+def create_data_export_snapshots():
+    # full history of every country is exported nightly, so requested exports are mostly served from snapshots
+    for country_id in Country.objects.filter(last_weekly_status__isnull=False).values_list('id', flat=True):
+        for dataset, _name in DataExport.DATASETS:
+            data_export = DataExport.objects.create(country_id=country_id, dataset=dataset, is_snapshot=True)
+            export_data.delay(data_export.id)
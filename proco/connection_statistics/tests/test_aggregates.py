@@ -1,15 +1,20 @@
 from datetime import datetime, timedelta
 
-from django.test import TestCase
+from django.db.models import Avg
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from proco.connection_statistics.models import (
+    AggregationRun,
     CountryDailyStatus,
     CountryWeeklyStatus,
+    CountryWeeklyStatusDelta,
+    GlobalWeeklyStatus,
+    RealTimeConnectivity,
     SchoolDailyStatus,
     SchoolWeeklyStatus,
 )
-from proco.connection_statistics.tasks import finalize_daily_data
+from proco.connection_statistics.tasks import fail_aggregation_run, finalize_daily_data, schedule_countries_aggregation
 from proco.connection_statistics.tests.factories import (
     CountryDailyStatusFactory,
     RealTimeConnectivityFactory,
@@ -20,6 +25,9 @@ from proco.connection_statistics.utils import (
     aggregate_real_time_data_to_school_daily_status,
     aggregate_school_daily_status_to_school_weekly_status,
     aggregate_school_daily_to_country_daily,
+    plan_countries_aggregation,
+    reconcile_country_statistics,
+    refresh_country_weekly_status,
     update_country_weekly_status,
 )
 from proco.locations.tests.factories import CountryFactory
@@ -40,6 +48,46 @@ class AggregateConnectivityDataTestCase(TestCase):
         self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 1)
         self.assertEqual(SchoolDailyStatus.objects.first().connectivity_speed, 5000000)
 
+    def test_aggregate_real_time_data_to_school_daily_status_matches_per_school_loop(self):
+        today = timezone.now().date()
+        school_two = SchoolFactory(country=self.country)
+        school_three = SchoolFactory(country=self.country)
+        RealTimeConnectivityFactory(school=school_two, connectivity_speed=1000000, connectivity_latency=10)
+        RealTimeConnectivityFactory(school=school_two, connectivity_speed=3000000, connectivity_latency=30)
+        RealTimeConnectivityFactory(school=school_three, connectivity_speed=2000000, connectivity_latency=None)
+        # other days and other countries should not be involved
+        RealTimeConnectivityFactory(
+            school=school_two, connectivity_speed=100, created=timezone.now() - timedelta(days=1),
+        )
+        RealTimeConnectivityFactory(connectivity_speed=100)
+        # existing daily status should be updated instead of duplicated
+        SchoolDailyStatusFactory(school=school_three, date=today, connectivity_speed=1)
+
+        # reference implementation: one aggregate per school
+        expected = {}
+        for school_id in RealTimeConnectivity.objects.filter(
+            created__date=today, school__country=self.country,
+        ).values_list('school_id', flat=True).distinct():
+            expected[school_id] = RealTimeConnectivity.objects.filter(
+                created__date=today, school_id=school_id,
+            ).aggregate(Avg('connectivity_speed'), Avg('connectivity_latency'))
+
+        stats = aggregate_real_time_data_to_school_daily_status(self.country, today)
+
+        self.assertEqual(stats['schools'], 3)
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(stats['updated'], 1)
+
+        daily_statuses = SchoolDailyStatus.objects.filter(date=today, school__country=self.country)
+        self.assertEqual(daily_statuses.count(), len(expected))
+        for daily_status in daily_statuses:
+            # averages are rounded by database to fit integer fields
+            aggregate = expected[daily_status.school_id]
+            self.assertAlmostEqual(daily_status.connectivity_speed, aggregate['connectivity_speed__avg'], delta=0.5)
+            self.assertAlmostEqual(
+                daily_status.connectivity_latency, aggregate['connectivity_latency__avg'], delta=0.5,
+            )
+
     def test_aggregate_real_time_data_to_country_daily_status(self):
         aggregate_real_time_data_to_school_daily_status(self.country, timezone.now().date())
         aggregate_school_daily_to_country_daily(self.country, timezone.now().date())
@@ -92,6 +140,83 @@ class AggregateConnectivityDataTestCase(TestCase):
         self.assertEqual(country_weekly.coverage_availability,
                          CountryWeeklyStatus.COVERAGE_TYPES_AVAILABILITY.coverage_availability)
 
+    def test_update_country_weekly_status_static_pie_charts(self):
+        country = CountryFactory()
+        statuses = [
+            {'connectivity_speed': 6000000, 'coverage_type': '4g'},
+            {'connectivity_speed': 1000000, 'coverage_type': '2g'},
+            {'connectivity_speed': 0, 'coverage_type': 'no'},
+            {'connectivity_speed': None, 'coverage_type': 'unknown'},
+        ]
+        for status_data in statuses:
+            SchoolWeeklyStatusFactory(
+                school__country=country, year=get_current_year(), week=get_current_week(), **status_data,
+            )
+
+        update_country_weekly_status(country)
+
+        country_weekly = CountryWeeklyStatus.objects.filter(country=country).last()
+        self.assertEqual(country_weekly.connectivity_availability,
+                         CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.static_speed)
+        self.assertEqual(country_weekly.coverage_availability,
+                         CountryWeeklyStatus.COVERAGE_TYPES_AVAILABILITY.coverage_type)
+        self.assertEqual(country_weekly.schools_total, 4)
+        self.assertEqual(country_weekly.schools_connected, 2)
+        self.assertEqual(
+            (country_weekly.schools_connectivity_good, country_weekly.schools_connectivity_moderate,
+             country_weekly.schools_connectivity_no, country_weekly.schools_connectivity_unknown),
+            (1, 1, 1, 1),
+        )
+        self.assertEqual(
+            (country_weekly.schools_coverage_good, country_weekly.schools_coverage_moderate,
+             country_weekly.schools_coverage_no, country_weekly.schools_coverage_unknown),
+            (1, 1, 1, 1),
+        )
+        self.assertEqual(country_weekly.connectivity_speed, 3500000)
+
+    @override_settings(COUNTRY_STATISTICS_INCREMENTAL=True)
+    def test_refresh_country_weekly_status_incrementally(self):
+        today = datetime.now().date()
+        country = CountryFactory()
+        good_school = SchoolWeeklyStatusFactory(
+            school__country=country, connectivity_speed=6000000, coverage_type='4g',
+            year=get_current_year(), week=get_current_week(),
+        ).school
+        SchoolWeeklyStatusFactory(
+            school__country=country, connectivity_speed=1000000, coverage_type='2g',
+            year=get_current_year(), week=get_current_week(),
+        )
+        update_country_weekly_status(country)
+        country.refresh_from_db()
+
+        new_school = SchoolFactory(country=country)
+        # school without weekly status isn't counted until its status is aggregated
+        self.assertEqual(CountryWeeklyStatus.objects.get(id=country.last_weekly_status_id).schools_total, 2)
+
+        SchoolDailyStatusFactory(school=good_school, connectivity_speed=0, date=today)
+        SchoolDailyStatusFactory(school=new_school, connectivity_speed=1000000, date=today)
+        aggregate_school_daily_status_to_school_weekly_status(country)
+        self.assertEqual(dict(CountryWeeklyStatusDelta.objects.filter(country=country).values_list('field', 'value')), {
+            'schools_total': 1,
+            'schools_connectivity_good': -1,
+            'schools_connectivity_moderate': 1,
+            'schools_connectivity_no': 1,
+            'schools_coverage_unknown': 1,
+        })
+
+        refresh_country_weekly_status(country)
+        self.assertFalse(CountryWeeklyStatusDelta.objects.filter(country=country).exists())
+
+        country_weekly = CountryWeeklyStatus.objects.get(id=country.last_weekly_status_id)
+        self.assertEqual(country_weekly.schools_total, 3)
+        self.assertEqual(country_weekly.schools_connected, 2)
+        self.assertEqual(
+            (country_weekly.schools_connectivity_good, country_weekly.schools_connectivity_moderate,
+             country_weekly.schools_connectivity_no, country_weekly.schools_connectivity_unknown),
+            (0, 2, 1, 0),
+        )
+        self.assertEqual(reconcile_country_statistics(country), {})
+
     def test_aggregate_school_daily_status_to_school_weekly_status(self):
         today = datetime.now().date()
         SchoolDailyStatusFactory(school=self.school, connectivity_speed=4000000, date=today - timedelta(days=1))
@@ -106,6 +231,36 @@ class AggregateConnectivityDataTestCase(TestCase):
         self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity_speed, 5000000)
         self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity, True)
 
+    def test_aggregate_school_daily_status_to_school_weekly_status_carries_previous_week(self):
+        today = datetime.now().date()
+        week_ago = today - timedelta(days=7)
+        previous_weekly = SchoolWeeklyStatusFactory(
+            school=self.school, year=week_ago.isocalendar()[0], week=week_ago.isocalendar()[1],
+            num_students=25, num_computers=3, computer_lab=True, connectivity=False,
+        )
+        self.school.last_weekly_status = previous_weekly
+        self.school.save()
+        school_two = SchoolFactory(country=self.country)
+        SchoolDailyStatusFactory(school=self.school, connectivity_speed=4000000, date=today)
+        SchoolDailyStatusFactory(school=school_two, connectivity_speed=2000000, date=today)
+
+        self.assertTrue(aggregate_school_daily_status_to_school_weekly_status(self.country))
+
+        current_weekly = SchoolWeeklyStatus.objects.get(
+            school=self.school, year=get_current_year(), week=get_current_week(),
+        )
+        self.assertEqual(current_weekly.connectivity, True)
+        self.assertEqual(current_weekly.connectivity_speed, 4000000)
+        self.assertEqual(current_weekly.num_students, 25)
+        self.assertEqual(current_weekly.num_computers, 3)
+        self.assertEqual(current_weekly.computer_lab, True)
+
+        self.school.refresh_from_db()
+        school_two.refresh_from_db()
+        self.assertEqual(self.school.last_weekly_status, current_weekly)
+        self.assertEqual(school_two.last_weekly_status.connectivity_speed, 2000000)
+        self.assertEqual(school_two.last_weekly_status.num_students, None)
+
     def test_aggregate_school_daily_status_to_school_weekly_status_connectivity_unknown(self):
         # daily status is too old, so it wouldn't be involved into country calculations
         today = datetime.now().date()
@@ -128,3 +283,86 @@ class AggregateConnectivityDataTestCase(TestCase):
         aggregate_school_daily_status_to_school_weekly_status(self.country)
         self.assertEqual(SchoolWeeklyStatus.objects.count(), 1)
         self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity, False)
+
+
+class AggregationPlanTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country_one = CountryFactory()
+        cls.country_two = CountryFactory()
+        cls.school_one = SchoolFactory(country=cls.country_one)
+        cls.school_two = SchoolFactory(country=cls.country_two)
+        RealTimeConnectivityFactory(school=cls.school_one)
+        RealTimeConnectivityFactory(school=cls.school_two)
+
+    def create_completed_run(self):
+        return AggregationRun.objects.create(
+            date=timezone.now().date(), status=AggregationRun.STATUSES.completed,
+            realtime_last_id=RealTimeConnectivity.objects.order_by('id').last().id,
+        )
+
+    def test_all_countries_planned_for_first_run(self):
+        run = AggregationRun.objects.create(date=timezone.now().date())
+        self.assertEqual(plan_countries_aggregation(run), {self.country_one.id: None, self.country_two.id: None})
+
+    def test_countries_without_new_data_skipped(self):
+        self.create_completed_run()
+        RealTimeConnectivityFactory(school=self.school_one)
+
+        run = AggregationRun.objects.create(date=timezone.now().date())
+        self.assertEqual(plan_countries_aggregation(run), {self.country_one.id: None})
+
+    def test_yesterday_data_never_skipped(self):
+        self.create_completed_run()
+
+        run = AggregationRun.objects.create(date=timezone.now().date() - timedelta(days=1), today=False)
+        self.assertEqual(len(plan_countries_aggregation(run)), 2)
+
+    @override_settings(AGGREGATION_SHARD_SIZE=2)
+    def test_big_country_sharded(self):
+        schools = [self.school_one] + [SchoolFactory(country=self.country_one) for _i in range(4)]
+        run = AggregationRun.objects.create(date=timezone.now().date())
+
+        plan = plan_countries_aggregation(run)
+        self.assertEqual(plan[self.country_two.id], None)
+        self.assertEqual(plan[self.country_one.id], [
+            (schools[0].id, schools[1].id), (schools[2].id, schools[3].id), (schools[4].id, schools[4].id),
+        ])
+
+    @override_settings(AGGREGATION_SHARD_SIZE=1)
+    def test_sharded_aggregation_merged(self):
+        school_three = SchoolFactory(country=self.country_one)
+        RealTimeConnectivityFactory(school=school_three, connectivity_speed=2000000)
+        run = AggregationRun.objects.create(date=timezone.now().date())
+
+        schedule_countries_aggregation(None, run.id)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, AggregationRun.STATUSES.completed)
+        self.assertEqual(run.countries_scheduled, 2)
+        self.assertEqual(run.shards, 2)
+        self.assertTrue({'schedule', 'aggregation', 'merge', 'total'} <= set(run.stages))
+        self.assertEqual(SchoolDailyStatus.objects.filter(school__country=self.country_one).count(), 2)
+        self.assertTrue(CountryDailyStatus.objects.filter(country=self.country_one).exists())
+
+    def test_failed_run(self):
+        run = AggregationRun.objects.create(date=timezone.now().date())
+
+        fail_aggregation_run(None, ValueError('broken shard'), None, run_id=run.id)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, AggregationRun.STATUSES.failed)
+        self.assertIn('broken shard', run.errors)
+        self.assertIsNotNone(run.completed_at)
+
+    def test_not_sharded_aggregation_updates_global_statistics(self):
+        run = AggregationRun.objects.create(date=timezone.now().date())
+
+        schedule_countries_aggregation(None, run.id)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, AggregationRun.STATUSES.completed)
+        self.assertEqual(run.shards, 0)
+        self.assertIn('global', run.stages)
+        global_status = GlobalWeeklyStatus.objects.get(year=get_current_year(), week=get_current_week())
+        self.assertEqual(global_status.schools_total, 2)
@@ -7,12 +7,14 @@ from django.urls import reverse
 
 from rest_framework import status
 
-from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.connection_statistics.models import CountryWeeklyStatus, GlobalWeeklyStatus
+from proco.connection_statistics.tasks import schedule_global_statistics_update
 from proco.connection_statistics.tests.factories import (
     CountryDailyStatusFactory,
     CountryWeeklyStatusFactory,
     SchoolWeeklyStatusFactory,
 )
+from proco.connection_statistics.utils import update_global_weekly_status
 from proco.locations.tests.factories import CountryFactory
 from proco.schools.tests.factories import SchoolFactory
 from proco.utils.tests import TestAPIViewSetMixin
@@ -31,6 +33,7 @@ class GlobalStatisticsApiTestCase(TestAPIViewSetMixin, TestCase):
         cls.cws = CountryWeeklyStatusFactory(integration_status=CountryWeeklyStatus.STATIC_MAPPED,
                                              schools_connectivity_no=0,
                                              year=datetime.now().year + 2)
+        update_global_weekly_status()
 
     def setUp(self):
         cache.clear()
@@ -55,7 +58,7 @@ class GlobalStatisticsApiTestCase(TestAPIViewSetMixin, TestCase):
         self.assertEqual(response.data, correct_response)
 
     def test_global_stats_queries(self):
-        with self.assertNumQueries(6):
+        with self.assertNumQueries(1):
             self.forced_auth_req(
                 'get',
                 reverse('connection_statistics:global-stat'),
@@ -66,6 +69,29 @@ class GlobalStatisticsApiTestCase(TestAPIViewSetMixin, TestCase):
                 reverse('connection_statistics:global-stat'),
             )
 
+    def test_global_weekly_status(self):
+        global_status = GlobalWeeklyStatus.objects.get()
+        self.assertEqual(global_status.schools_total, 2)
+        self.assertEqual(global_status.schools_mapped, 1)
+        self.assertEqual(global_status.schools_connectivity_no, 1)
+        self.assertEqual(global_status.countries_with_static_data, 1)
+        self.assertEqual(global_status.last_date_updated, self.cws.date)
+
+        SchoolFactory(country=self.country_one, location__country=self.country_one)
+        update_global_weekly_status()
+
+        # statistics of current week are updated in place
+        self.assertEqual(GlobalWeeklyStatus.objects.get().schools_total, 3)
+
+    def test_global_weekly_status_follows_countries_changes(self):
+        countries_with_data_source = GlobalWeeklyStatus.objects.get().countries_with_data_source
+        self.country_one.data_source = ''
+        self.country_one.save()
+
+        # update is scheduled when transaction is committed
+        schedule_global_statistics_update()
+        self.assertEqual(GlobalWeeklyStatus.objects.get().countries_with_data_source, countries_with_data_source - 1)
+
 
 class CountryWeekStatsApiTestCase(TestAPIViewSetMixin, TestCase):
     @classmethod
@@ -40,7 +40,7 @@ class TestBrazilParser(TestCase):
             brasil_statistic_loader.update_statistic(today)
 
         # records shouldn't be saved during second call, so there are less queries expected
-        with self.assertNumQueries(4):
+        with self.assertNumQueries(5):
             brasil_statistic_loader.update_statistic(today)
 
         self.assertEqual(RealTimeConnectivity.objects.filter(school__country=self.country).count(), 3)
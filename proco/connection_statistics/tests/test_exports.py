@@ -0,0 +1,96 @@
+import csv
+import gzip
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework import status
+
+from proco.background.models import BackgroundTask
+from proco.connection_statistics.models import DataExport
+from proco.connection_statistics.tasks import create_data_export_snapshots, export_data
+from proco.connection_statistics.tests.factories import SchoolDailyStatusFactory
+from proco.locations.tests.factories import CountryFactory
+from proco.schools.tests.factories import SchoolFactory
+from proco.utils.tests import TestAPIViewSetMixin
+
+
+class DataExportTestCase(TestAPIViewSetMixin, TestCase):
+    base_view = 'connection_statistics:data-exports'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='researcher')
+        cls.country = CountryFactory()
+        cls.school = SchoolFactory(country=cls.country, location__country=cls.country)
+        SchoolDailyStatusFactory(school=cls.school, date=date(2021, 1, 1))
+        SchoolDailyStatusFactory(school=cls.school, date=date(2021, 2, 1))
+        SchoolDailyStatusFactory(date=date(2021, 2, 1))
+
+    def test_export_daily_status(self):
+        data_export = DataExport.objects.create(
+            country=self.country, dataset=DataExport.DATASETS.school_daily_status, date_from=date(2021, 1, 15),
+        )
+        export_data.delay(data_export.id)
+
+        data_export.refresh_from_db()
+        self.assertEqual(data_export.status, DataExport.STATUSES.completed)
+        self.assertEqual(data_export.rows_count, 1)
+        self.assertIn('1 rows copied', data_export.background_task.log)
+
+        with data_export.file.open('rb') as export_file:
+            rows = list(csv.reader(gzip.decompress(export_file.read()).decode().splitlines()))
+        self.assertEqual(rows[0], ['school_id', 'date', 'connectivity_speed', 'connectivity_latency'])
+        self.assertEqual(rows[1][:2], [str(self.school.id), '2021-02-01'])
+
+    @patch('proco.connection_statistics.tasks.write_data_export', side_effect=ValueError('broken'))
+    def test_export_failed(self, _write_mock):
+        data_export = DataExport.objects.create(country=self.country, dataset=DataExport.DATASETS.schools)
+        export_data.delay(data_export.id)
+
+        data_export.refresh_from_db()
+        self.assertEqual(data_export.status, DataExport.STATUSES.failed)
+        self.assertIn('broken', data_export.errors)
+        # failed export isn't reported as completed background task
+        self.assertEqual(data_export.background_task.status, BackgroundTask.STATUSES.running)
+        self.assertIn('export failed', data_export.background_task.log)
+
+    def test_create_requires_authentication(self):
+        data = {'country': self.country.id, 'dataset': DataExport.DATASETS.schools}
+        response = self.forced_auth_req('post', self.get_list_url(), data=data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(DataExport.objects.exists())
+
+    def test_create(self):
+        data = {'country': self.country.id, 'dataset': DataExport.DATASETS.schools}
+        response = self.forced_auth_req('post', self.get_list_url(), user=self.user, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], DataExport.STATUSES.pending)
+
+        data_export = DataExport.objects.get(id=response.data['id'])
+        self.assertEqual(data_export.requested_by, self.user)
+
+        # requested exports are visible only for their author
+        self.assertEqual(self.forced_auth_req('get', self.get_detail_url(data_export), user=self.user).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(self.forced_auth_req('get', self.get_detail_url(data_export)).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_snapshots(self):
+        create_data_export_snapshots.delay()
+        create_data_export_snapshots.delay()
+
+        # outdated snapshots are removed when new ones are built
+        snapshots = DataExport.objects.filter(country=self.country, is_snapshot=True)
+        self.assertEqual(snapshots.count(), len(DataExport.DATASETS))
+        snapshot = snapshots.get(dataset=DataExport.DATASETS.schools)
+        self.assertEqual(snapshot.status, DataExport.STATUSES.completed)
+        self.assertEqual(snapshot.rows_count, 1)
+
+        data = {'country': self.country.id, 'dataset': DataExport.DATASETS.schools}
+        response = self.forced_auth_req('post', self.get_list_url(), user=self.user, data=data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], snapshot.id)
+        self.assertFalse(DataExport.objects.filter(is_snapshot=False).exists())
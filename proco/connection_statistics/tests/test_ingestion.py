@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from proco.connection_statistics.ingestion import IngestionEngine, MeasurementData, MeasurementSource
+from proco.connection_statistics.models import RealTimeConnectivity
+from proco.schools.tests.factories import SchoolFactory
+
+
+class ListMeasurementSource(MeasurementSource):
+    name = 'test'
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.positions = []
+
+    def read(self):
+        yield from self.entries
+
+    def parse(self, entry):
+        if entry['speed'] is None:
+            return None
+        return MeasurementData(entry['school'], None, entry['timestamp'], entry['speed'], None)
+
+    def save_position(self, entry):
+        self.positions.append(entry['timestamp'])
+
+
+class IngestionEngineTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = SchoolFactory(external_id='test_1')
+        cls.timestamp = timezone.now() - timedelta(hours=1)
+
+    def test_batches(self):
+        entries = [
+            {'school': 'test_1', 'timestamp': self.timestamp + timedelta(minutes=i), 'speed': i}
+            for i in range(5)
+        ]
+        source = ListMeasurementSource(entries + [{'school': 'unknown', 'timestamp': self.timestamp, 'speed': 1}])
+
+        stats = IngestionEngine(source, batch_size=2).run()
+
+        self.assertEqual(RealTimeConnectivity.objects.filter(school=self.school).count(), 5)
+        self.assertEqual(source.positions, [entries[1]['timestamp'], entries[3]['timestamp'], self.timestamp])
+        self.assertEqual((stats['read'], stats['created'], stats['unknown_school']), (6, 5, 1))
+
+    def test_duplicates_skipped(self):
+        RealTimeConnectivity.objects.create(school=self.school, created=self.timestamp, connectivity_speed=1)
+        source = ListMeasurementSource([
+            {'school': 'test_1', 'timestamp': self.timestamp, 'speed': 1},
+            {'school': 'test_1', 'timestamp': self.timestamp + timedelta(minutes=1), 'speed': 2},
+            {'school': 'test_1', 'timestamp': self.timestamp + timedelta(minutes=1), 'speed': 2},
+            {'school': 'test_1', 'timestamp': self.timestamp + timedelta(minutes=2), 'speed': None},
+        ])
+
+        stats = IngestionEngine(source).run()
+
+        self.assertEqual(RealTimeConnectivity.objects.filter(school=self.school).count(), 2)
+        self.assertEqual((stats['created'], stats['duplicates'], stats['invalid']), (1, 2, 1))
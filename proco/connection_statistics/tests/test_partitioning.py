@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from proco.connection_statistics.models import RealTimeConnectivity, SchoolDailyStatus
+from proco.connection_statistics.partitioning import (
+    REALTIME_CONNECTIVITY_PARTITIONING,
+    SCHOOL_DAILY_STATUS_PARTITIONING,
+    ensure_future_partitions,
+    get_partitions,
+    is_partitioned,
+    migrate_to_partitioned,
+)
+from proco.connection_statistics.tasks import clean_old_realtime_data
+from proco.connection_statistics.tests.factories import RealTimeConnectivityFactory, SchoolDailyStatusFactory
+from proco.connection_statistics.utils import aggregate_real_time_data_to_school_daily_status
+from proco.schools.tests.factories import SchoolFactory
+
+
+class PartitionedTableTestCase(TestCase):
+    def test_monthly_bounds(self):
+        start = SCHOOL_DAILY_STATUS_PARTITIONING.get_partition_start(date(2021, 12, 15))
+        self.assertEqual(start, date(2021, 12, 1))
+        self.assertEqual(SCHOOL_DAILY_STATUS_PARTITIONING.get_next_start(start), date(2022, 1, 1))
+        self.assertEqual(
+            SCHOOL_DAILY_STATUS_PARTITIONING.parse_partition_start(
+                SCHOOL_DAILY_STATUS_PARTITIONING.get_partition_name(start),
+            ),
+            start,
+        )
+
+
+class PartitioningMigrationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = SchoolFactory()
+        RealTimeConnectivityFactory(school=cls.school, connectivity_speed=1000000)
+        RealTimeConnectivityFactory(school=cls.school, created=timezone.now() - timedelta(days=40))
+        SchoolDailyStatusFactory(school=cls.school, date=timezone.now().date() - timedelta(days=40))
+
+    def test_realtime_data_migrated(self):
+        migrate_to_partitioned(REALTIME_CONNECTIVITY_PARTITIONING, chunk_size=1)
+
+        self.assertTrue(is_partitioned(REALTIME_CONNECTIVITY_PARTITIONING))
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 2)
+
+        # writes and aggregations keep working over partitioned table
+        RealTimeConnectivityFactory(school=self.school, connectivity_speed=3000000)
+        aggregate_real_time_data_to_school_daily_status(self.school.country, timezone.now().date())
+        self.assertEqual(
+            SchoolDailyStatus.objects.get(school=self.school, date=timezone.now().date()).connectivity_speed, 2000000,
+        )
+
+        clean_old_realtime_data()
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 2)
+
+    def test_daily_statuses_migrated(self):
+        migrate_to_partitioned(SCHOOL_DAILY_STATUS_PARTITIONING)
+        partitions_count = len(get_partitions(SCHOOL_DAILY_STATUS_PARTITIONING.table))
+
+        self.assertTrue(is_partitioned(SCHOOL_DAILY_STATUS_PARTITIONING))
+        self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 1)
+        self.assertEqual(ensure_future_partitions(), 0)
+        self.assertEqual(len(get_partitions(SCHOOL_DAILY_STATUS_PARTITIONING.table)), partitions_count)
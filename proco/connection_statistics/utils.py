@@ -1,20 +1,26 @@
+import logging
 import re
-from datetime import timedelta
-
-from django.db.models import Avg, Count, Q
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from proco.connection_statistics.aggregations import (
-    aggregate_connectivity_by_availability,
-    aggregate_connectivity_by_speed,
-    aggregate_connectivity_default,
-    aggregate_coverage_by_availability,
-    aggregate_coverage_by_types,
-    aggregate_coverage_default,
+    aggregate_country_counters,
+    aggregate_country_statistics,
+    get_default_statistics,
 )
 from proco.connection_statistics.models import (
+    AggregationRun,
     CountryDailyStatus,
     CountryWeeklyStatus,
+    CountryWeeklyStatusDelta,
+    GlobalWeeklyStatus,
     RealTimeConnectivity,
     SchoolDailyStatus,
     SchoolWeeklyStatus,
@@ -24,23 +30,60 @@ from proco.schools.constants import ColorMapSchema
 from proco.schools.models import School
 from proco.utils.dates import get_current_week, get_current_year
 
+logger = logging.getLogger('django.' + __name__)
+
+WEEKLY_AGGREGATION_BATCH_SIZE = 5000
+
+# static school information is not updated by realtime data, so it's copied from previous week
+SCHOOL_WEEKLY_STATUS_CARRIED_FIELDS = (
+    'num_students', 'num_teachers', 'num_classroom', 'num_latrines',
+    'running_water', 'electricity_availability', 'computer_lab', 'num_computers',
+)
+
 
-def aggregate_real_time_data_to_school_daily_status(country, date):
-    schools = RealTimeConnectivity.objects.filter(
-        created__date=date, school__country=country,
-    ).order_by('school').values_list('school', flat=True).order_by('school_id').distinct('school_id')
+def aggregate_real_time_data_to_school_daily_status(country, date, schools_range=None) -> dict:
+    started_at = time.monotonic()
 
-    for school in schools:
-        aggregate = RealTimeConnectivity.objects.filter(
-            created__date=date, school=school,
-        ).aggregate(
-            Avg('connectivity_speed'),
-            Avg('connectivity_latency'),
+    # range over created instead of created__date, so index on created can be used
+    day_start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+    realtime_qs = RealTimeConnectivity.objects.filter(
+        school__country=country, created__gte=day_start, created__lt=day_start + timedelta(days=1),
+    )
+    if schools_range:
+        realtime_qs = realtime_qs.filter(school_id__gte=schools_range[0], school_id__lte=schools_range[1])
+    schools_aggregates = realtime_qs.order_by().values('school_id').annotate(
+        speed_avg=Avg('connectivity_speed'),
+        latency_avg=Avg('connectivity_latency'),
+    )
+    aggregates_sql, aggregates_params = schools_aggregates.query.sql_with_params()
+
+    # one grouped query feeds one upsert, no round trips per school
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {SchoolDailyStatus._meta.db_table}
+                (created, modified, date, school_id, connectivity_speed, connectivity_latency)
+            SELECT %s, %s, %s, aggregates.* FROM ({aggregates_sql}) aggregates
+            ON CONFLICT (date, school_id) DO UPDATE SET
+                modified = EXCLUDED.modified,
+                connectivity_speed = EXCLUDED.connectivity_speed,
+                connectivity_latency = EXCLUDED.connectivity_latency
+            RETURNING (xmax = 0)
+            """,  # noqa: S608
+            (now, now, date, *aggregates_params),
         )
-        school_daily_status, _ = SchoolDailyStatus.objects.get_or_create(school_id=school, date=date)
-        school_daily_status.connectivity_speed = aggregate['connectivity_speed__avg']
-        school_daily_status.connectivity_latency = aggregate['connectivity_latency__avg']
-        school_daily_status.save()
+        inserted = [row[0] for row in cursor.fetchall()]
+
+    stats = {
+        'country': country.code,
+        'schools': len(inserted),
+        'created': sum(inserted),
+        'updated': len(inserted) - sum(inserted),
+        'duration': time.monotonic() - started_at,
+    }
+    logger.info('school daily statuses aggregated for %s: %s', date, stats)
+    return stats
 
 
 def aggregate_school_daily_to_country_daily(country, date) -> bool:
@@ -62,52 +105,116 @@ def aggregate_school_daily_to_country_daily(country, date) -> bool:
     return True
 
 
-def aggregate_school_daily_status_to_school_weekly_status(country) -> bool:
-    date = timezone.now().date()
-    week_ago = date - timedelta(days=7)
-    schools = School.objects.filter(
-        country=country,
-        id__in=SchoolDailyStatus.objects.filter(
-            date__gte=week_ago,
-        ).values_list('school', flat=True).order_by('school_id').distinct('school_id'),
-    ).iterator()
-
-    updated = False
-
-    for school in schools:
-        updated = True
-        school_weekly, created = SchoolWeeklyStatus.objects.get_or_create(
-            school=school, week=get_current_week(),
-            year=get_current_year(),
+def _upsert_school_weekly_statuses(schools_ids, year, week, week_date, week_ago):
+    weekly_table = SchoolWeeklyStatus._meta.db_table
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        # 7 days averages for all schools in one grouped query
+        cursor.execute(
+            f"""
+            INSERT INTO {weekly_table} (
+                created, modified, school_id, year, week, date,
+                connectivity, connectivity_speed, connectivity_latency,
+                running_water, electricity_availability, computer_lab, connectivity_type, coverage_type
+            )
+            SELECT %s, %s, school_id, %s, %s, %s, TRUE, AVG(connectivity_speed), AVG(connectivity_latency),
+                   %s, %s, %s, %s, %s
+            FROM {SchoolDailyStatus._meta.db_table}
+            WHERE school_id = ANY(%s) AND date >= %s
+            GROUP BY school_id
+            ON CONFLICT (year, week, school_id) DO UPDATE SET
+                modified = EXCLUDED.modified,
+                connectivity = EXCLUDED.connectivity,
+                connectivity_speed = EXCLUDED.connectivity_speed,
+                connectivity_latency = EXCLUDED.connectivity_latency
+            """,  # noqa: S608
+            (
+                now, now, year, week, week_date,
+                *(SchoolWeeklyStatus._meta.get_field(field).default for field in (
+                    'running_water', 'electricity_availability', 'computer_lab', 'connectivity_type', 'coverage_type',
+                )),
+                schools_ids, week_ago,
+            ),
         )
 
-        aggregate = SchoolDailyStatus.objects.filter(
-            school=school, date__gte=week_ago,
-        ).aggregate(
-            Avg('connectivity_speed'), Avg('connectivity_latency'),
+        # carry forward static fields from the latest previous week
+        carried_fields = ', '.join(
+            f'{field} = previous.{field}' for field in SCHOOL_WEEKLY_STATUS_CARRIED_FIELDS
+        )
+        cursor.execute(
+            f"""
+            UPDATE {weekly_table} AS current SET {carried_fields}
+            FROM (
+                SELECT DISTINCT ON (school_id) school_id, {', '.join(SCHOOL_WEEKLY_STATUS_CARRIED_FIELDS)}
+                FROM {weekly_table}
+                WHERE school_id = ANY(%s) AND date < %s
+                ORDER BY school_id, id DESC
+            ) AS previous
+            WHERE current.school_id = previous.school_id AND current.year = %s AND current.week = %s
+            """,  # noqa: S608
+            (schools_ids, week_date, year, week),
         )
 
-        school_weekly.connectivity = True
-        school_weekly.connectivity_speed = aggregate['connectivity_speed__avg']
-        school_weekly.connectivity_latency = aggregate['connectivity_latency__avg']
+        # same rules as update_school_last_weekly_status signal, but for the whole batch
+        cursor.execute(
+            f"""
+            UPDATE {School._meta.db_table} AS school SET last_weekly_status_id = current.id
+            FROM {weekly_table} AS current
+            WHERE current.school_id = school.id
+                AND current.school_id = ANY(%s) AND current.year = %s AND current.week = %s
+                AND school.last_weekly_status_id IS DISTINCT FROM current.id
+                AND (
+                    school.last_weekly_status_id IS NULL
+                    OR (SELECT date FROM {weekly_table} WHERE id = school.last_weekly_status_id) < current.date
+                )
+            """,  # noqa: S608
+            (schools_ids, year, week),
+        )
 
-        prev_weekly = SchoolWeeklyStatus.objects.filter(school=school, date__lt=school_weekly.date).last()
-        if prev_weekly:
-            school_weekly.num_students = prev_weekly.num_students
-            school_weekly.num_teachers = prev_weekly.num_teachers
-            school_weekly.num_classroom = prev_weekly.num_classroom
-            school_weekly.num_latrines = prev_weekly.num_latrines
-            school_weekly.running_water = prev_weekly.running_water
-            school_weekly.electricity_availability = prev_weekly.electricity_availability
-            school_weekly.computer_lab = prev_weekly.computer_lab
-            school_weekly.num_computers = prev_weekly.num_computers
 
-        school_weekly.save()
+def aggregate_school_daily_status_to_school_weekly_status(country, schools_range=None) -> bool:
+    started_at = time.monotonic()
+    date = timezone.now().date()
+    week_ago = date - timedelta(days=7)
+    year, week = get_current_year(), get_current_week()
+    week_date = SchoolWeeklyStatus(year=year, week=week).get_date()
+
+    daily_qs = SchoolDailyStatus.objects.filter(school__country=country, date__gte=week_ago)
+    if schools_range:
+        daily_qs = daily_qs.filter(school_id__gte=schools_range[0], school_id__lte=schools_range[1])
+    schools_ids = list(daily_qs.order_by('school_id').values_list('school_id', flat=True).distinct())
+
+    for i in range(0, len(schools_ids), WEEKLY_AGGREGATION_BATCH_SIZE):
+        batch_ids = schools_ids[i:i + WEEKLY_AGGREGATION_BATCH_SIZE]
+        with transaction.atomic(), track_country_statistics_deltas(country, batch_ids):
+            _upsert_school_weekly_statuses(batch_ids, year, week, week_date, week_ago)
+
+    logger.info(
+        'school weekly statuses aggregated for %s: %s schools in %.2fs',
+        country.code, len(schools_ids), time.monotonic() - started_at,
+    )
+    return bool(schools_ids)
+
 
-    return updated
+def _update_schools_connected(country_status):
+    schools_with_data = country_status.schools_connectivity_moderate + country_status.schools_connectivity_good
+    country_status.schools_connected = schools_with_data
+    if country_status.schools_total:
+        country_status.schools_with_data_percentage = 1.0 * country_status.schools_connected
+        country_status.schools_with_data_percentage /= country_status.schools_total
+    else:
+        country_status.schools_with_data_percentage = 0
 
 
 def update_country_weekly_status(country: Country):
+    # deltas collected before this point are included into full recalculation
+    last_delta_id = None
+    if settings.COUNTRY_STATISTICS_INCREMENTAL:
+        last_delta_id = CountryWeeklyStatusDelta.objects.filter(country=country).aggregate(
+            last_id=Max('id'),
+        )['last_id']
+
     last_weekly_status_country = country.last_weekly_status
     country_status, created = CountryWeeklyStatus.objects.get_or_create(
         country=country, year=get_current_year(), week=get_current_week(),
@@ -118,33 +225,34 @@ def update_country_weekly_status(country: Country):
         country.last_weekly_status.integration_status = last_weekly_status_country.integration_status
         country.last_weekly_status.save(update_fields=('integration_status',))
 
-    # calculate pie charts. first we need to understand which case is applicable for country
+    # calculate pie charts. all counters are collected at once, then applicable case is chosen for country
     latest_statuses = SchoolWeeklyStatus.objects.filter(school__country=country, _school__isnull=False)
     connectivity_types = CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY
     coverage_types = CountryWeeklyStatus.COVERAGE_TYPES_AVAILABILITY
+    schools_stats = aggregate_country_statistics(latest_statuses)
 
     if RealTimeConnectivity.objects.filter(school__country=country).exists():
         country_status.connectivity_availability = connectivity_types.realtime_speed
-        connectivity_stats = aggregate_connectivity_by_speed(latest_statuses)
-    elif latest_statuses.filter(connectivity_speed__gte=0).exists():
+        connectivity_stats = schools_stats['connectivity_by_speed']
+    elif schools_stats['has_connectivity_speed']:
         country_status.connectivity_availability = connectivity_types.static_speed
-        connectivity_stats = aggregate_connectivity_by_speed(latest_statuses)
-    elif latest_statuses.filter(connectivity__isnull=False).exists():
+        connectivity_stats = schools_stats['connectivity_by_speed']
+    elif schools_stats['has_connectivity']:
         country_status.connectivity_availability = connectivity_types.connectivity
-        connectivity_stats = aggregate_connectivity_by_availability(latest_statuses)
+        connectivity_stats = schools_stats['connectivity_by_availability']
     else:
         country_status.connectivity_availability = connectivity_types.no_connectivity
-        connectivity_stats = aggregate_connectivity_default(latest_statuses)
+        connectivity_stats = get_default_statistics(schools_stats['total'])
 
-    if latest_statuses.exclude(coverage_type=SchoolWeeklyStatus.COVERAGE_TYPES.unknown).exists():
+    if schools_stats['has_coverage_type']:
         country_status.coverage_availability = coverage_types.coverage_type
-        coverage_stats = aggregate_coverage_by_types(latest_statuses)
-    elif latest_statuses.filter(coverage_availability__isnull=False).exists():
+        coverage_stats = schools_stats['coverage_by_types']
+    elif schools_stats['has_coverage_availability']:
         country_status.coverage_availability = coverage_types.coverage_availability
-        coverage_stats = aggregate_coverage_by_availability(latest_statuses)
+        coverage_stats = schools_stats['coverage_by_availability']
     else:
         country_status.coverage_availability = coverage_types.no_coverage
-        coverage_stats = aggregate_coverage_default(latest_statuses)
+        coverage_stats = get_default_statistics(schools_stats['total'])
 
     # remember connectivity pie chart
     country_status.schools_connectivity_good = connectivity_stats[ColorMapSchema.GOOD]
@@ -158,24 +266,11 @@ def update_country_weekly_status(country: Country):
     country_status.schools_coverage_no = coverage_stats[ColorMapSchema.NO]
     country_status.schools_coverage_unknown = coverage_stats[ColorMapSchema.UNKNOWN]
 
-    # calculate speed & latency where available
-    schools_stats = latest_statuses.aggregate(
-        total=Count('*'),
-        connectivity_speed=Avg('connectivity_speed', filter=Q(connectivity_speed__gt=0)),
-        connectivity_latency=Avg('connectivity_latency', filter=Q(connectivity_latency__gt=0)),
-    )
-
     country_status.connectivity_speed = schools_stats['connectivity_speed']
     country_status.connectivity_latency = schools_stats['connectivity_latency']
 
     country_status.schools_total = schools_stats['total']
-    schools_with_data = country_status.schools_connectivity_moderate + country_status.schools_connectivity_good
-    country_status.schools_connected = schools_with_data
-    if country_status.schools_total:
-        country_status.schools_with_data_percentage = 1.0 * country_status.schools_connected
-        country_status.schools_with_data_percentage /= country_status.schools_total
-    else:
-        country_status.schools_with_data_percentage = 0
+    _update_schools_connected(country_status)
 
     # move country status as far as we can
     if country_status.integration_status == CountryWeeklyStatus.COUNTRY_CREATED and country_status.schools_total:
@@ -202,6 +297,118 @@ def update_country_weekly_status(country: Country):
 
     country_status.save()
 
+    if last_delta_id is not None:
+        CountryWeeklyStatusDelta.objects.filter(country=country, id__lte=last_delta_id).delete()
+
+
+@contextmanager
+def track_country_statistics_deltas(country: Country, schools_ids):
+    # remember how changes of schools last weekly statuses move country counters
+    country_status = country.last_weekly_status
+    if not settings.COUNTRY_STATISTICS_INCREMENTAL or not country_status:
+        yield
+        return
+
+    def get_counters():
+        return aggregate_country_counters(
+            SchoolWeeklyStatus.objects.filter(_school__id__in=schools_ids),
+            country_status.connectivity_availability,
+            country_status.coverage_availability,
+        )
+
+    counters_before = get_counters()
+    yield
+    counters_after = get_counters()
+
+    CountryWeeklyStatusDelta.objects.bulk_create([
+        CountryWeeklyStatusDelta(
+            country=country, field=counter, value=counters_after[counter] - counters_before[counter],
+        )
+        for counter in CountryWeeklyStatusDelta.COUNTERS
+        if counters_after[counter] != counters_before[counter]
+    ])
+
+
+def apply_country_statistics_deltas(country: Country) -> bool:
+    with transaction.atomic():
+        country_status = CountryWeeklyStatus.objects.select_for_update().filter(
+            id=country.last_weekly_status_id, year=get_current_year(), week=get_current_week(),
+        ).first()
+        if not country_status:
+            # new week started, country status should be fully recalculated
+            return False
+
+        deltas = CountryWeeklyStatusDelta.objects.filter(country=country)
+        last_delta_id = deltas.aggregate(last_id=Max('id'))['last_id']
+        if last_delta_id is None:
+            return True
+
+        deltas = deltas.filter(id__lte=last_delta_id)
+        totals = dict(deltas.order_by().values_list('field').annotate(total=Sum('value')))
+        for counter, total in totals.items():
+            # negative value means drift, it will be fixed during reconciliation
+            setattr(country_status, counter, max(getattr(country_status, counter) + total, 0))
+        _update_schools_connected(country_status)
+
+        country_status.save(update_fields=CountryWeeklyStatusDelta.COUNTERS + (
+            'schools_connected', 'schools_with_data_percentage', 'modified',
+        ))
+        deltas.delete()
+
+    logger.info('deltas applied to country weekly status for %s: %s', country.code, totals)
+    return True
+
+
+def refresh_country_weekly_status(country: Country):
+    if settings.COUNTRY_STATISTICS_INCREMENTAL and apply_country_statistics_deltas(country):
+        return
+
+    update_country_weekly_status(country)
+
+
+def reconcile_country_statistics(country: Country) -> dict:
+    # full recalculation; difference with incrementally maintained counters is reported as drift
+    previous_status = CountryWeeklyStatus.objects.filter(id=country.last_weekly_status_id).first()
+
+    update_country_weekly_status(country)
+
+    country_status = CountryWeeklyStatus.objects.get(id=country.last_weekly_status_id)
+    if not previous_status or previous_status.id != country_status.id:
+        return {}
+
+    return {
+        counter: getattr(previous_status, counter) - getattr(country_status, counter)
+        for counter in CountryWeeklyStatusDelta.COUNTERS
+        if getattr(previous_status, counter) != getattr(country_status, counter)
+    }
+
+
+def update_global_weekly_status() -> GlobalWeeklyStatus:
+    # all schools counters are calculated by single table scan
+    schools_statistics = School.objects.aggregate(
+        schools_total=Count('id'),
+        schools_mapped=Count('id', filter=Q(geopoint__isnull=False)),
+        schools_with_known_connectivity=Count('id', filter=Q(last_weekly_status__connectivity_speed__isnull=False)),
+    )
+    countries_statuses = Country.objects.aggregate_integration_statuses()
+    countries_statistics = Country.objects.aggregate(
+        countries_with_data_source=Count('id', filter=~Q(data_source='')),
+        schools_connectivity_no=Coalesce(Sum('last_weekly_status__schools_connectivity_no'), 0),
+    )
+
+    global_status, _created = GlobalWeeklyStatus.objects.update_or_create(
+        year=get_current_year(), week=get_current_week(),
+        defaults={
+            **schools_statistics,
+            **countries_statistics,
+            'countries_joined': countries_statuses['countries_joined'],
+            'countries_connected_to_realtime': countries_statuses['countries_connected_to_realtime'],
+            'countries_with_static_data': countries_statuses['countries_with_static_data'],
+            'last_date_updated': CountryWeeklyStatus.objects.aggregate(date=Max('date'))['date'],
+        },
+    )
+    return global_status
+
 
 def update_country_data_source_by_csv_filename(imported_file):
     match = re.search(r'-(\D+)(?:-\d+)*-[^-]+\.\w+$', imported_file.filename)  # noqa: DUO138
@@ -217,3 +424,65 @@ def update_country_data_source_by_csv_filename(imported_file):
         imported_file.country.data_source = pretty_source.capitalize()
 
     imported_file.country.save()
+
+
+@contextmanager
+def track_aggregation_stage(run_id, stage):
+    started_at = time.monotonic()
+    yield
+    if run_id is not None:
+        AggregationRun.update_run(run_id, stages={stage: round(time.monotonic() - started_at, 3)})
+
+
+def get_countries_with_new_data(realtime_last_id, daily_last_id) -> set:
+    # id watermarks are used instead of timestamps, so lookups are made by primary key index
+    countries_ids = set(RealTimeConnectivity.objects.filter(
+        id__gt=realtime_last_id or 0,
+    ).order_by().values_list('school__country_id', flat=True).distinct())
+    countries_ids.update(SchoolDailyStatus.objects.filter(
+        id__gt=daily_last_id or 0,
+    ).order_by().values_list('school__country_id', flat=True).distinct())
+    return countries_ids
+
+
+def get_country_schools_ranges(country_id, shard_size) -> list:
+    # contiguous schools id ranges, shard_size schools in each one
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT MIN(id), MAX(id) FROM (
+                SELECT id, (ROW_NUMBER() OVER (ORDER BY id) - 1) / %s AS shard
+                FROM {School._meta.db_table}
+                WHERE country_id = %s
+            ) schools
+            GROUP BY shard
+            ORDER BY 1
+            """,  # noqa: S608
+            (shard_size, country_id),
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def plan_countries_aggregation(run: AggregationRun) -> dict:
+    # countries to be aggregated mapped to schools ranges for the ones big enough to be sharded.
+    # countries without new data since previous completed run for the same day are skipped,
+    # yesterday data finalization is never skipped
+    countries_ids = set(Country.objects.values_list('id', flat=True))
+
+    previous_run = None
+    if run.today:
+        previous_run = AggregationRun.objects.filter(
+            date=run.date, today=True, status=AggregationRun.STATUSES.completed, id__lt=run.id,
+        ).order_by('-id').first()
+    if previous_run:
+        countries_ids &= get_countries_with_new_data(previous_run.realtime_last_id, previous_run.daily_last_id)
+
+    shard_size = settings.AGGREGATION_SHARD_SIZE
+    big_countries = School.objects.filter(country_id__in=countries_ids).order_by().values(
+        'country_id',
+    ).annotate(schools_count=Count('id')).filter(schools_count__gt=shard_size).values_list('country_id', flat=True)
+
+    plan = dict.fromkeys(countries_ids)
+    for country_id in big_countries:
+        plan[country_id] = get_country_schools_ranges(country_id, shard_size)
+    return plan
@@ -0,0 +1,13 @@
+from proco.connection_statistics.api import calculate_global_statistic
+from proco.utils.cache import CacheVersions
+from proco.utils.warmers import CacheWarmer, cache_warmers
+
+
+@cache_warmers.register
+class GlobalStatsCacheWarmer(CacheWarmer):
+    url_name = 'connection_statistics:global-stat'
+    cache_key = 'GLOBAL_STATS'
+    scopes = (CacheVersions.COUNTRIES,)
+
+    def build(self):
+        return calculate_global_statistic()
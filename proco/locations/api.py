@@ -1,23 +1,53 @@
 from django.conf import settings
-from django.db.models import BooleanField, F, Func
+from django.contrib.gis.db.models import MultiPolygonField
+from django.db.models import BooleanField, F, Func, OuterRef, Subquery
 from django.db.models.functions.text import Lower
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_control
 
 from rest_framework import mixins, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import ListAPIView
+from rest_framework.views import APIView
 
-from proco.locations.models import Country
+from django_filters.rest_framework import DjangoFilterBackend
+
+from proco.locations.models import Country, Location, SimplifiedGeometry
 from proco.locations.serializers import (
     BoundaryListCountrySerializer,
+    BoundaryListLocationSerializer,
+    BoundaryZoomListCountrySerializer,
     CountrySerializer,
     DetailCountrySerializer,
     ListCountrySerializer,
 )
+from proco.locations.tiles import BoundariesTile
+from proco.utils.cache import CacheVersions
 from proco.utils.filters import NullsAlwaysLastOrderingFilter
-from proco.utils.mixins import CachedListMixin, CachedRetrieveMixin
+from proco.utils.mixins import CachedListMixin, CachedRetrieveMixin, VectorTileMixin
+
+
+class ZoomGeometryMixin(object):
+    # boundaries simplified for zoom level from query params
+    zoom_param = 'zoom'
+
+    def get_zoom_level(self):
+        value = self.request.query_params.get(self.zoom_param)
+        if value is None:
+            return None
+
+        try:
+            return SimplifiedGeometry.get_zoom_level(int(value))
+        except ValueError:
+            raise ValidationError({self.zoom_param: 'Invalid zoom.'})
+
+    def get_zoom_geometry(self, zoom_level, **filters):
+        return Subquery(
+            SimplifiedGeometry.objects.filter(zoom=zoom_level, **filters).values('geometry')[:1],
+            output_field=MultiPolygonField(),
+        )
 
 
 @method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
@@ -29,6 +59,7 @@ class CountryViewSet(
     viewsets.GenericViewSet,
 ):
     LIST_CACHE_KEY_PREFIX = 'COUNTRIES_LIST'
+    LIST_CACHE_SCOPES = (CacheVersions.COUNTRIES,)
     RETRIEVE_CACHE_KEY_PREFIX = 'COUNTRY_INFO'
 
     pagination_class = None
@@ -51,7 +82,14 @@ class CountryViewSet(
         return serializer_class
 
     def get_object(self):
-        return get_object_or_404(self.queryset.annotate(code_lower=Lower('code')), code_lower=self.kwargs.get('pk'))
+        if not hasattr(self, '_object'):
+            self._object = get_object_or_404(
+                self.queryset.annotate(code_lower=Lower('code')), code_lower=self.kwargs.get('pk'),
+            )
+        return self._object
+
+    def get_retrieve_cache_scopes(self):
+        return (CacheVersions.country(self.get_object().id),)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -61,11 +99,62 @@ class CountryViewSet(
 
 
 @method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
-class CountryBoundaryListAPIView(CachedListMixin, ListAPIView):
+class CountryBoundaryListAPIView(ZoomGeometryMixin, CachedListMixin, ListAPIView):
     LIST_CACHE_KEY_PREFIX = 'COUNTRY_BOUNDARY'
+    LIST_CACHE_SCOPES = (CacheVersions.BOUNDARY,)
 
     queryset = Country.objects.all().annotate(
         geometry_empty=Func(F('geometry'), function='ST_IsEmpty', output_field=BooleanField()),
     ).filter(geometry_empty=False).only('id', 'code', 'geometry_simplified')
     serializer_class = BoundaryListCountrySerializer
     pagination_class = None
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        zoom_level = self.get_zoom_level()
+        if zoom_level is not None:
+            qs = qs.defer('geometry_simplified').annotate(zoom_geometry=self.get_zoom_geometry(
+                zoom_level, country=OuterRef('id'), location__isnull=True,
+            ))
+        return qs
+
+    def get_serializer_class(self):
+        if self.get_zoom_level() is not None:
+            return BoundaryZoomListCountrySerializer
+        return super().get_serializer_class()
+
+
+@method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
+class LocationBoundaryListAPIView(ZoomGeometryMixin, CachedListMixin, ListAPIView):
+    LIST_CACHE_KEY_PREFIX = 'LOCATIONS_BOUNDARY'
+    LIST_CACHE_SCOPES = (CacheVersions.BOUNDARY,)
+
+    queryset = Location.objects.all().only('id', 'name', 'parent_id', 'level')
+    serializer_class = BoundaryListLocationSerializer
+    pagination_class = None
+    filter_backends = (
+        DjangoFilterBackend,
+    )
+    filterset_fields = ('parent', 'level')
+
+    def get_list_cache_key(self):
+        params = dict(self.request.query_params)
+        params.pop(self.CACHE_KEY, None)
+        return '{0}_{1}_{2}'.format(
+            self.LIST_CACHE_KEY_PREFIX,
+            self.kwargs['country_code'].lower(),
+            '_'.join('{0}_{1}'.format(key, value) for key, value in sorted(params.items())),
+        )
+
+    def get_queryset(self):
+        zoom_level = self.get_zoom_level()
+        if zoom_level is None:
+            zoom_level = SimplifiedGeometry.ZOOM_LEVELS[-1]
+        return super().get_queryset().filter(country__code__iexact=self.kwargs['country_code']).annotate(
+            zoom_geometry=self.get_zoom_geometry(zoom_level, location=OuterRef('id')),
+        )
+
+
+@method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
+class BoundariesTileAPIView(VectorTileMixin, APIView):
+    tile_class = BoundariesTile
@@ -12,5 +12,10 @@ app_name = 'locations'
 
 urlpatterns = [
     path('countries-boundary/', api.CountryBoundaryListAPIView.as_view(), name='countries-boundary'),
+    path(
+        'countries/<str:country_code>/boundaries/', api.LocationBoundaryListAPIView.as_view(),
+        name='locations-boundary',
+    ),
+    path('tiles/boundaries/<int:z>/<int:x>/<int:y>.mvt', api.BoundariesTileAPIView.as_view(), name='boundaries-tiles'),
     path('', include(router.urls)),
 ]
@@ -7,3 +7,4 @@ class LocationsConfig(AppConfig):
 
     def ready(self):
         from proco.locations import signals  # NOQA
+        from proco.locations import warmers  # NOQA
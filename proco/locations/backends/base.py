@@ -0,0 +1,71 @@
+import io
+import zlib
+from datetime import datetime
+
+from django.http import StreamingHttpResponse
+
+# encoded content is sent by chunks of about this size instead of row by row
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+class SchoolsStreamingWriterBackend:
+    """
+    Base for schools export formats. Rows are encoded while they are fetched from database
+    and sent to client by chunks, so whole export is never kept in memory.
+    """
+    content_type = None
+    extension = None
+    compressible = True
+    geometry_field = 'geopoint'
+
+    def __init__(self, rows, fields, country, compress=False):
+        self.rows = rows
+        self.fields = fields
+        self.compress = compress
+        self.filename = self.get_filename(country)
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def get_filename(self, country):
+        date = datetime.now().date().strftime('%Y-%m-%d')
+        filename = f'{country.name}_schools_{date}.{self.extension}'
+        if self.compress:
+            filename += '.gz'
+        return filename
+
+    def iter_content(self):
+        raise NotImplementedError
+
+    def iter_text_chunks(self, write_rows):
+        # helper for text formats: write_rows writes into buffer and yields after every row
+        buffer = io.StringIO()
+        for _row in write_rows(buffer):
+            if buffer.tell() >= EXPORT_BUFFER_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def iter_compressed(self, chunks):
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def write(self):
+        content = self.iter_content()
+        if self.compress:
+            content = self.iter_compressed(content)
+            content_type = 'application/gzip'
+        else:
+            content_type = self.content_type
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}"'
+        return response
@@ -1,35 +1,28 @@
 import csv
-from datetime import datetime
 
-from django.http import HttpResponse
+from proco.locations.backends.base import SchoolsStreamingWriterBackend
 
 
-class SchoolsCSVWriterBackend:
-    def __init__(self, serializer, country):
-        self.serializer = serializer
-        self.filename = self.get_filename(country)
-
-    def get_filename(self, country):
-        date = datetime.now().date().strftime('%Y-%m-%d')
-        return f'{country.name}_schools_{date}.csv'
-
-    def writeheader(self, writer, header, labels):
-        header = dict(zip(header, labels))
-        writer.writerow(header)
+class SchoolsCSVWriterBackend(SchoolsStreamingWriterBackend):
+    content_type = 'text/csv'
+    extension = 'csv'
 
     def remove_underscore(self, field):
         return field.replace('_', ' ')
 
-    def write(self):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{self.filename}"'
+    def format_geopoint(self, point):
+        return f'{point.x}: {point.y}' if point else None
 
-        csv_header = self.serializer.child.__class__.Meta.fields
-        labels = [self.remove_underscore(field.title()) for field in csv_header]
-        writer = csv.DictWriter(response, fieldnames=csv_header)
-        self.writeheader(writer, csv_header, labels)
+    def write_rows(self, buffer):
+        writer = csv.writer(buffer)
+        writer.writerow([self.remove_underscore(field.title()) for field in self.fields])
 
-        for row in self.serializer.data:
+        geometry_index = self.fields.index(self.geometry_field)
+        for row in self.rows:
+            row = list(row)
+            row[geometry_index] = self.format_geopoint(row[geometry_index])
             writer.writerow(row)
+            yield row
 
-        return response
+    def iter_content(self):
+        return self.iter_text_chunks(self.write_rows)
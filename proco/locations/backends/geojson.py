@@ -0,0 +1,30 @@
+import json
+
+from proco.locations.backends.base import SchoolsStreamingWriterBackend
+
+RECORD_SEPARATOR = '\x1e'
+
+
+class SchoolsGeoJSONSeqWriterBackend(SchoolsStreamingWriterBackend):
+    # every school is separate feature prefixed by record separator, as described in RFC 8142
+    content_type = 'application/geo+json-seq'
+    extension = 'geojsons'
+
+    def write_rows(self, buffer):
+        geometry_index = self.fields.index(self.geometry_field)
+        for row in self.rows:
+            point = row[geometry_index]
+            feature = {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [point.x, point.y]} if point else None,
+                'properties': {
+                    field: value for field, value in zip(self.fields, row) if field != self.geometry_field
+                },
+            }
+            buffer.write(RECORD_SEPARATOR)
+            buffer.write(json.dumps(feature, separators=(',', ':')))
+            buffer.write('\n')
+            yield row
+
+    def iter_content(self):
+        return self.iter_text_chunks(self.write_rows)
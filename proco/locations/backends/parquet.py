@@ -0,0 +1,102 @@
+import io
+
+from proco.locations.backends.base import SchoolsStreamingWriterBackend
+
+# every row group is sent to client as soon as it's written
+ROW_GROUP_SIZE = 50000
+
+
+class StreamBuffer(io.RawIOBase):
+    # write only file, written data is taken out by parts while parquet file is being built
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class SchoolsParquetWriterBackend(SchoolsStreamingWriterBackend):
+    """
+    Parquet export, geopoint is stored as separate longitude and latitude columns.
+    Requires pyarrow, format isn't offered if it's not installed.
+    """
+    content_type = 'application/vnd.apache.parquet'
+    extension = 'parquet'
+    # columns are already compressed by parquet
+    compressible = False
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def get_schema(self):
+        import pyarrow
+
+        columns = []
+        for field in self.fields:
+            if field == self.geometry_field:
+                columns.append(pyarrow.field('longitude', pyarrow.float64()))
+                columns.append(pyarrow.field('latitude', pyarrow.float64()))
+            else:
+                columns.append(pyarrow.field(field, pyarrow.string()))
+        return pyarrow.schema(columns)
+
+    def iter_row_groups(self):
+        rows = []
+        for row in self.rows:
+            rows.append(row)
+            if len(rows) >= ROW_GROUP_SIZE:
+                yield rows
+                rows = []
+
+        if rows:
+            yield rows
+
+    def build_table(self, schema, rows):
+        import pyarrow
+
+        columns = []
+        for index, field in enumerate(self.fields):
+            values = [row[index] for row in rows]
+            if field == self.geometry_field:
+                columns.append([point.x if point else None for point in values])
+                columns.append([point.y if point else None for point in values])
+            else:
+                columns.append(values)
+
+        return pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=column_type) for column, column_type in zip(columns, schema.types)],
+            schema=schema,
+        )
+
+    def iter_content(self):
+        import pyarrow.parquet
+
+        schema = self.get_schema()
+        buffer = StreamBuffer()
+        writer = pyarrow.parquet.ParquetWriter(buffer, schema)
+        for rows in self.iter_row_groups():
+            writer.write_table(self.build_table(schema, rows))
+            yield buffer.pop()
+
+        writer.close()
+        yield buffer.pop()
@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from proco.locations.models import Country, Location
+
+
+class Command(BaseCommand):
+    help = 'Build boundaries of countries and their locations simplified for map zoom levels.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--country', type=str, help='Code of country to build geometries for, all by default')
+
+    def handle(self, *args, **options):
+        countries = Country.objects.all()
+        if options['country']:
+            countries = countries.filter(code__iexact=options['country'])
+
+        for country in countries:
+            country.update_simplified_geometries()
+            locations = Location.objects.filter(country=country)
+            for location in locations:
+                location.update_simplified_geometries()
+            self.stdout.write(f'{country}: {len(locations)} locations processed')
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0011_auto_20210415_0731'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimplifiedGeometry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('geometry', django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simplified_geometries', to='locations.Country')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='simplified_geometries', to='locations.Location')),
+            ],
+            options={
+                'ordering': ('id',),
+                'index_together': {('country', 'zoom')},
+            },
+        ),
+    ]
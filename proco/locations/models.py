@@ -1,6 +1,8 @@
+from typing import List, Tuple
+
 from django.contrib.gis.db.models import MultiPolygonField
 from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import ugettext as _
 
 import numpy as np
@@ -11,7 +13,7 @@ from sklearn.neighbors import DistanceMetric
 
 from proco.locations.managers import CountryManager
 from proco.locations.utils import get_random_name_image
-from proco.utils.cache import cache_manager
+from proco.utils.cache import CacheVersions, cache_manager, country_data_versions
 
 
 class GeometryMixin(models.Model):
@@ -44,11 +46,64 @@ class GeometryMixin(models.Model):
 
         return geometry
 
+    @classmethod
+    def simplify_by_zoom_levels(cls, geometry: [GEOSGeometry]) -> List[Tuple[int, MultiPolygon]]:
+        # tolerance is a pixel size for the most detailed zoom of level, so simplification artifacts
+        # like gaps between neighbour boundaries are not visible
+        if geometry is None or geometry.empty:
+            return []
+
+        simplified_geometries = []
+        for zoom in SimplifiedGeometry.ZOOM_LEVELS:
+            tolerance = 360 / (SimplifiedGeometry.TILE_SIZE * 2 ** zoom)
+            geometry_simplified = geometry.simplify(tolerance=tolerance, preserve_topology=True)
+            if not geometry_simplified.empty:
+                simplified_geometries.append((zoom, cls.to_multipolygon(geometry_simplified)))
+        return simplified_geometries
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # simplified geometries are rebuilt only when geometry is changed
+        if 'geometry' in field_names:
+            instance._loaded_geometry = values[field_names.index('geometry')]
+        return instance
+
+    def get_simplified_geometries_owner(self) -> dict:
+        raise NotImplementedError
+
+    def update_simplified_geometries(self):
+        owner = self.get_simplified_geometries_owner()
+        SimplifiedGeometry.objects.filter(**owner).delete()
+        SimplifiedGeometry.objects.bulk_create([
+            SimplifiedGeometry(zoom=zoom, geometry=geometry, **owner)
+            for zoom, geometry in self.simplify_by_zoom_levels(self.geometry)
+        ])
+        country_data_versions.bump(owner['country'].id)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # deferred geometry loaded on access is not a change either
+        if 'geometry' not in self.get_deferred_fields():
+            self._loaded_geometry = self.geometry
+
     def save(self, *args, **kwargs):
-        self.geometry_simplified = self.optimize_geometry(self.geometry)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # deferred geometry is not saved, so it shouldn't be loaded and simplified again
+            geometry_saved = 'geometry' not in self.get_deferred_fields()
+        else:
+            geometry_saved = 'geometry' in update_fields
+
+        if geometry_saved:
+            self.geometry_simplified = self.optimize_geometry(self.geometry)
 
         super().save(*args, **kwargs)
 
+        if geometry_saved and (not hasattr(self, '_loaded_geometry') or self._loaded_geometry != self.geometry):
+            self.update_simplified_geometries()
+            self._loaded_geometry = self.geometry
+
 
 class Country(GeometryMixin, TimeStampedModel):
     name = models.CharField(max_length=255)
@@ -81,18 +136,21 @@ class Country(GeometryMixin, TimeStampedModel):
     def __str__(self):
         return f'{self.name}'
 
+    def get_simplified_geometries_owner(self) -> dict:
+        return {'country': self, 'location': None}
+
     def invalidate_country_related_cache(self):
-        cache_manager.invalidate((
-            'GLOBAL_STATS',
-            'COUNTRIES_LIST*',
-            'COUNTRY_INFO_pk_{0}'.format(self.code.lower()),
-            'SCHOOLS_{0}_*'.format(self.code.lower()),
-        ))
+        from proco.connection_statistics.tasks import schedule_global_statistics_update
+
+        cache_manager.invalidate(CacheVersions.COUNTRIES)
+        cache_manager.invalidate(CacheVersions.country(self.id))
+        # materialized global statistics follow the same changes as countries cache
+        transaction.on_commit(schedule_global_statistics_update)
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         self.invalidate_country_related_cache()
-        cache_manager.invalidate('COUNTRY_BOUNDARY')
+        cache_manager.invalidate(CacheVersions.BOUNDARY)
 
     def _calculate_batch_avg_distance_school(self, points):
         earth_radius = 6371.0088
@@ -143,3 +201,40 @@ class Location(GeometryMixin, TimeStampedModel, MPTTModel):
 
     def __str__(self):
         return f'{self.name} - {self.country}'
+
+    def get_simplified_geometries_owner(self) -> dict:
+        return {'country': self.country, 'location': self}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache_manager.invalidate(CacheVersions.BOUNDARY)
+
+
+class SimplifiedGeometry(models.Model):
+    """
+    Country or location boundary simplified for map zoom levels up to given one.
+    """
+    # the last level is used for all more detailed zoom levels
+    ZOOM_LEVELS = (2, 5, 8, 11, 14)
+    TILE_SIZE = 256
+
+    country = models.ForeignKey(Country, related_name='simplified_geometries', on_delete=models.CASCADE)
+    location = models.ForeignKey(
+        Location, null=True, blank=True, related_name='simplified_geometries', on_delete=models.CASCADE,
+    )
+    zoom = models.PositiveSmallIntegerField()
+    geometry = MultiPolygonField()
+
+    class Meta:
+        ordering = ('id',)
+        index_together = ('country', 'zoom')
+
+    def __str__(self):
+        return f'{self.location or self.country} - {self.zoom}'
+
+    @classmethod
+    def get_zoom_level(cls, zoom: int) -> int:
+        for level in cls.ZOOM_LEVELS:
+            if zoom <= level:
+                return level
+        return cls.ZOOM_LEVELS[-1]
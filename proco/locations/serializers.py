@@ -1,10 +1,14 @@
 from rest_framework import serializers
 
+from rest_framework_gis.fields import GeometryField
+
 from proco.connection_statistics.serializers import CountryWeeklyStatusSerializer
-from proco.locations.models import Country
+from proco.locations.models import Country, Location
+from proco.utils.urls import build_media_url
 
 
 class BaseCountrySerializer(serializers.ModelSerializer):
+    flag = serializers.SerializerMethodField()
     map_preview = serializers.SerializerMethodField()
 
     class Meta:
@@ -15,13 +19,16 @@ class BaseCountrySerializer(serializers.ModelSerializer):
         )
         read_only_fields = fields
 
+    # urls don't depend on request, payloads built by cache warmers are the same as view ones
+    def get_flag(self, instance):
+        if not instance.flag:
+            return None
+        return build_media_url(instance.flag.url)
+
     def get_map_preview(self, instance):
         if not instance.map_preview:
             return ''
-
-        request = self.context.get('request')
-        photo_url = instance.map_preview.url
-        return request.build_absolute_uri(photo_url)
+        return build_media_url(instance.map_preview.url)
 
 
 class CountrySerializer(BaseCountrySerializer):
@@ -37,6 +44,22 @@ class BoundaryListCountrySerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class BoundaryZoomListCountrySerializer(BoundaryListCountrySerializer):
+    # geometry simplified for requested zoom level
+    geometry_simplified = GeometryField(source='zoom_geometry', read_only=True)
+
+
+class BoundaryListLocationSerializer(serializers.ModelSerializer):
+    geometry = GeometryField(source='zoom_geometry', read_only=True)
+
+    class Meta:
+        model = Location
+        fields = (
+            'id', 'name', 'parent_id', 'level', 'geometry',
+        )
+        read_only_fields = fields
+
+
 class ListCountrySerializer(BaseCountrySerializer):
     integration_status = serializers.SerializerMethodField()
     schools_with_data_percentage = serializers.SerializerMethodField()
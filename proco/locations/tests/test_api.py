@@ -1,13 +1,14 @@
 from django.contrib.gis.geos import GEOSGeometry
 from django.core.cache import cache
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 
 from proco.connection_statistics.tests.factories import CountryWeeklyStatusFactory
-from proco.locations.tests.factories import CountryFactory
+from proco.locations.tests.factories import CountryFactory, LocationFactory
 from proco.schools.tests.factories import SchoolFactory
+from proco.utils.cache import cache_manager, local_cache
 from proco.utils.tests import TestAPIViewSetMixin
 
 
@@ -54,12 +55,74 @@ class CountryApiTestCase(TestAPIViewSetMixin, TestCase):
                 user=None, expected_objects=[self.country_one, self.country_two],
             )
 
+    def test_country_list_outdated(self):
+        self.forced_auth_req('get', reverse('locations:countries-list'))
+
+        self.country_one.name = 'Updated'
+        self.country_one.save()
+
+        # outdated value is returned while actual one is calculated in background
+        response = self.forced_auth_req('get', reverse('locations:countries-list'))
+        self.assertNotIn('Updated', [r['name'] for r in response.data])
+        response = self.forced_auth_req('get', reverse('locations:countries-list'))
+        self.assertIn('Updated', [r['name'] for r in response.data])
+
+    def test_country_list_refresh_coalesced(self):
+        cache_manager.reset_metrics()
+        self.forced_auth_req('get', reverse('locations:countries-list'))
+
+        self.country_one.name = 'Updated'
+        self.country_one.save()
+
+        # refresh is already queued by another request
+        cache.set('SOFT_CACHE_REFRESH_COUNTRIES_LIST_', 1)
+        for _i in range(2):
+            response = self.forced_auth_req('get', reverse('locations:countries-list'))
+            self.assertNotIn('Updated', [r['name'] for r in response.data])
+
+        self.assertDictEqual(cache_manager.get_metrics(), {
+            'hit': 0, 'miss': 1, 'stale': 2, 'coalesced': 2,
+        })
+
+        cache.delete('SOFT_CACHE_REFRESH_COUNTRIES_LIST_')
+        self.forced_auth_req('get', reverse('locations:countries-list'))
+        response = self.forced_auth_req('get', reverse('locations:countries-list'))
+        self.assertIn('Updated', [r['name'] for r in response.data])
+
     def test_empty_countries_hidden(self):
         CountryFactory(geometry=GEOSGeometry('{"type": "MultiPolygon", "coordinates": []}'))
         self._test_list(
             user=None, expected_objects=[self.country_one, self.country_two],
         )
 
+    def test_country_list_not_modified(self):
+        response = self.forced_auth_req('get', reverse('locations:countries-list'))
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.forced_auth_req('get', reverse('locations:countries-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.country_one.name = 'Updated'
+        self.country_one.save()
+        # outdated value is still returned while actual one is calculated in background
+        self.forced_auth_req('get', reverse('locations:countries-list'), HTTP_IF_NONE_MATCH=etag)
+        response = self.forced_auth_req('get', reverse('locations:countries-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(SOFT_CACHE_LOCAL_ENABLED=True)
+    def test_country_list_local_cache(self):
+        local_cache.clear()
+        self._test_list(user=None, expected_objects=[self.country_one, self.country_two])
+
+        # value is kept in process memory
+        cache.clear()
+        with self.assertNumQueries(0):
+            self._test_list(user=None, expected_objects=[self.country_one, self.country_two])
+        local_cache.clear()
+
 
 class CountryBoundaryApiTestCase(TestAPIViewSetMixin, TestCase):
     base_view = 'locations:countries-boundary'
@@ -95,3 +158,66 @@ class CountryBoundaryApiTestCase(TestAPIViewSetMixin, TestCase):
         response = self.forced_auth_req('get', reverse(self.base_view))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertCountEqual([r['id'] for r in response.data], [self.country_one.id, self.country_two.id])
+
+    def test_countries_list_zoom(self):
+        with self.assertNumQueries(1):
+            response = self.forced_auth_req('get', reverse(self.base_view), data={'zoom': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['geometry_simplified']['type'], 'MultiPolygon')
+
+        response = self.forced_auth_req('get', reverse(self.base_view), data={'zoom': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LocationBoundaryApiTestCase(TestAPIViewSetMixin, TestCase):
+    base_view = 'locations:locations-boundary'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.location = LocationFactory(country=cls.country)
+        cls.child_location = LocationFactory(country=cls.country, parent=cls.location)
+        LocationFactory()
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_locations_list(self):
+        response = self.forced_auth_req('get', reverse(self.base_view, args=[self.country.code.lower()]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual([r['id'] for r in response.data], [self.location.id, self.child_location.id])
+        self.assertEqual(response.data[0]['geometry']['type'], 'MultiPolygon')
+
+    def test_locations_list_by_parent(self):
+        response = self.forced_auth_req(
+            'get', reverse(self.base_view, args=[self.country.code.lower()]),
+            data={'parent': self.location.id, 'zoom': 6},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data], [self.child_location.id])
+
+
+class BoundariesTileApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        LocationFactory(country=cls.country)
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_tile(self):
+        url = reverse('locations:boundaries-tiles', kwargs={'z': 4, 'x': 8, 'y': 7})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.content)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_empty_tile(self):
+        response = self.client.get(reverse('locations:boundaries-tiles', kwargs={'z': 4, 'x': 0, 'y': 0}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
@@ -2,6 +2,7 @@ from django.contrib.gis.geos import GEOSGeometry
 from django.test import TestCase
 
 from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.locations.models import Country, SimplifiedGeometry
 from proco.locations.tests.factories import CountryFactory
 from proco.schools.tests.factories import SchoolFactory
 
@@ -38,3 +39,43 @@ class TestCountryModel(TestCase):
 
         self.assertEqual(country.schools.count(), 0)
         self.assertEqual(country.last_weekly_status.integration_status, CountryWeeklyStatus.COUNTRY_CREATED)
+
+    def test_simplified_geometries(self):
+        with open('proco/locations/tests/data/anquila.json') as geometry_file:
+            country = CountryFactory(geometry=geometry_file.read())
+
+        geometries = country.simplified_geometries.filter(location__isnull=True).order_by('zoom')
+        self.assertListEqual(list(geometries.values_list('zoom', flat=True)), list(SimplifiedGeometry.ZOOM_LEVELS))
+        self.assertLessEqual(geometries.first().geometry.num_points, geometries.last().geometry.num_points)
+
+        # geometries are rebuilt only when boundary is changed
+        ids = list(geometries.values_list('id', flat=True))
+        Country.objects.get(id=country.id).save()
+        self.assertListEqual(list(geometries.values_list('id', flat=True)), ids)
+
+        country.geometry = GEOSGeometry('MultiPolygon(((0 0, 0 1, 1 1, 1 0, 0 0)))')
+        country.save()
+        self.assertNotEqual(list(geometries.values_list('id', flat=True)), ids)
+
+    def test_simplified_geometries_deferred(self):
+        with open('proco/locations/tests/data/anquila.json') as geometry_file:
+            country = CountryFactory(geometry=geometry_file.read())
+        ids = list(country.simplified_geometries.values_list('id', flat=True))
+
+        country = Country.objects.defer('geometry', 'geometry_simplified').get(id=country.id)
+        country.name = 'Anguilla'
+        with self.assertNumQueries(1):
+            country.save()
+
+        self.assertListEqual(list(country.simplified_geometries.values_list('id', flat=True)), ids)
+        country.refresh_from_db()
+        self.assertEqual(country.name, 'Anguilla')
+        self.assertFalse(country.geometry_simplified.empty)
+
+    def test_simplified_geometries_empty(self):
+        country = CountryFactory(geometry=None)
+        self.assertFalse(country.simplified_geometries.exists())
+
+    def test_zoom_level(self):
+        self.assertEqual(SimplifiedGeometry.get_zoom_level(0), SimplifiedGeometry.ZOOM_LEVELS[0])
+        self.assertEqual(SimplifiedGeometry.get_zoom_level(20), SimplifiedGeometry.ZOOM_LEVELS[-1])
@@ -0,0 +1,87 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection
+
+from proco.locations.models import Country, Location, SimplifiedGeometry
+from proco.utils.cache import country_data_versions
+from proco.utils.tiles import TILE_BUFFER, TILE_EXTENT, get_tile_bounds, get_tile_polygon
+
+COUNTRIES_LAYER = 'countries'
+LOCATIONS_LAYER = 'locations'
+# admin areas are too small to be shown on lower zoom levels
+LOCATIONS_MIN_ZOOM = 5
+
+TILES_CACHE_PREFIX = 'BOUNDARIES_TILE'
+TILES_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+class BoundariesTile(object):
+    """
+    Countries and locations boundaries vector tile built from geometries simplified for tile zoom.
+    Content is cached until boundaries of some country within the tile are changed.
+    """
+    def __init__(self, z: int, x: int, y: int):
+        self.z, self.x, self.y = z, x, y
+        self.polygon = get_tile_polygon(z, x, y)
+        self.level = SimplifiedGeometry.get_zoom_level(z)
+
+        countries_ids = list(Country.objects.filter(geometry__bboverlaps=self.polygon).order_by().values_list(
+            'id', flat=True,
+        ))
+        self.countries_versions = country_data_versions.get_many(countries_ids)
+
+        versions = ','.join(
+            f'{country_id}:{version}' for country_id, version in sorted(self.countries_versions.items())
+        )
+        self.cache_key = '{0}_{1}_{2}_{3}_{4}'.format(
+            TILES_CACHE_PREFIX, z, x, y, hashlib.blake2b(versions.encode(), digest_size=16).hexdigest(),
+        )
+
+    def render(self) -> bytes:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH tile AS (
+                    SELECT ST_MakeEnvelope(%s, %s, %s, %s, 3857) AS envelope, ST_GeomFromEWKT(%s) AS area
+                )
+                SELECT (
+                    SELECT COALESCE(ST_AsMVT(countries, %s, %s, 'geom'), ''::bytea) FROM (
+                        SELECT country.id, country.code, country.name,
+                            ST_AsMVTGeom(ST_Transform(simplified.geometry, 3857), tile.envelope, %s, %s, true) AS geom
+                        FROM {SimplifiedGeometry._meta.db_table} simplified
+                        JOIN {Country._meta.db_table} country ON country.id = simplified.country_id
+                        CROSS JOIN tile
+                        WHERE simplified.location_id IS NULL AND simplified.zoom = %s
+                            AND simplified.geometry && tile.area
+                    ) countries WHERE geom IS NOT NULL
+                ) || (
+                    SELECT COALESCE(ST_AsMVT(locations, %s, %s, 'geom'), ''::bytea) FROM (
+                        SELECT location.id, location.name, location.country_id, location.parent_id, location.level,
+                            ST_AsMVTGeom(ST_Transform(simplified.geometry, 3857), tile.envelope, %s, %s, true) AS geom
+                        FROM {SimplifiedGeometry._meta.db_table} simplified
+                        JOIN {Location._meta.db_table} location ON location.id = simplified.location_id
+                        CROSS JOIN tile
+                        WHERE %s AND simplified.zoom = %s AND simplified.geometry && tile.area
+                    ) locations WHERE geom IS NOT NULL
+                )
+                """,  # noqa: S608
+                [
+                    *get_tile_bounds(self.z, self.x, self.y), self.polygon.ewkt,
+                    COUNTRIES_LAYER, TILE_EXTENT, TILE_EXTENT, TILE_BUFFER, self.level,
+                    LOCATIONS_LAYER, TILE_EXTENT, TILE_EXTENT, TILE_BUFFER, self.z >= LOCATIONS_MIN_ZOOM, self.level,
+                ],
+            )
+            row = cursor.fetchone()
+
+        return bytes(row[0]) if row and row[0] else b''
+
+    def get_content(self) -> bytes:
+        if not self.countries_versions:
+            return b''
+
+        content = cache.get(self.cache_key)
+        if content is None:
+            content = self.render()
+            cache.set(self.cache_key, content, TILES_CACHE_TIMEOUT)
+        return content
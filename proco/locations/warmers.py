@@ -0,0 +1,64 @@
+from proco.locations.api import CountryBoundaryListAPIView, CountryViewSet
+from proco.locations.models import Country
+from proco.locations.serializers import BoundaryListCountrySerializer, DetailCountrySerializer, ListCountrySerializer
+from proco.utils.cache import CacheVersions
+from proco.utils.warmers import CacheWarmer, cache_warmers
+
+
+class CountryCacheWarmer(CacheWarmer):
+    per_country = True
+    country_kwarg = 'country_code'
+
+    def __init__(self, country):
+        super().__init__()
+        self.country = country
+
+    @staticmethod
+    def get_country_queryset():
+        return Country.objects.defer('geometry_simplified').select_related('last_weekly_status')
+
+    @classmethod
+    def from_url_kwargs(cls, **url_kwargs):
+        country = cls.get_country_queryset().filter(code__iexact=url_kwargs[cls.country_kwarg]).first()
+        return cls(country) if country else None
+
+    def get_url_kwargs(self):
+        return {self.country_kwarg: self.country.code.lower()}
+
+    def get_scopes(self):
+        return (CacheVersions.country(self.country.id),)
+
+
+@cache_warmers.register
+class CountriesListCacheWarmer(CacheWarmer):
+    url_name = 'locations:countries-list'
+    cache_key = 'COUNTRIES_LIST_'
+    scopes = (CacheVersions.COUNTRIES,)
+
+    def build(self):
+        queryset = CountryViewSet.queryset.defer('geometry', 'geometry_simplified').order_by('name')
+        return ListCountrySerializer(queryset, many=True).data
+
+
+@cache_warmers.register
+class CountryInfoCacheWarmer(CountryCacheWarmer):
+    url_name = 'locations:countries-detail'
+    cache_key = 'COUNTRY_INFO_pk_{pk}'
+    country_kwarg = 'pk'
+
+    def is_available(self):
+        # countries without geometry are hidden from api
+        return bool(self.country.geometry) and not self.country.geometry.empty
+
+    def build(self):
+        return DetailCountrySerializer(self.country).data
+
+
+@cache_warmers.register
+class CountriesBoundaryCacheWarmer(CacheWarmer):
+    url_name = 'locations:countries-boundary'
+    cache_key = 'COUNTRY_BOUNDARY_'
+    scopes = (CacheVersions.BOUNDARY,)
+
+    def build(self):
+        return BoundaryListCountrySerializer(CountryBoundaryListAPIView.queryset, many=True).data
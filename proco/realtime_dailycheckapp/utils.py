@@ -1,54 +1,45 @@
-import logging
-
-from django.utils import timezone
-
-from proco.connection_statistics.models import RealTimeConnectivity
-from proco.locations.models import Country
+from django.contrib.postgres.fields.jsonb import KeyTextTransform
+from django.db.models import Q
+
+from proco.connection_statistics.ingestion import (
+    INGESTION_BATCH_SIZE,
+    DatabaseMeasurementSource,
+    IngestionEngine,
+    MeasurementData,
+)
 from proco.realtime_dailycheckapp.models import DailyCheckApp_Measurement
-from proco.schools.models import School
-
-logger = logging.getLogger('django.' + __name__)
-
 
-def sync_dailycheckapp_realtime_data():
-    dailycheckapp_measurements = DailyCheckApp_Measurement.objects.filter(Timestamp__gt=DailyCheckApp_Measurement.get_last_dailycheckapp_measurement_date())
 
-    realtime = []
+class DailyCheckAppMeasurementSource(DatabaseMeasurementSource):
+    name = 'dailycheckapp'
+    model = DailyCheckApp_Measurement
+    timestamp_field = 'Timestamp'
+    fields = ('school_id', 'country_code', 'Download', 'Latency')
 
-    countries = {m.ClientInfo.get('Country') for m in dailycheckapp_measurements}
-    for country_code in countries:
-        if country_code:
-            country = Country.objects.filter(code=country_code).first()
-        else:
-            country = None
+    def get_filters(self):
+        return Q(Download__isnull=False)
 
-        schools_qs = School.objects
-        if country:
-            schools_qs = schools_qs.filter(country=country)
+    def get_annotations(self):
+        return {'country_code': KeyTextTransform('Country', 'ClientInfo')}
 
-        schools_ids = {m.school_id for m in dailycheckapp_measurements if m.ClientInfo.get('Country') == country_code}
-        schools = {
-            school.external_id: school
-            for school in schools_qs.filter(external_id__in=schools_ids)
-        }
+    def get_position(self):
+        return DailyCheckApp_Measurement.get_last_dailycheckapp_measurement_position()
 
-        for dailycheckapp_measurement in dailycheckapp_measurements:
-            if dailycheckapp_measurement.school_id not in schools:
-                logger.debug(f'skipping dailycheckapp_measurement {dailycheckapp_measurement.UUID}: unknown school {dailycheckapp_measurement.school_id}')
-                continue
+    def set_position(self, timestamp, entry_id):
+        DailyCheckApp_Measurement.set_last_dailycheckapp_measurement_position(timestamp, entry_id)
 
-            realtime.append(RealTimeConnectivity(
-                created=dailycheckapp_measurement.Timestamp,
-                connectivity_speed=dailycheckapp_measurement.Download * 1024,  # kb/s -> b/s
-                connectivity_latency=dailycheckapp_measurement.Latency,
-                school=schools[dailycheckapp_measurement.school_id],
-            ))
+    def parse(self, entry):
+        _id, timestamp, school_id, country_code, download, latency = entry
+        return MeasurementData(
+            external_id=school_id,
+            country_code=country_code,
+            timestamp=timestamp,
+            connectivity_speed=download * 1024,  # kb/s -> b/s
+            connectivity_latency=latency,
+        )
 
-    RealTimeConnectivity.objects.bulk_create(realtime)
 
-    # not using aggregate because there can be new entries between two operations
-    if dailycheckapp_measurements:
-        last_update = max((m.Timestamp for m in dailycheckapp_measurements))
-    else:
-        last_update = timezone.now()
-    DailyCheckApp_Measurement.set_last_dailycheckapp_measurement_date(last_update)
+def sync_dailycheckapp_realtime_data(batch_size=INGESTION_BATCH_SIZE):
+    return IngestionEngine(
+        DailyCheckAppMeasurementSource(page_size=batch_size), batch_size=batch_size,
+    ).run()
@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 from django.contrib.postgres.fields import JSONField
 from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 
+from proco.connection_statistics.models import IngestionCheckpoint
+
 
 class MeasurementManager(models.Manager):
     def get_queryset(self):
@@ -13,6 +16,7 @@ class MeasurementManager(models.Manager):
 
 class Measurement(models.Model):
     MEASUREMENT_DATE_CACHE_KEY = 'realtime_last_measurement_at'
+    INGESTION_SOURCE = 'unicef'
 
     timestamp = models.DateTimeField()
     uuid = models.TextField(blank=True)
@@ -36,11 +40,25 @@ class Measurement(models.Model):
 
     @classmethod
     def get_last_measurement_date(cls) -> datetime:
+        return cls.get_last_measurement_position()[0]
+
+    @classmethod
+    def set_last_measurement_date(cls, value: datetime):
+        # id is unknown when date is set explicitly, all entries after it will be processed
+        IngestionCheckpoint.set_position(cls.INGESTION_SOURCE, value)
+
+    @classmethod
+    def get_last_measurement_position(cls) -> Tuple[datetime, Optional[int]]:
+        position = IngestionCheckpoint.get_position(cls.INGESTION_SOURCE)
+        if position:
+            return position
+
+        # date stored in cache before checkpoints were moved to database
         last_measurement_at = cache.get(cls.MEASUREMENT_DATE_CACHE_KEY)
         if not last_measurement_at:
-            return timezone.now() - timedelta(days=1)
-        return last_measurement_at
+            return timezone.now() - timedelta(days=1), None
+        return last_measurement_at, None
 
     @classmethod
-    def set_last_measurement_date(cls, value: datetime):
-        cache.set(cls.MEASUREMENT_DATE_CACHE_KEY, value)
+    def set_last_measurement_position(cls, timestamp: datetime, measurement_id: int):
+        IngestionCheckpoint.set_position(cls.INGESTION_SOURCE, timestamp, measurement_id)
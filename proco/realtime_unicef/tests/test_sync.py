@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.core.cache import cache
+from django.core.management import call_command
 from django.db.models import Sum
 from django.test import TestCase
 from django.utils import timezone
@@ -128,3 +129,59 @@ class SyncTestCase(TestCase):
         self.assertEqual(RealTimeConnectivity.objects.first().connectivity_speed, int(measurement.download * 1024))
         self.assertEqual(RealTimeConnectivity.objects.first().connectivity_latency, measurement.latency)
         self.assertEqual(RealTimeConnectivity.objects.first().school, school)
+
+    def test_batches_checkpoint(self):
+        SchoolFactory(external_id='test_1')
+        Measurement.set_last_measurement_date(timezone.now() - timedelta(hours=1))
+        MeasurementFactory(school_id='test_1', download=1)
+        MeasurementFactory(school_id='test_1', download=0)
+        last_measurement = MeasurementFactory(school_id='test_1', download=2)
+
+        sync_realtime_data(batch_size=1)
+
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 2)
+        self.assertEqual(
+            Measurement.get_last_measurement_position(), (last_measurement.timestamp, last_measurement.id),
+        )
+
+        # measurement with same timestamp but greater id is not lost
+        MeasurementFactory(school_id='test_1', timestamp=last_measurement.timestamp, download=3)
+        sync_realtime_data(batch_size=1)
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 3)
+
+    def test_school_matching_by_country(self):
+        school = SchoolFactory(external_id='test_1')
+        SchoolFactory(external_id='test_1')
+        Measurement.set_last_measurement_date(timezone.now() - timedelta(seconds=1))
+        MeasurementFactory(school_id='test_1', client_info={'Country': school.country.code})
+
+        sync_realtime_data()
+
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 1)
+        self.assertEqual(RealTimeConnectivity.objects.first().school, school)
+
+    def test_checkpoint_survives_cache_flush(self):
+        SchoolFactory(external_id='test_1')
+        MeasurementFactory(school_id='test_1')
+        sync_realtime_data()
+
+        cache.delete(Measurement.MEASUREMENT_DATE_CACHE_KEY)
+        sync_realtime_data()
+
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 1)
+
+    def test_replay_window(self):
+        SchoolFactory(external_id='test_1')
+        MeasurementFactory(school_id='test_1', timestamp=timezone.now() - timedelta(hours=2))
+        MeasurementFactory(school_id='test_1', timestamp=timezone.now() - timedelta(hours=1))
+        sync_realtime_data()
+        position = Measurement.get_last_measurement_position()
+        RealTimeConnectivity.objects.filter(created__lt=timezone.now() - timedelta(hours=1, minutes=30)).delete()
+
+        since = (timezone.now() - timedelta(hours=3)).isoformat()
+        until = timezone.now().isoformat()
+        call_command('replay_measurements', 'unicef', since, until)
+        call_command('replay_measurements', 'unicef', since, until)
+
+        self.assertEqual(RealTimeConnectivity.objects.count(approx=False), 2)
+        self.assertEqual(Measurement.get_last_measurement_position(), position)
@@ -1,55 +1,42 @@
-import logging
+from django.contrib.postgres.fields.jsonb import KeyTextTransform
+from django.db.models import Q
+
+from proco.connection_statistics.ingestion import (
+    INGESTION_BATCH_SIZE,
+    DatabaseMeasurementSource,
+    IngestionEngine,
+    MeasurementData,
+)
+from proco.realtime_unicef.models import Measurement
 
-from django.utils import timezone
 
-from proco.connection_statistics.models import RealTimeConnectivity
-from proco.locations.models import Country
-from proco.realtime_unicef.models import Measurement
-from proco.schools.models import School
-
-logger = logging.getLogger('django.' + __name__)
-
-
-def sync_realtime_data():
-    measurements = Measurement.objects.filter(timestamp__gt=Measurement.get_last_measurement_date())
-
-    realtime = []
-
-    countries = {m.client_info.get('Country') for m in measurements}
-    for country_code in countries:
-        if country_code:
-            country = Country.objects.filter(code=country_code).first()
-        else:
-            country = None
-
-        schools_qs = School.objects
-        if country:
-            schools_qs = schools_qs.filter(country=country)
-
-        schools_ids = {m.school_id for m in measurements if m.client_info.get('Country') == country_code}
-        schools = {
-            school.external_id: school
-            for school in schools_qs.filter(external_id__in=schools_ids)
-        }
-
-        for measurement in measurements:
-            if measurement.school_id not in schools:
-                logger.debug(f'skipping measurement {measurement.uuid}: unknown school {measurement.school_id}')
-                continue
-
-            if(measurement.download > 0 and measurement.latency > 0):
-                realtime.append(RealTimeConnectivity(
-                    created=measurement.timestamp,
-                    connectivity_speed=measurement.download * 1024,  # kb/s -> b/s
-                    connectivity_latency=measurement.latency,
-                    school=schools[measurement.school_id],
-                ))
-
-    RealTimeConnectivity.objects.bulk_create(realtime)
-
-    # not using aggregate because there can be new entries between two operations
-    if measurements:
-        last_update = max((m.timestamp for m in measurements))
-    else:
-        last_update = timezone.now()
-    Measurement.set_last_measurement_date(last_update)
+class UnicefMeasurementSource(DatabaseMeasurementSource):
+    name = 'unicef'
+    model = Measurement
+    fields = ('school_id', 'country_code', 'download', 'latency')
+
+    def get_filters(self):
+        return Q(download__gt=0, latency__gt=0)
+
+    def get_annotations(self):
+        return {'country_code': KeyTextTransform('Country', 'client_info')}
+
+    def get_position(self):
+        return Measurement.get_last_measurement_position()
+
+    def set_position(self, timestamp, entry_id):
+        Measurement.set_last_measurement_position(timestamp, entry_id)
+
+    def parse(self, entry):
+        _id, timestamp, school_id, country_code, download, latency = entry
+        return MeasurementData(
+            external_id=school_id,
+            country_code=country_code,
+            timestamp=timestamp,
+            connectivity_speed=download * 1024,  # kb/s -> b/s
+            connectivity_latency=latency,
+        )
+
+
+def sync_realtime_data(batch_size=INGESTION_BATCH_SIZE):
+    return IngestionEngine(UnicefMeasurementSource(page_size=batch_size), batch_size=batch_size).run()
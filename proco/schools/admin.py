@@ -8,6 +8,7 @@ from django.utils.safestring import mark_safe
 from mapbox_location_field.admin import MapAdmin
 
 from proco.locations.filters import CountryFilterList
+from proco.locations.models import Country
 from proco.schools.forms import ImportSchoolsCSVForm, SchoolAdminForm
 from proco.schools.models import FileImport, School
 from proco.schools.tasks import process_loaded_file
@@ -65,6 +66,23 @@ class SchoolAdmin(ImportFormMixin, CountryNameDisplayAdminMixin, MapAdmin):
 
         raise PermissionDenied()
 
+    # country statistics and cached data depend on schools, so they are refreshed after admin changes
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        obj.country.invalidate_country_related_cache()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        obj.country.invalidate_country_related_cache()
+
+    def delete_queryset(self, request, queryset):
+        countries = list(Country.objects.filter(
+            id__in=queryset.values('country_id'),
+        ).defer('geometry', 'geometry_simplified'))
+        super().delete_queryset(request, queryset)
+        for country in countries:
+            country.invalidate_country_related_cache()
+
     def get_weekly_stats_url(self, obj):
         stats_url = reverse('admin:connection_statistics_schoolweeklystatus_changelist')
         return mark_safe(f'<a href="{stats_url}?school={obj.id}" target="_blank">Here</a>')  # noqa: S703,S308
@@ -1,25 +1,47 @@
+import gzip
+import hashlib
+
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models.functions.text import Lower
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date
 from django.views.decorators.cache import cache_control
 
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from django_filters.rest_framework import DjangoFilterBackend
 
 from proco.locations.backends.csv import SchoolsCSVWriterBackend
+from proco.locations.backends.geojson import SchoolsGeoJSONSeqWriterBackend
+from proco.locations.backends.parquet import SchoolsParquetWriterBackend
 from proco.locations.models import Country
-from proco.schools.models import School
+from proco.schools.clusters import CLUSTERS_MAX_ZOOM
+from proco.schools.exports import EXPORT_FIELDS, iterate_export_rows
+from proco.schools.filters import ClusterZoomFilter, InBBoxFilter, WithinLocationFilter
+from proco.schools.models import School, SchoolsCluster
+from proco.schools.pagination import SchoolsCursorPagination
+from proco.schools.sampling import MAX_SEED, sample_schools
 from proco.schools.serializers import (
-    CSVSchoolsListSerializer,
+    CompactSchoolSerializer,
     ListSchoolSerializer,
     SchoolPointSerializer,
+    SchoolsClusterSerializer,
     SchoolSerializer,
 )
-from proco.utils.mixins import CachedListMixin
+from proco.schools.snapshots import get_snapshot_refresh_lease_key
+from proco.schools.tasks import update_country_schools_map
+from proco.schools.tiles import SchoolsTile
+from proco.utils.cache import CacheVersions, country_data_versions
+from proco.utils.mixins import CachedListMixin, VectorTileMixin
 
 
 @method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
@@ -30,19 +52,43 @@ class SchoolsViewSet(
     viewsets.GenericViewSet,
 ):
     LIST_CACHE_KEY_PREFIX = 'SCHOOLS'
+    VIEWPORT_CACHE_KEY_PREFIX = 'SCHOOLS_VIEWPORT'
+    VIEWPORT_PARAMS = (InBBoxFilter.bbox_param, WithinLocationFilter.within_param)
 
     queryset = School.objects.all().select_related('last_weekly_status')
     pagination_class = None
     serializer_class = SchoolSerializer
     filter_backends = (
         DjangoFilterBackend,
+        InBBoxFilter,
+        WithinLocationFilter,
     )
     related_model = Country
 
+    export_format_param = 'file_format'
+    EXPORT_BACKENDS = {
+        'csv': SchoolsCSVWriterBackend,
+        'geojsonseq': SchoolsGeoJSONSeqWriterBackend,
+        'parquet': SchoolsParquetWriterBackend,
+    }
+
+    def is_viewport_request(self):
+        return self.action == 'list' and any(param in self.request.query_params for param in self.VIEWPORT_PARAMS)
+
+    @property
+    def paginator(self):
+        # viewport requests are paginated by keyset, full country list is returned at once
+        if not hasattr(self, '_paginator'):
+            self._paginator = SchoolsCursorPagination() if self.is_viewport_request() else None
+        return self._paginator
+
     def get_serializer(self, *args, **kwargs):
         kwargs['country'] = self.get_country()
         return super(SchoolsViewSet, self).get_serializer(*args, **kwargs)
 
+    def get_list_cache_scopes(self):
+        return (CacheVersions.country(self.get_country().id),)
+
     def get_list_cache_key(self):
         params = dict(self.request.query_params)
         params.pop(self.CACHE_KEY, None)
@@ -56,48 +102,156 @@ class SchoolsViewSet(
         if not hasattr(self, '_country'):
             self._country = get_object_or_404(
                 Country.objects.defer(
-                    'geometry', 'geometry_simplified',
-                ).select_related('last_weekly_status').annotate(code_lower=Lower('code')),
+                    'geometry', 'geometry_simplified', 'schools_map_snapshot__payload',
+                ).select_related(
+                    'last_weekly_status', 'schools_map_snapshot',
+                ).annotate(code_lower=Lower('code')),
                 code_lower=self.kwargs.get('country_code'),
             )
         return self._country
 
     def get_queryset(self):
-        return super().get_queryset().filter(country=self.get_country())
+        qs = super().get_queryset().filter(country=self.get_country())
+        if self.is_viewport_request():
+            qs = qs.only(
+                'id', 'name', 'geopoint', 'last_weekly_status__connectivity_speed', 'last_weekly_status__connectivity',
+                'last_weekly_status__coverage_type', 'last_weekly_status__coverage_availability',
+            )
+        return qs
+
+    def get_viewport_cache_key(self):
+        # country data version is a part of key, so cached pages are outdated together with country data
+        params = dict(self.request.query_params)
+        params.pop(self.CACHE_KEY, None)
+        country = self.get_country()
+        return '{0}_{1}_{2}_{3}'.format(
+            self.VIEWPORT_CACHE_KEY_PREFIX,
+            country.code.lower(),
+            country_data_versions.get_many([country.id])[country.id],
+            hashlib.blake2b(str(sorted(params.items())).encode(), digest_size=16).hexdigest(),
+        )
+
+    def get_viewport_response(self, request, *args, **kwargs):
+        cache_key = self.get_viewport_cache_key()
+        data = cache.get(cache_key) if self.use_cached_data() else None
+        if data is None:
+            data = mixins.ListModelMixin.list(self, request, *args, **kwargs).data
+            cache.set(cache_key, data, settings.SCHOOLS_VIEWPORT_CACHE_TIMEOUT)
+        return Response(data=data)
+
+    def get_schools_map_snapshot(self):
+        # snapshot contains full schools list, so it's applicable only when nothing else is requested
+        params = set(self.request.query_params.keys()) - {self.CACHE_KEY}
+        if params or not self.use_cached_data():
+            return None
+
+        country = self.get_country()
+        snapshot = getattr(country, 'schools_map_snapshot', None)
+        if snapshot and snapshot.data_version != country_data_versions.get_many([country.id])[country.id]:
+            # country data is changed after snapshot was built, soft cached list is served until it's rebuilt
+            if cache.add(get_snapshot_refresh_lease_key(country.id), 1, settings.SOFT_CACHE_REFRESH_LEASE_TIMEOUT):
+                update_country_schools_map.delay(country.id)
+            return None
+        return snapshot
+
+    def list(self, request, *args, **kwargs):
+        if self.is_viewport_request():
+            return self.get_viewport_response(request, *args, **kwargs)
+
+        snapshot = self.get_schools_map_snapshot()
+        if not snapshot:
+            return super(SchoolsViewSet, self).list(request, *args, **kwargs)
+
+        last_modified = int(snapshot.built_at.timestamp())
+        response = get_conditional_response(request, etag=snapshot.etag, last_modified=last_modified)
+        if response is None:
+            payload = bytes(snapshot.payload)
+            if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                response = HttpResponse(payload, content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(payload), content_type='application/json')
+
+        response['ETag'] = snapshot.etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
 
     def get_serializer_class(self):
         serializer_class = self.serializer_class
         if self.action == 'list':
-            serializer_class = ListSchoolSerializer
-        if self.action == 'export_csv_schools':
-            serializer_class = CSVSchoolsListSerializer
+            serializer_class = CompactSchoolSerializer if self.is_viewport_request() else ListSchoolSerializer
         return serializer_class
 
+    def get_export_backend_class(self, file_format):
+        backend_class = self.EXPORT_BACKENDS.get(file_format)
+        if not backend_class or not backend_class.is_available():
+            raise ValidationError({self.export_format_param: 'Unsupported format.'})
+        return backend_class
+
     @action(methods=['get'], detail=False, url_path='export-csv-schools', url_name='export_csv_schools')
     def export_csv_schools(self, request, *args, **kwargs):
-        country = get_object_or_404(
-            self.get_queryset().annotate(code_lower=Lower('code')),
-            code_lower=self.kwargs.get('country_code'),
-        )
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        csvwriter = SchoolsCSVWriterBackend(serializer, country)
-        response = csvwriter.write()
-        return response
+        # format names with .gz suffix are gzip compressed while they're streamed
+        file_format = request.query_params.get(self.export_format_param, 'csv')
+        compress = file_format.endswith('.gz')
+        if compress:
+            file_format = file_format[:-len('.gz')]
+
+        backend_class = self.get_export_backend_class(file_format)
+        if compress and not backend_class.compressible:
+            raise ValidationError({self.export_format_param: 'Unsupported format.'})
+
+        country = self.get_country()
+        rows = iterate_export_rows(country, self.get_queryset())
+        return backend_class(rows, EXPORT_FIELDS, country, compress=compress).write()
 
 
 @method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
 class RandomSchoolsListAPIView(CachedListMixin, ListAPIView):
     LIST_CACHE_KEY_PREFIX = 'RANDOM_SCHOOLS'
 
-    queryset = School.objects.order_by('?')[:settings.RANDOM_SCHOOLS_DEFAULT_AMOUNT]
     serializer_class = SchoolPointSerializer
     pagination_class = None
+    size_param = 'size'
+    seed_param = 'seed'
 
-    def get_serializer(self, *args, **kwargs):
-        countries_statuses = Country.objects.all().defer('geometry', 'geometry_simplified').select_related(
-            'last_weekly_status',
-        ).values_list(
-            'id', 'last_weekly_status__integration_status',
+    def get_int_param(self, name, default=None, max_value=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: 'Invalid value.'})
+        if value < 0 or (max_value is not None and value > max_value):
+            raise ValidationError({name: 'Value is out of range.'})
+        return value
+
+    def get_queryset(self):
+        return sample_schools(
+            self.get_int_param(
+                self.size_param, default=settings.RANDOM_SCHOOLS_DEFAULT_AMOUNT,
+                max_value=settings.RANDOM_SCHOOLS_MAX_AMOUNT,
+            ),
+            seed=self.get_int_param(self.seed_param, max_value=MAX_SEED),
         )
-        kwargs['countries_statuses'] = dict(countries_statuses)
-        return super(RandomSchoolsListAPIView, self).get_serializer(*args, **kwargs)
+
+
+@method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
+class SchoolsTileAPIView(VectorTileMixin, APIView):
+    tile_class = SchoolsTile
+
+
+@method_decorator([cache_control(public=True, max_age=settings.CACHE_CONTROL_MAX_AGE)], name='dispatch')
+class SchoolsClustersListAPIView(ListAPIView):
+    queryset = SchoolsCluster.objects.all()
+    serializer_class = SchoolsClusterSerializer
+    pagination_class = None
+    filter_backends = (
+        DjangoFilterBackend,
+        ClusterZoomFilter,
+        InBBoxFilter,
+    )
+    filterset_fields = ('country',)
+    max_zoom = CLUSTERS_MAX_ZOOM
@@ -12,4 +12,6 @@ app_name = 'schools'
 urlpatterns = [
     path('', include(country_schools.urls)),
     path('schools/random/', api.RandomSchoolsListAPIView.as_view(), name='random-schools'),
+    path('schools/clusters/', api.SchoolsClustersListAPIView.as_view(), name='schools-clusters'),
+    path('tiles/schools/<int:z>/<int:x>/<int:y>.mvt', api.SchoolsTileAPIView.as_view(), name='schools-tiles'),
 ]
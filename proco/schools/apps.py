@@ -7,3 +7,4 @@ class SchoolsConfig(AppConfig):
 
     def ready(self):
         from proco.schools import signals  # NOQA
+        from proco.schools import warmers  # NOQA
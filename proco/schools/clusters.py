@@ -0,0 +1,69 @@
+import logging
+
+from django.contrib.gis.geos import Polygon
+from django.db import connection, transaction
+
+from proco.connection_statistics.aggregations import CONNECTIVITY_FILTERS_BY_AVAILABILITY
+from proco.locations.models import Country
+from proco.schools.constants import ColorMapSchema
+from proco.schools.models import School, SchoolsCluster
+from proco.schools.tiles import get_status_expression
+from proco.utils.tiles import MERCATOR_ORIGIN
+
+logger = logging.getLogger('django.' + __name__)
+
+CLUSTERS_MAX_ZOOM = 12
+# cluster cell is a quarter of 256px map tile
+CLUSTER_CELLS_PER_TILE = 4
+
+# web mercator is not defined for poles
+MERCATOR_BBOX = Polygon.from_bbox((-180, -85.0511, 180, 85.0511))
+
+
+def build_schools_clusters(country: Country) -> int:
+    # all zoom levels are calculated by single scan over country schools
+    schools = School.objects.filter(country=country, geopoint__intersects=MERCATOR_BBOX).annotate(
+        connectivity_status=get_status_expression('connectivity_availability', CONNECTIVITY_FILTERS_BY_AVAILABILITY),
+    ).order_by().values('geopoint', 'connectivity_status')
+    schools_sql, schools_params = schools.query.sql_with_params()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        SchoolsCluster.objects.filter(country=country).delete()
+        cursor.execute(
+            f"""
+            INSERT INTO {SchoolsCluster._meta.db_table} (
+                country_id, zoom, cell_x, cell_y, geopoint, schools_count,
+                connectivity_good, connectivity_moderate, connectivity_no, connectivity_unknown
+            )
+            SELECT %s, zoom, cell_x, cell_y,
+                ST_Transform(ST_SetSRID(ST_MakePoint(AVG(ST_X(point)), AVG(ST_Y(point))), 3857), 4326),
+                COUNT(*),
+                COUNT(*) FILTER (WHERE connectivity_status = %s),
+                COUNT(*) FILTER (WHERE connectivity_status = %s),
+                COUNT(*) FILTER (WHERE connectivity_status = %s),
+                COUNT(*) FILTER (WHERE connectivity_status IS NULL OR connectivity_status = %s)
+            FROM (
+                SELECT zoom, point, connectivity_status,
+                    FLOOR((ST_X(point) + %s) / (2 * %s / (POWER(2, zoom) * %s)))::int AS cell_x,
+                    FLOOR((%s - ST_Y(point)) / (2 * %s / (POWER(2, zoom) * %s)))::int AS cell_y
+                FROM (
+                    SELECT ST_Transform(schools.geopoint, 3857) AS point, schools.connectivity_status
+                    FROM ({schools_sql}) schools
+                ) points
+                CROSS JOIN generate_series(0, %s) AS zoom
+            ) cells
+            GROUP BY zoom, cell_x, cell_y
+            """,  # noqa: S608
+            [
+                country.id,
+                ColorMapSchema.GOOD, ColorMapSchema.MODERATE, ColorMapSchema.NO, ColorMapSchema.UNKNOWN,
+                MERCATOR_ORIGIN, MERCATOR_ORIGIN, CLUSTER_CELLS_PER_TILE,
+                MERCATOR_ORIGIN, MERCATOR_ORIGIN, CLUSTER_CELLS_PER_TILE,
+                *schools_params,
+                CLUSTERS_MAX_ZOOM,
+            ],
+        )
+        clusters_count = cursor.rowcount
+
+    logger.info('%s schools clusters built for %s', clusters_count, country)
+    return clusters_count
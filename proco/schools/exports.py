@@ -0,0 +1,37 @@
+from typing import Iterator, Tuple
+
+from django.conf import settings
+
+from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.schools.constants import statuses_schema
+
+EXPORT_FIELDS = ('name', 'geopoint', 'connectivity_status')
+
+
+def get_connectivity_status(availability, connectivity_speed, connectivity):
+    # same as SchoolWeeklyStatus.get_connectivity_status, but doesn't require model instance
+    if availability in [CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.static_speed,
+                        CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.realtime_speed]:
+        return statuses_schema.get_connectivity_status_by_connectivity_speed(connectivity_speed)
+    elif availability == CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.connectivity:
+        return statuses_schema.get_status_by_availability(connectivity)
+
+
+def iterate_export_rows(country, queryset) -> Iterator[Tuple]:
+    """
+    Rows of EXPORT_FIELDS for every school of queryset.
+    Only required columns are selected and rows are fetched by server side cursor in chunks,
+    so memory usage doesn't depend on amount of schools.
+    """
+    availability = country.last_weekly_status.connectivity_availability if country.last_weekly_status else None
+
+    rows = queryset.order_by('id').values_list(
+        'name', 'geopoint', 'last_weekly_status_id',
+        'last_weekly_status__connectivity_speed', 'last_weekly_status__connectivity',
+    ).iterator(chunk_size=settings.SCHOOLS_EXPORT_CHUNK_SIZE)
+
+    for name, geopoint, weekly_status_id, connectivity_speed, connectivity in rows:
+        connectivity_status = None
+        if availability and weekly_status_id:
+            connectivity_status = get_connectivity_status(availability, connectivity_speed, connectivity)
+        yield name, geopoint, connectivity_status
@@ -0,0 +1,65 @@
+from django.contrib.gis.geos import Polygon
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from proco.locations.models import Location
+
+
+class InBBoxFilter(BaseFilterBackend):
+    # in_bbox=<min lon>,<min lat>,<max lon>,<max lat>
+    bbox_param = 'in_bbox'
+
+    def get_bbox(self, request):
+        value = request.query_params.get(self.bbox_param, '')
+        if not value:
+            return None
+
+        try:
+            bbox = tuple(map(float, value.split(',')))
+        except ValueError:
+            raise ValidationError({self.bbox_param: 'Invalid bbox.'})
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValidationError({self.bbox_param: 'Invalid bbox.'})
+        polygon = Polygon.from_bbox(bbox)
+        polygon.srid = 4326
+        return polygon
+
+    def filter_queryset(self, request, queryset, view):
+        bbox = self.get_bbox(request)
+        if not bbox:
+            return queryset
+
+        return queryset.filter(**{f'{getattr(view, "bbox_filter_field", "geopoint")}__intersects': bbox})
+
+
+class WithinLocationFilter(BaseFilterBackend):
+    # within=<location id>, objects inside of admin area boundary
+    within_param = 'within'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.within_param, '')
+        if not value:
+            return queryset
+
+        try:
+            location_id = int(value)
+        except ValueError:
+            raise ValidationError({self.within_param: 'Invalid location.'})
+
+        geometry = Location.objects.filter(id=location_id).values_list('geometry', flat=True).first()
+        if not geometry:
+            return queryset.none()
+        return queryset.filter(**{f'{getattr(view, "bbox_filter_field", "geopoint")}__within': geometry})
+
+
+class ClusterZoomFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get('zoom', '0')
+        try:
+            zoom = int(value)
+        except ValueError:
+            raise ValidationError({'zoom': 'Invalid zoom.'})
+
+        # clusters of the most detailed level are used for bigger zoom
+        return queryset.filter(zoom=max(0, min(zoom, view.max_zoom)))
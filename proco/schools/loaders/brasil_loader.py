@@ -6,7 +6,8 @@ import requests
 from dateutil import parser as dateutil_parser
 from pytz import UTC
 
-from proco.connection_statistics.models import RealTimeConnectivity, SchoolWeeklyStatus
+from proco.connection_statistics.ingestion import IngestionEngine, MeasurementData, MeasurementSource
+from proco.connection_statistics.models import SchoolWeeklyStatus
 from proco.locations.models import Country
 from proco.schools.models import School
 from proco.utils.dates import get_current_week, get_current_year
@@ -90,56 +91,36 @@ class BrasilSimnetLoader(object):
         if date is None:
             date = timezone.now().date()
 
-        statistic = self.load_schools_statistic(date)
-
-        new_entries = []
-        schools = {}
-        last_schools_data = {}
-        for data in statistic:
-            if 'school_code' not in data or 'time' not in data or 'tcp_down_median_mbps' not in data:
-                continue
-
-            code = data['school_code']
-            if code in schools:
-                school = schools[code]
-            else:
-                school = School.objects.filter(country=self.country, external_id=data['school_code']).first()
-                schools[code] = school
-
-            if not school:
-                continue
-
-            entry_time = dateutil_parser.parse(data['time']).replace(tzinfo=UTC)
-            if school.id not in last_schools_data:
-                latest_school_entry = school.realtime_status.order_by('created').last()
-                if latest_school_entry:
-                    last_schools_data[school.id] = latest_school_entry.created
-                else:
-                    last_schools_data[school.id] = entry_time.replace(hour=0, minute=0, second=0)
-
-            if entry_time <= last_schools_data[school.id]:
-                # record already saved
-                continue
-
-            connectivity_speed = data.get('tcp_down_median_mbps', None)
-            if connectivity_speed:
-                # convert Mbps to bps
-                connectivity_speed = connectivity_speed * 10 ** 6
-
-            new_entries.append(
-                RealTimeConnectivity(
-                    created=entry_time, school=school,
-                    connectivity_speed=connectivity_speed,
-                    connectivity_latency=data.get('rtt_median_ms', None),
-                ),
-            )
+        return IngestionEngine(BrasilMeasurementSource(self, date)).run()
+
+
+class BrasilMeasurementSource(MeasurementSource):
+    # whole day is loaded every time, entries saved before are dropped by engine as duplicates
+    name = 'brasil'
 
-            if len(new_entries) == 5000:
-                RealTimeConnectivity.objects.bulk_create(new_entries)
-                new_entries = []
+    def __init__(self, loader: BrasilSimnetLoader, date):
+        self.loader = loader
+        self.date = date
 
-        if len(new_entries) > 0:
-            RealTimeConnectivity.objects.bulk_create(new_entries)
+    def read(self):
+        yield from self.loader.load_schools_statistic(self.date)
+
+    def parse(self, entry):
+        if 'school_code' not in entry or 'time' not in entry or 'tcp_down_median_mbps' not in entry:
+            return None
+
+        connectivity_speed = entry['tcp_down_median_mbps']
+        if connectivity_speed:
+            # convert Mbps to bps
+            connectivity_speed = connectivity_speed * 10 ** 6
+
+        return MeasurementData(
+            external_id=str(entry['school_code']),
+            country_code='BR',
+            timestamp=dateutil_parser.parse(entry['time']).replace(tzinfo=UTC),
+            connectivity_speed=connectivity_speed,
+            connectivity_latency=entry.get('rtt_median_ms', None),
+        )
 
 
 brasil_statistic_loader = BrasilSimnetLoader()
@@ -1,8 +1,11 @@
 import logging
 from typing import Iterable, List, Tuple
 
+from django.conf import settings
+
 from proco.locations.models import Country
 from proco.schools.loaders import csv as csv_loader
+from proco.schools.loaders import staging
 from proco.schools.loaders import xls as xls_loader
 from proco.schools.loaders.pipeline import (  # remove_too_close_points,
     create_new_schools,
@@ -42,6 +45,10 @@ def save_data(country: Country, loaded: Iterable[dict], ignore_errors=False) ->
     if errors and not ignore_errors:
         return warnings, errors, 0
 
+    if len(schools_data) >= settings.SCHOOLS_IMPORT_COPY_MIN_ROWS:
+        # big files are merged in database instead of building model instance for every row
+        return warnings, errors, staging.import_schools(country, schools_data)
+
     map_schools_by_external_id(country, schools_data)
     # map_schools_by_geopoint_and_education_level(country, schools_data)
     # map_schools_by_geopoint_and_empty_education_level(country, schools_data)
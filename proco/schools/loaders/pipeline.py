@@ -328,16 +328,16 @@ def update_existing_schools(rows: List[dict]):
     all_schools_to_update = [data for data in rows if not data.get('school_created', False)]
 
     logger.info(f'{len(all_schools_to_update)} schools will be updated')
-    fields_combinations = {tuple(sorted(data['school_data'].keys())) for data in all_schools_to_update}
 
-    for fields_combination in fields_combinations:
-        schools_to_update = []
-        for data in all_schools_to_update:
-            if tuple(sorted(data['school_data'].keys())) == fields_combination:
-                for field in fields_combination:
-                    setattr(data['school'], field, data['school_data'][field])
-                schools_to_update.append(data['school'])
+    # schools are grouped by set of provided fields in single pass
+    schools_by_fields_combination = {}
+    for data in all_schools_to_update:
+        fields_combination = tuple(sorted(data['school_data'].keys()))
+        for field in fields_combination:
+            setattr(data['school'], field, data['school_data'][field])
+        schools_by_fields_combination.setdefault(fields_combination, []).append(data['school'])
 
+    for fields_combination, schools_to_update in schools_by_fields_combination.items():
         logger.info(f'{len(schools_to_update)} schools will be updated with {fields_combination}')
         School.objects.bulk_update(schools_to_update, fields_combination, batch_size=1000)
 
@@ -0,0 +1,269 @@
+import csv
+import logging
+import tempfile
+from datetime import date
+from typing import List
+
+from django.db import connection, transaction
+
+from isoweek import Week
+
+from proco.connection_statistics.models import SchoolWeeklyStatus
+from proco.locations.models import Country
+from proco.schools.models import School
+
+logger = logging.getLogger('django.' + __name__)
+
+STAGING_TABLE = 'schools_import_staging'
+# staging rows are kept in memory up to this size, bigger files are spooled to disk before copy
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+SCHOOL_SERVICE_FIELDS = ('id', 'created', 'modified', 'country', 'geopoint', 'name_lower')
+WEEKLY_STATUS_SERVICE_FIELDS = ('id', 'created', 'modified', 'school', 'year', 'week', 'date')
+
+
+def qn(name):
+    return connection.ops.quote_name(name)
+
+
+def get_default(field):
+    return field.get_db_prep_save(field.get_default(), connection)
+
+
+def get_weekly_status_fields():
+    return [
+        field for field in SchoolWeeklyStatus._meta.concrete_fields
+        if field.name not in WEEKLY_STATUS_SERVICE_FIELDS
+    ]
+
+
+def get_staging_column(field):
+    # weekly status columns are prefixed, so they never clash with school ones
+    if field.model is SchoolWeeklyStatus:
+        return qn(f'weekly_{field.column}')
+    return qn(field.column)
+
+
+def get_point_expression(alias='s'):
+    srid = School._meta.get_field('geopoint').srid
+    return f'ST_SetSRID(ST_MakePoint({alias}.lon, {alias}.lat), {srid})'
+
+
+def create_staging_table(cursor, school_fields, weekly_fields):
+    columns = [
+        'row_index integer',
+        'school_id integer',
+        'school_created boolean NOT NULL DEFAULT false',
+        'lon double precision',
+        'lat double precision',
+        # names of provided weekly status fields, other ones are copied from previous status of school
+        'history_fields text[]',
+    ] + [
+        f'{get_staging_column(field)} {field.db_type(connection)}'
+        for field in school_fields + weekly_fields
+    ]
+    cursor.execute(f'CREATE TEMPORARY TABLE {STAGING_TABLE} ({", ".join(columns)}) ON COMMIT DROP')
+
+
+def copy_rows_to_staging(cursor, rows: List[dict], school_fields, weekly_fields):
+    def prepare(field, value):
+        return field.get_db_prep_save(value, connection) if value is not None else None
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+', newline='') as csv_file:
+        # strings are quoted, so empty string and null (empty unquoted value) are different
+        writer = csv.writer(csv_file, quoting=csv.QUOTE_NONNUMERIC)
+        for data in rows:
+            school_data, history_data = data['school_data'], data['history_data']
+            point = school_data.get('geopoint')
+            writer.writerow([
+                data['row_index'],
+                point.x if point else None,
+                point.y if point else None,
+                '{' + ','.join(history_data.keys()) + '}',
+                *(prepare(field, school_data.get(field.name)) for field in school_fields),
+                *(prepare(field, history_data.get(field.name)) for field in weekly_fields),
+            ])
+
+        csv_file.seek(0)
+        columns = ['row_index', 'lon', 'lat', 'history_fields'] + [
+            get_staging_column(field) for field in school_fields + weekly_fields
+        ]
+        cursor.copy_expert(f'COPY {STAGING_TABLE} ({", ".join(columns)}) FROM STDIN WITH (FORMAT CSV)', csv_file)
+
+    # planner needs statistics of staging table to choose hash joins for big files
+    cursor.execute(f'ANALYZE {STAGING_TABLE}')
+
+
+def map_schools_by_external_id(cursor, country: Country, school_fields):
+    if 'external_id' not in {field.name for field in school_fields}:
+        return
+
+    cursor.execute(
+        f"""
+        UPDATE {STAGING_TABLE} s SET school_id = school.id
+        FROM {School._meta.db_table} school
+        WHERE school.country_id = %s AND school.external_id = s.external_id
+        """,  # noqa: S608
+        [country.id],
+    )
+    logger.info(f'{cursor.rowcount} mapped by external_id')
+
+
+def create_new_schools(cursor, country: Country, school_fields):
+    # ids are reserved before insert, so staging rows are linked with created schools
+    cursor.execute(
+        f"""
+        UPDATE {STAGING_TABLE}
+        SET school_id = nextval(pg_get_serial_sequence(%s, 'id')), school_created = true
+        WHERE school_id IS NULL
+        """,  # noqa: S608
+        [School._meta.db_table],
+    )
+    if not cursor.rowcount:
+        return
+    logger.info(f'{cursor.rowcount} schools will be created')
+
+    provided_fields = set(school_fields)
+    name_field = School._meta.get_field('name')
+    name_expression = f'COALESCE(s.{get_staging_column(name_field)}, %s)' if name_field in provided_fields else '%s'
+    columns = ['id', 'created', 'modified', 'country_id', 'geopoint', 'name_lower']
+    values = ['s.school_id', 'now()', 'now()', '%s', get_point_expression(), f'lower({name_expression})']
+    params = [country.id, get_default(name_field)]
+
+    for field in School._meta.concrete_fields:
+        if field.name in SCHOOL_SERVICE_FIELDS:
+            continue
+        columns.append(qn(field.column))
+        if field in provided_fields:
+            values.append(f'COALESCE(s.{get_staging_column(field)}, %s)')
+        else:
+            values.append('%s')
+        params.append(get_default(field))
+
+    cursor.execute(
+        f"""
+        INSERT INTO {School._meta.db_table} ({", ".join(columns)})
+        SELECT {", ".join(values)} FROM {STAGING_TABLE} s WHERE s.school_created
+        """,  # noqa: S608
+        params,
+    )
+
+
+def update_existing_schools(cursor, school_fields):
+    # only provided values are updated, they are never empty after validation
+    assignments = ['modified = now()', f'geopoint = COALESCE({get_point_expression()}, school.geopoint)']
+    for field in school_fields:
+        column = qn(field.column)
+        value = f'COALESCE(s.{get_staging_column(field)}, school.{column})'
+        assignments.append(f'{column} = {value}')
+        if field.name == 'name':
+            assignments.append(f'name_lower = lower({value})')
+
+    cursor.execute(
+        f"""
+        UPDATE {School._meta.db_table} school SET {", ".join(assignments)}
+        FROM {STAGING_TABLE} s
+        WHERE school.id = s.school_id AND NOT s.school_created
+        """,  # noqa: S608
+    )
+    logger.info(f'{cursor.rowcount} schools updated')
+
+
+def update_schools_weekly_statuses(cursor, weekly_fields) -> int:
+    year, week_number, _week_day = date.today().isocalendar()
+    status_date = Week(year, week_number).monday()
+    schools_table = School._meta.db_table
+    statuses_table = SchoolWeeklyStatus._meta.db_table
+
+    # not provided values are taken from current last status of school
+    assignments = []
+    params = []
+    for field in weekly_fields:
+        staging_column = get_staging_column(field)
+        assignments.append(
+            f'{staging_column} = CASE WHEN %s = ANY(s.history_fields) '
+            f'THEN s.{staging_column} ELSE last.{qn(field.column)} END',
+        )
+        params.append(field.name)
+    cursor.execute(
+        f"""
+        UPDATE {STAGING_TABLE} s SET {", ".join(assignments)}
+        FROM {schools_table} school
+        JOIN {statuses_table} last ON last.id = school.last_weekly_status_id
+        WHERE school.id = s.school_id
+        """,  # noqa: S608
+        params,
+    )
+
+    # re-create statuses of current week with new data
+    cursor.execute(
+        f"""
+        UPDATE {schools_table} SET last_weekly_status_id = NULL
+        WHERE id IN (SELECT school_id FROM {STAGING_TABLE})
+        """,  # noqa: S608
+    )
+    cursor.execute(
+        f"""
+        DELETE FROM {statuses_table}
+        WHERE school_id IN (SELECT school_id FROM {STAGING_TABLE}) AND year = %s AND week = %s
+        """,  # noqa: S608
+        [year, week_number],
+    )
+
+    columns = ['created', 'modified', 'school_id', 'year', 'week', 'date']
+    values = ['now()', 'now()', 's.school_id', '%s', '%s', '%s']
+    params = [year, week_number, status_date]
+    for field in weekly_fields:
+        columns.append(qn(field.column))
+        values.append(f'COALESCE(s.{get_staging_column(field)}, %s)')
+        params.append(get_default(field))
+    cursor.execute(
+        f"""
+        INSERT INTO {statuses_table} ({", ".join(columns)})
+        SELECT {", ".join(values)} FROM {STAGING_TABLE} s
+        """,  # noqa: S608
+        params,
+    )
+    processed_rows = cursor.rowcount
+
+    cursor.execute(
+        f"""
+        UPDATE {schools_table} school SET last_weekly_status_id = status.id
+        FROM {statuses_table} status
+        WHERE status.school_id = school.id AND status.year = %s AND status.week = %s
+            AND school.id IN (SELECT school_id FROM {STAGING_TABLE})
+        """,  # noqa: S608
+        [year, week_number],
+    )
+    logger.info(f'updated weekly statuses for {processed_rows} schools')
+
+    return processed_rows
+
+
+def import_schools(country: Country, rows: List[dict]) -> int:
+    """
+    Save validated rows by copying them into temporary staging table and merging it in sql.
+    Does the same as regular ingestion pipeline, but doesn't build model instance for every row.
+    Returns amount of processed rows.
+    """
+    if not rows:
+        return 0
+
+    school_fields_names = set().union(*(data['school_data'].keys() for data in rows))
+    school_fields = [
+        field for field in School._meta.concrete_fields
+        if field.name in school_fields_names and field.name not in SCHOOL_SERVICE_FIELDS
+    ]
+    weekly_fields = get_weekly_status_fields()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        create_staging_table(cursor, school_fields, weekly_fields)
+        copy_rows_to_staging(cursor, rows, school_fields, weekly_fields)
+        logger.info(f'{len(rows)} rows copied to staging table')
+
+        map_schools_by_external_id(cursor, country, school_fields)
+        create_new_schools(cursor, country, school_fields)
+        update_existing_schools(cursor, school_fields)
+        processed_rows = update_schools_weekly_statuses(cursor, weekly_fields)
+
+    return processed_rows
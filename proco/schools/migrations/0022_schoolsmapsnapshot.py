@@ -0,0 +1,26 @@
+# Generated by Django 2.2.18 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0011_auto_20210415_0731'),
+        ('schools', '0021_auto_20210415_0731'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolsMapSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.BinaryField()),
+                ('etag', models.CharField(max_length=64)),
+                ('schools_count', models.PositiveIntegerField(default=0)),
+                ('built_at', models.DateTimeField()),
+                ('country', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schools_map_snapshot', to='locations.Country')),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.18 on 2026-10-18 11:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0011_auto_20210415_0731'),
+        ('schools', '0022_schoolsmapsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolsCluster',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('cell_x', models.IntegerField()),
+                ('cell_y', models.IntegerField()),
+                ('geopoint', django.contrib.gis.db.models.fields.PointField(srid=4326, verbose_name='Point')),
+                ('schools_count', models.PositiveIntegerField(default=0)),
+                ('connectivity_good', models.PositiveIntegerField(default=0)),
+                ('connectivity_moderate', models.PositiveIntegerField(default=0)),
+                ('connectivity_no', models.PositiveIntegerField(default=0)),
+                ('connectivity_unknown', models.PositiveIntegerField(default=0)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schools_clusters', to='locations.Country')),
+            ],
+            options={
+                'ordering': ('id',),
+                'unique_together': {('country', 'zoom', 'cell_x', 'cell_y')},
+                'index_together': {('zoom', 'country')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0023_schoolscluster'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolsmapsnapshot',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -84,3 +84,45 @@ class FileImport(TimeStampedModel):
     @property
     def filename(self):
         return self.uploaded_file.name.split('/')[-1]
+
+
+class SchoolsMapSnapshot(models.Model):
+    """
+    Pre-rendered schools list of the country as served by schools list endpoint, gzip compressed json.
+    """
+    country = models.OneToOneField(Country, related_name='schools_map_snapshot', on_delete=models.CASCADE)
+    payload = models.BinaryField()
+    etag = models.CharField(max_length=64)
+    schools_count = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField()
+    # country data version snapshot was built for, outdated snapshot is not served
+    data_version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.country} - {self.built_at}'
+
+
+class SchoolsCluster(models.Model):
+    """
+    Schools of the country grouped by web mercator grid cell for every clustered zoom level.
+    """
+    country = models.ForeignKey(Country, related_name='schools_clusters', on_delete=models.CASCADE)
+    zoom = models.PositiveSmallIntegerField()
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+    # center of mass of cell schools
+    geopoint = PointField(verbose_name=_('Point'))
+
+    schools_count = models.PositiveIntegerField(default=0)
+    connectivity_good = models.PositiveIntegerField(default=0)
+    connectivity_moderate = models.PositiveIntegerField(default=0)
+    connectivity_no = models.PositiveIntegerField(default=0)
+    connectivity_unknown = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('id',)
+        unique_together = ('country', 'zoom', 'cell_x', 'cell_y')
+        index_together = ('zoom', 'country')
+
+    def __str__(self):
+        return f'{self.country} - {self.zoom}/{self.cell_x}/{self.cell_y}'
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SchoolsCursorPagination(CursorPagination):
+    # keyset pagination by id, pages stay consistent while schools are added
+    ordering = 'id'
+    page_size = 1000
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
@@ -0,0 +1,61 @@
+import math
+import secrets
+
+from django.db import connection
+from django.db.models.query import RawQuerySet
+
+from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.locations.models import Country
+from proco.schools.models import School
+
+# seeds are passed to postgres as float and used in sample order, so they are kept within integer range
+MAX_SEED = 2 ** 31 - 1
+
+
+def get_schools_count_estimate() -> int:
+    # planner statistics are good enough to choose sampling rate and don't require table scan
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [School._meta.db_table])
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
+
+
+def get_sample_percent(size: int, total: int) -> float:
+    # bernoulli sample size is random, so rate is chosen to get at least requested amount in almost all cases
+    expected_size = size + 3 * math.sqrt(size) + 10
+    if not total or expected_size >= total:
+        return 100.0
+    return expected_size / total * 100
+
+
+def sample_schools(size: int, seed: int = None) -> RawQuerySet:
+    """
+    Uniform random sample of schools annotated with their country integration status.
+    Without seed rows are picked by TABLESAMPLE BERNOULLI, so table is scanned once without sorting.
+    Sampling rate depends on planner estimate of schools count, which is changed by every analyze,
+    so seeded sample is taken from all schools by seed order only:
+    the same seed gives the same sample while schools are not changed.
+    """
+    if seed is None:
+        seed = secrets.randbelow(MAX_SEED)
+        source = f'{School._meta.db_table} TABLESAMPLE BERNOULLI (%s) REPEATABLE (%s)'
+        params = [get_sample_percent(size, get_schools_count_estimate()), seed]
+    else:
+        source = School._meta.db_table
+        params = []
+
+    return School.objects.raw(
+        f"""
+        SELECT school.id, school.geopoint, school.country_id,
+            status.integration_status AS country_integration_status
+        FROM (
+            SELECT id, geopoint, country_id
+            FROM {source}
+        ) school
+        JOIN {Country._meta.db_table} country ON country.id = school.country_id
+        LEFT JOIN {CountryWeeklyStatus._meta.db_table} status ON status.id = country.last_weekly_status_id
+        ORDER BY md5(school.id::text || %s)
+        LIMIT %s
+        """,  # noqa: S608
+        params + [str(seed), size],
+    )
@@ -2,8 +2,7 @@ from rest_framework import serializers
 
 from proco.connection_statistics.models import CountryWeeklyStatus
 from proco.connection_statistics.serializers import SchoolWeeklyStatusSerializer
-from proco.locations.fields import GeoPointCSVField
-from proco.schools.models import School
+from proco.schools.models import School, SchoolsCluster
 
 
 class BaseSchoolSerializer(serializers.ModelSerializer):
@@ -16,18 +15,12 @@ class BaseSchoolSerializer(serializers.ModelSerializer):
 
 
 class SchoolPointSerializer(BaseSchoolSerializer):
-    country_integration_status = serializers.SerializerMethodField()
+    # annotated by schools sample query
+    country_integration_status = serializers.ReadOnlyField()
 
     class Meta(BaseSchoolSerializer.Meta):
         fields = ('geopoint', 'country_id', 'country_integration_status')
 
-    def __init__(self, *args, **kwargs):
-        self.countries_statuses = kwargs.pop('countries_statuses', None)
-        super(SchoolPointSerializer, self).__init__(*args, **kwargs)
-
-    def get_country_integration_status(self, obj):
-        return self.countries_statuses[obj.country_id]
-
 
 class CountryToSerializerMixin(object):
     def __init__(self, *args, **kwargs):
@@ -65,11 +58,14 @@ class ListSchoolSerializer(CountryToSerializerMixin, BaseSchoolSerializer):
         ]
 
 
-class CSVSchoolsListSerializer(ListSchoolSerializer):
-    geopoint = GeoPointCSVField()
+class CompactSchoolSerializer(ListSchoolSerializer):
+    # point as [lon, lat] instead of geojson
+    geopoint = serializers.SerializerMethodField()
 
-    class Meta(BaseSchoolSerializer.Meta):
-        fields = ('name', 'geopoint', 'connectivity_status')
+    def get_geopoint(self, obj):
+        if not obj.geopoint:
+            return None
+        return [round(obj.geopoint.x, 6), round(obj.geopoint.y, 6)]
 
 
 class SchoolSerializer(CountryToSerializerMixin, BaseSchoolSerializer):
@@ -107,3 +103,13 @@ class SchoolSerializer(CountryToSerializerMixin, BaseSchoolSerializer):
         return self.country.last_weekly_status.integration_status not in [
             CountryWeeklyStatus.COUNTRY_CREATED, CountryWeeklyStatus.SCHOOL_OSM_MAPPED,
         ]
+
+
+class SchoolsClusterSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SchoolsCluster
+        fields = (
+            'geopoint', 'country_id', 'schools_count',
+            'connectivity_good', 'connectivity_moderate', 'connectivity_no', 'connectivity_unknown',
+        )
+        read_only_fields = fields
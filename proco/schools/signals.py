@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from django.conf import settings
 from django.db.models import F
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -32,7 +33,8 @@ def change_integration_status_country(instance, created=False, **kwargs):
                 else:
                     country_weekly.save()
 
-        if created:
+        # with incremental statistics school is counted by delta when it gets first weekly status
+        if created and not settings.COUNTRY_STATISTICS_INCREMENTAL:
             if country_weekly_exists:
                 country_weekly.schools_total = F('schools_total') + 1
                 country_weekly.schools_connectivity_unknown = F('schools_connectivity_unknown') + 1
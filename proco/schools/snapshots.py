@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+import io
+import logging
+from itertools import islice
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from rest_framework.renderers import JSONRenderer
+
+from proco.locations.models import Country
+from proco.schools.models import School, SchoolsMapSnapshot
+from proco.schools.serializers import ListSchoolSerializer
+from proco.utils.cache import country_data_versions
+
+logger = logging.getLogger('django.' + __name__)
+
+SNAPSHOT_CHUNK_SIZE = 5000
+# only one rebuild is queued for outdated snapshot until it's done
+SNAPSHOT_REFRESH_LEASE_PREFIX = 'SCHOOLS_MAP_SNAPSHOT_REFRESH'
+
+
+def get_snapshot_refresh_lease_key(country_id):
+    return '{0}_{1}'.format(SNAPSHOT_REFRESH_LEASE_PREFIX, country_id)
+
+
+def render_schools_map(country: Country) -> (bytes, str, int):
+    # the same json schools list endpoint renders, written chunk by chunk into gzip stream
+    renderer = JSONRenderer()
+    checksum = hashlib.blake2b(digest_size=20)
+    buffer = io.BytesIO()
+    schools_count = 0
+
+    schools = School.objects.filter(country=country).select_related('last_weekly_status').iterator(
+        chunk_size=SNAPSHOT_CHUNK_SIZE,
+    )
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as stream:
+        def write(data):
+            checksum.update(data)
+            stream.write(data)
+
+        write(b'[')
+        while True:
+            chunk = list(islice(schools, SNAPSHOT_CHUNK_SIZE))
+            if not chunk:
+                break
+
+            if schools_count:
+                write(b',')
+            # rendered list without surrounding brackets
+            write(renderer.render(ListSchoolSerializer(chunk, many=True, country=country).data)[1:-1])
+            schools_count += len(chunk)
+        write(b']')
+
+    return buffer.getvalue(), quote_etag(checksum.hexdigest()), schools_count
+
+
+def build_schools_map_snapshot(country: Country) -> SchoolsMapSnapshot:
+    # version should be taken before rendering, so changes made during it are not lost
+    data_version = country_data_versions.get_many([country.id])[country.id]
+    country = Country.objects.defer('geometry', 'geometry_simplified').select_related(
+        'last_weekly_status',
+    ).get(id=country.id)
+    payload, etag, schools_count = render_schools_map(country)
+
+    snapshot = SchoolsMapSnapshot.objects.filter(country=country).defer('payload').first()
+    if snapshot and snapshot.etag == etag:
+        # content is the same, so clients revalidating by last modified date are not forced to download it again
+        if snapshot.data_version != data_version:
+            snapshot.data_version = data_version
+            snapshot.save(update_fields=('data_version',))
+    else:
+        snapshot, _created = SchoolsMapSnapshot.objects.update_or_create(country=country, defaults={
+            'payload': payload,
+            'etag': etag,
+            'schools_count': schools_count,
+            'built_at': timezone.now(),
+            'data_version': data_version,
+        })
+        logger.info('schools map snapshot for %s built: %s schools, %s bytes', country, schools_count, len(payload))
+
+    cache.delete(get_snapshot_refresh_lease_key(country.id))
+    return snapshot
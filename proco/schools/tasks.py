@@ -10,9 +10,11 @@ from django.db import transaction
 
 from proco.connection_statistics.utils import update_country_data_source_by_csv_filename, update_country_weekly_status
 from proco.locations.models import Country
+from proco.schools.clusters import build_schools_clusters
 from proco.schools.loaders import ingest
 from proco.schools.loaders.ingest import UnsupportedFileFormatException, load_data
 from proco.schools.models import FileImport
+from proco.schools.snapshots import build_schools_map_snapshot
 from proco.taskapp import app
 from proco.utils.tasks import update_country_related_cache
 
@@ -110,10 +112,12 @@ def process_loaded_file(pk: int, force: bool = False):
 
         if not errors or force:
             def update_stats():
+                # imports change availability modes and schools totals, so deltas aren't enough here
                 update_country_weekly_status(imported_file.country)
                 update_country_data_source_by_csv_filename(imported_file)
                 imported_file.country.invalidate_country_related_cache()
                 update_country_related_cache.delay(imported_file.country.code)
+                update_country_schools_map.delay(imported_file.country_id)
 
             transaction.on_commit(update_stats)
     except UnsupportedFileFormatException as e:
@@ -126,3 +130,12 @@ def process_loaded_file(pk: int, force: bool = False):
         imported_file.errors = traceback.format_exc()
         imported_file.save()
         raise
+
+
+@app.task(soft_time_limit=30 * 60, time_limit=30 * 60)
+def update_country_schools_map(country_id):
+    # precalculated data used by schools map: list snapshot and clusters
+    country = Country.objects.filter(id=country_id).defer('geometry', 'geometry_simplified').first()
+    if country:
+        build_schools_map_snapshot(country)
+        build_schools_clusters(country)
@@ -1,3 +1,8 @@
+import gzip
+import json
+from unittest.mock import patch
+
+from django.contrib.gis.geos import GEOSGeometry
 from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
@@ -6,8 +11,11 @@ from rest_framework import status
 
 from proco.connection_statistics.models import CountryWeeklyStatus
 from proco.connection_statistics.tests.factories import SchoolWeeklyStatusFactory
-from proco.locations.tests.factories import CountryFactory
+from proco.locations.tests.factories import CountryFactory, LocationFactory
+from proco.schools.models import SchoolsMapSnapshot
+from proco.schools.snapshots import build_schools_map_snapshot
 from proco.schools.tests.factories import SchoolFactory
+from proco.utils.cache import country_data_versions
 from proco.utils.tests import TestAPIViewSetMixin
 
 
@@ -133,6 +141,180 @@ class SchoolsApiTestCase(TestAPIViewSetMixin, TestCase):
             list(sorted(cache.keys('*'))),  # noqa: C413
             list(sorted([  # noqa: C413
                 f'SOFT_CACHE_COUNTRY_INFO_pk_{self.country.code.lower()}',
+                f'SOFT_CACHE_PAYLOAD_COUNTRY_INFO_pk_{self.country.code.lower()}',
                 f'SOFT_CACHE_SCHOOLS_{self.country.code.lower()}_',
+                f'SOFT_CACHE_PAYLOAD_SCHOOLS_{self.country.code.lower()}_',
             ])),
         )
+
+    def test_schools_list_snapshot(self):
+        build_schools_map_snapshot(self.country)
+        url = reverse('schools:schools-list', args=[self.country.code.lower()])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertListEqual(
+            sorted(school['id'] for school in json.loads(response.content)),
+            sorted([self.school_one.id, self.school_two.id, self.school_three.id]),
+        )
+        self.assertIn('connectivity_status', json.loads(response.content)[0])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 3)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_schools_list_snapshot_rebuild(self):
+        snapshot = build_schools_map_snapshot(self.country)
+        self.assertEqual(build_schools_map_snapshot(self.country).built_at, snapshot.built_at)
+
+        SchoolFactory(country=self.country, location__country=self.country)
+        rebuilt_snapshot = build_schools_map_snapshot(self.country)
+        self.assertNotEqual(rebuilt_snapshot.etag, snapshot.etag)
+        self.assertEqual(rebuilt_snapshot.schools_count, 4)
+
+        # snapshot is not used when data is explicitly requested from database
+        response = self.client.get(reverse('schools:schools-list', args=[self.country.code.lower()]), {'cache': 'off'})
+        self.assertEqual(len(response.data), 4)
+
+    def test_schools_list_snapshot_outdated(self):
+        build_schools_map_snapshot(self.country)
+        url = reverse('schools:schools-list', args=[self.country.code.lower()])
+
+        SchoolFactory(country=self.country, location__country=self.country)
+        version = country_data_versions.bump(self.country.id)
+
+        # outdated snapshot is not served, it's rebuilt in background
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(SchoolsMapSnapshot.objects.get(country=self.country).data_version, version)
+
+        response = self.client.get(url)
+        self.assertEqual(len(json.loads(response.content)), 4)
+        self.assertFalse(hasattr(response, 'data'))
+
+    def test_schools_viewport(self):
+        school_outside = SchoolFactory(
+            country=self.country, location__country=self.country, geopoint=GEOSGeometry('Point(10 10)'),
+        )
+        url = reverse('schools:schools-list', args=[self.country.code.lower()])
+
+        response = self.client.get(url, {'in_bbox': '0,0,2,2'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('next', response.data)
+        self.assertListEqual(
+            [school['id'] for school in response.data['results']],
+            [self.school_one.id, self.school_two.id, self.school_three.id],
+        )
+        self.assertEqual(response.data['results'][0]['geopoint'], [1, 1])
+        self.assertIn('connectivity_status', response.data['results'][0])
+
+        response = self.client.get(url, {'in_bbox': '0,0,20,20', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertListEqual(
+            [school['id'] for school in response.data['results']], [self.school_three.id, school_outside.id],
+        )
+
+    def test_schools_viewport_within_location(self):
+        location = LocationFactory(
+            country=self.country, geometry=GEOSGeometry('MultiPolygon(((9 9, 9 11, 11 11, 11 9, 9 9)))'),
+        )
+        school = SchoolFactory(country=self.country, location=location, geopoint=GEOSGeometry('Point(10 10)'))
+
+        response = self.client.get(
+            reverse('schools:schools-list', args=[self.country.code.lower()]), {'within': location.id},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([school['id'] for school in response.data['results']], [school.id])
+
+    def test_schools_viewport_cache(self):
+        url = reverse('schools:schools-list', args=[self.country.code.lower()])
+        self.assertEqual(len(self.client.get(url, {'in_bbox': '0,0,2,2'}).data['results']), 3)
+
+        SchoolFactory(country=self.country, location__country=self.country)
+        self.assertEqual(len(self.client.get(url, {'in_bbox': '0,0,2,2'}).data['results']), 3)
+
+        # cached pages are outdated by country data update
+        self.country.invalidate_country_related_cache()
+        self.assertEqual(len(self.client.get(url, {'in_bbox': '0,0,2,2'}).data['results']), 4)
+
+    def test_export_csv(self):
+        static_speed = CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.static_speed
+        self.country.last_weekly_status.connectivity_availability = static_speed
+        self.country.last_weekly_status.save()
+
+        response = self.client.get(reverse('schools:schools-export_csv_schools', args=[self.country.code.lower()]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Name,Geopoint,Connectivity Status')
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1], f'{self.school_one.name},1.0: 1.0,moderate')
+
+    def test_export_geojsonseq_gzip(self):
+        static_speed = CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.static_speed
+        self.country.last_weekly_status.connectivity_availability = static_speed
+        self.country.last_weekly_status.save()
+
+        response = self.client.get(
+            reverse('schools:schools-export_csv_schools', args=[self.country.code.lower()]),
+            {'file_format': 'geojsonseq.gz'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.geojsons.gz', response['Content-Disposition'])
+
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        features = [json.loads(record) for record in content.split('\x1e') if record]
+        self.assertEqual(len(features), 3)
+        self.assertEqual(features[0]['geometry'], {'type': 'Point', 'coordinates': [1.0, 1.0]})
+        self.assertEqual(features[0]['properties'], {'name': self.school_one.name, 'connectivity_status': 'moderate'})
+
+    def test_export_unsupported_format(self):
+        url = reverse('schools:schools-export_csv_schools', args=[self.country.code.lower()])
+        self.assertEqual(self.client.get(url, {'file_format': 'xls'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'file_format': 'parquet.gz'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RandomSchoolsApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.schools = [SchoolFactory(country=cls.country, location__country=cls.country) for _i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_random_schools(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('schools:random-schools'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['country_id'], self.country.id)
+        self.assertEqual(
+            response.data[0]['country_integration_status'], self.country.last_weekly_status.integration_status,
+        )
+
+    def test_random_schools_seed(self):
+        url = reverse('schools:random-schools')
+        response = self.client.get(url, {'size': 3, 'seed': 10, 'cache': 'off'})
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(self.client.get(url, {'size': 3, 'seed': 10, 'cache': 'off'}).data, response.data)
+
+        # seeded sample doesn't depend on schools count estimate changed by analyze
+        with patch('proco.schools.sampling.get_schools_count_estimate', return_value=10 ** 6):
+            self.assertEqual(self.client.get(url, {'size': 3, 'seed': 10, 'cache': 'off'}).data, response.data)
+
+    def test_random_schools_invalid_params(self):
+        url = reverse('schools:random-schools')
+        self.assertEqual(self.client.get(url, {'size': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'size': -1}).status_code, status.HTTP_400_BAD_REQUEST)
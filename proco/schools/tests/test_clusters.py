@@ -0,0 +1,70 @@
+from django.contrib.gis.geos import GEOSGeometry
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+
+from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.connection_statistics.tests.factories import SchoolWeeklyStatusFactory
+from proco.locations.tests.factories import CountryFactory
+from proco.schools.clusters import CLUSTERS_MAX_ZOOM, build_schools_clusters
+from proco.schools.models import SchoolsCluster
+from proco.schools.tests.factories import SchoolFactory
+
+
+class SchoolsClustersTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.country.last_weekly_status.connectivity_availability = \
+            CountryWeeklyStatus.CONNECTIVITY_TYPES_AVAILABILITY.connectivity
+        cls.country.last_weekly_status.save()
+
+        cls.school_one = SchoolFactory(country=cls.country, location__country=cls.country)
+        cls.school_one.last_weekly_status = SchoolWeeklyStatusFactory(school=cls.school_one, connectivity=True)
+        cls.school_one.save()
+        cls.school_two = SchoolFactory(
+            country=cls.country, location__country=cls.country, geopoint=GEOSGeometry('Point(5 5)'),
+        )
+
+    def setUp(self):
+        build_schools_clusters(self.country)
+        super().setUp()
+
+    def test_build(self):
+        self.assertEqual(SchoolsCluster.objects.filter(zoom=0).count(), 1)
+        cluster = SchoolsCluster.objects.get(zoom=0)
+        self.assertEqual(cluster.schools_count, 2)
+        self.assertEqual(cluster.connectivity_good, 1)
+        self.assertEqual(cluster.connectivity_unknown, 1)
+        self.assertAlmostEqual(cluster.geopoint.x, 3, places=3)
+
+        self.assertEqual(SchoolsCluster.objects.filter(zoom=CLUSTERS_MAX_ZOOM).count(), 2)
+
+    def test_rebuild(self):
+        SchoolFactory(country=self.country, location__country=self.country)
+        build_schools_clusters(self.country)
+        self.assertEqual(SchoolsCluster.objects.get(zoom=0).schools_count, 3)
+
+    def test_list(self):
+        url = reverse('schools:schools-clusters')
+
+        response = self.client.get(url, {'zoom': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['schools_count'], 2)
+
+        response = self.client.get(url, {'zoom': CLUSTERS_MAX_ZOOM + 5})
+        self.assertEqual(len(response.data), 2)
+
+        response = self.client.get(url, {'zoom': CLUSTERS_MAX_ZOOM, 'in_bbox': '0,0,2,2'})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['connectivity_good'], 1)
+
+        response = self.client.get(url, {'zoom': 0, 'country': CountryFactory().id})
+        self.assertEqual(len(response.data), 0)
+
+    def test_list_invalid_params(self):
+        url = reverse('schools:schools-clusters')
+        self.assertEqual(self.client.get(url, {'zoom': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'in_bbox': '0,0,2'}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+
+from proco.connection_statistics.models import SchoolWeeklyStatus
+from proco.connection_statistics.tests.factories import SchoolWeeklyStatusFactory
+from proco.locations.tests.factories import CountryFactory
+from proco.schools.loaders.ingest import save_data
+from proco.schools.models import School
+from proco.schools.tests.factories import SchoolFactory
+
+
+class SaveDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.school = SchoolFactory(country=cls.country, location__country=cls.country, external_id='1', name='Old')
+        cls.school.last_weekly_status = SchoolWeeklyStatusFactory(
+            school=cls.school, year=2000, num_students=10, connectivity_speed=None,
+        )
+        cls.school.save()
+
+    def save_data(self):
+        warnings, errors, processed = save_data(self.country, [
+            {'school_id': '1', 'lat': '1', 'lon': '2', 'speed_connectivity': '10'},
+            {'school_id': '2', 'lat': '3', 'lon': '4', 'name': 'New School', 'num_students': '20'},
+        ])
+        self.assertEqual((warnings, errors, processed), ([], [], 2))
+
+        self.school.refresh_from_db()
+        self.assertEqual(self.school.name, 'Old')
+        self.assertEqual((self.school.geopoint.x, self.school.geopoint.y), (2, 1))
+        self.assertEqual(self.school.last_weekly_status.connectivity_speed, 10 * (10 ** 6))
+        # not provided values are copied from previous status
+        self.assertEqual(self.school.last_weekly_status.num_students, 10)
+        self.assertEqual(SchoolWeeklyStatus.objects.filter(school=self.school).count(), 2)
+
+        new_school = School.objects.get(country=self.country, external_id='2')
+        self.assertEqual(new_school.name_lower, 'new school')
+        self.assertEqual(new_school.last_weekly_status.num_students, 20)
+        self.assertIsNone(new_school.last_weekly_status.connectivity_speed)
+
+    def test_save_data(self):
+        self.save_data()
+
+    @override_settings(SCHOOLS_IMPORT_COPY_MIN_ROWS=0)
+    def test_save_data_by_copy(self):
+        self.save_data()
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+
+from proco.locations.tests.factories import CountryFactory
+from proco.schools.tests.factories import SchoolFactory
+from proco.utils.tiles import get_tile_bounds, is_valid_tile
+
+
+class SchoolsTilesUtilsTestCase(TestCase):
+    def test_tile_bounds(self):
+        self.assertEqual(get_tile_bounds(0, 0, 0), (-20037508.342789244, -20037508.342789244,
+                                                    20037508.342789244, 20037508.342789244))
+        self.assertEqual(get_tile_bounds(1, 1, 0), (0, 0, 20037508.342789244, 20037508.342789244))
+
+    def test_valid_tile(self):
+        self.assertTrue(is_valid_tile(4, 15, 15))
+        self.assertFalse(is_valid_tile(4, 16, 0))
+        self.assertFalse(is_valid_tile(30, 0, 0))
+
+
+class SchoolsTilesApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        # point(1 1) is within 4/8/7 tile
+        cls.school = SchoolFactory(country=cls.country, location__country=cls.country)
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def get_tile(self, z, x, y, **kwargs):
+        return self.client.get(reverse('schools:schools-tiles', kwargs={'z': z, 'x': x, 'y': y}), **kwargs)
+
+    def test_tile(self):
+        response = self.get_tile(4, 8, 7)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertTrue(response.content)
+
+        # country ids are read, tile itself is taken from cache
+        with self.assertNumQueries(1):
+            cached_response = self.get_tile(4, 8, 7)
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_empty_tile(self):
+        response = self.get_tile(4, 0, 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
+
+    def test_invalid_tile(self):
+        self.assertEqual(self.get_tile(4, 16, 0).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tile_not_modified(self):
+        etag = self.get_tile(4, 8, 7)['ETag']
+        self.assertEqual(self.get_tile(4, 8, 7, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.country.invalidate_country_related_cache()
+        response = self.get_tile(4, 8, 7, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_country_update(self):
+        etag = self.get_tile(4, 8, 7)['ETag']
+        CountryFactory().invalidate_country_related_cache()
+        self.assertEqual(self.get_tile(4, 8, 7)['ETag'], etag)
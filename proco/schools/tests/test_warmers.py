@@ -0,0 +1,65 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from proco.connection_statistics.tests.factories import CountryWeeklyStatusFactory
+from proco.locations.tests.factories import CountryFactory
+from proco.schools.tests.factories import SchoolFactory
+from proco.utils.tasks import update_country_cached_values
+from proco.utils.tests import TestAPIViewSetMixin
+from proco.utils.warmers import cache_warmers
+
+
+@override_settings(SITE_URL='https://api.example.com')
+class CacheWarmersTestCase(TestAPIViewSetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory(flag='images/flag.png', map_preview='images/preview.png')
+        CountryWeeklyStatusFactory(country=cls.country)
+        SchoolFactory(country=cls.country, location__country=cls.country)
+        SchoolFactory(country=cls.country, location__country=cls.country)
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_payload_same_as_view(self):
+        urls = [
+            reverse('locations:countries-list'),
+            reverse('locations:countries-boundary'),
+            reverse('locations:countries-detail', kwargs={'pk': self.country.code.lower()}),
+            reverse('schools:schools-list', kwargs={'country_code': self.country.code.lower()}),
+        ]
+        for url in urls:
+            expected = self.forced_auth_req('get', url, data={'cache': 'off'}).content
+
+            cache.clear()
+            report = cache_warmers.get_for_url(url).warm()
+            self.assertGreater(report['payload_size'], 0)
+
+            self.assertEqual(self.forced_auth_req('get', url).content, expected)
+
+    def test_media_urls_absolute(self):
+        url = reverse('locations:countries-detail', kwargs={'pk': self.country.code.lower()})
+        cache_warmers.get_for_url(url).warm()
+
+        data = json.loads(self.forced_auth_req('get', url).content)
+        self.assertEqual(data['flag'], 'https://api.example.com/media/images/flag.png')
+        self.assertEqual(data['map_preview'], 'https://api.example.com/media/images/preview.png')
+
+    def test_unsupported_urls(self):
+        self.assertIsNone(cache_warmers.get_for_url(reverse('locations:countries-list') + '?search=x'))
+        self.assertIsNone(cache_warmers.get_for_url(
+            reverse('schools:schools-list', kwargs={'country_code': 'unknown'}),
+        ))
+
+    def test_country_cached_values(self):
+        with self.assertNumQueries(2):
+            reports = update_country_cached_values(self.country.id)
+
+        self.assertCountEqual([report['cache_key'] for report in reports], [
+            f'COUNTRY_INFO_pk_{self.country.code.lower()}',
+            f'SCHOOLS_{self.country.code.lower()}_',
+        ])
@@ -0,0 +1,131 @@
+import hashlib
+from copy import copy
+
+from django.contrib.gis.db.models import Extent
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, CharField, Q, Value, When
+
+from proco.connection_statistics.aggregations import (
+    CONNECTIVITY_FILTERS_BY_AVAILABILITY,
+    COVERAGE_FILTERS_BY_AVAILABILITY,
+    UNKNOWN_FILTERS,
+)
+from proco.locations.models import Country
+from proco.schools.models import School
+from proco.utils.cache import country_data_versions
+from proco.utils.tiles import TILE_BUFFER, TILE_EXTENT, bbox_intersects, get_tile_bounds, get_tile_polygon
+
+TILE_LAYER = 'schools'
+
+TILES_CACHE_PREFIX = 'SCHOOLS_TILE'
+TILES_EXTENTS_CACHE_KEY = 'SCHOOLS_TILES_EXTENTS'
+TILES_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def _prefix_q(q: Q, prefix: str) -> Q:
+    prefixed = copy(q)
+    prefixed.children = [
+        _prefix_q(child, prefix) if isinstance(child, Q) else (prefix + child[0], child[1])
+        for child in q.children
+    ]
+    return prefixed
+
+
+def get_status_expression(availability_field: str, filters_by_availability: dict) -> Case:
+    # same statuses as ListSchoolSerializer returns, calculated by database
+    whens = []
+    for availability, filters in filters_by_availability.items():
+        if filters is UNKNOWN_FILTERS:
+            continue
+        for status, status_filter in filters.items():
+            whens.append(When(
+                Q(**{f'country__last_weekly_status__{availability_field}': availability})
+                & Q(last_weekly_status__isnull=False)
+                & _prefix_q(status_filter, 'last_weekly_status__'),
+                then=Value(status),
+            ))
+    return Case(*whens, default=Value(None), output_field=CharField())
+
+
+def get_tile_countries(polygon: Polygon) -> dict:
+    # data versions of countries having schools within tile; extents are recalculated only for updated countries
+    countries_ids = list(Country.objects.order_by().values_list('id', flat=True))
+    versions = country_data_versions.get_many(countries_ids)
+
+    extents = cache.get(TILES_EXTENTS_CACHE_KEY) or {}
+    outdated = [
+        country_id for country_id in countries_ids
+        if country_id not in extents or extents[country_id][0] != versions[country_id]
+    ]
+    if outdated:
+        outdated_extents = dict.fromkeys(outdated)
+        outdated_extents.update(
+            School.objects.filter(country_id__in=outdated, geopoint__isnull=False).order_by().values(
+                'country_id',
+            ).annotate(extent=Extent('geopoint')).values_list('country_id', 'extent'),
+        )
+        for country_id, extent in outdated_extents.items():
+            extents[country_id] = (versions[country_id], extent)
+        cache.set(TILES_EXTENTS_CACHE_KEY, extents, None)
+
+    return {
+        country_id: versions[country_id]
+        for country_id in countries_ids
+        if extents[country_id][1] and bbox_intersects(polygon.extent, extents[country_id][1])
+    }
+
+
+def get_tile_cache_key(z: int, x: int, y: int, countries_versions: dict) -> str:
+    versions = ','.join(f'{country_id}:{version}' for country_id, version in sorted(countries_versions.items()))
+    return '{0}_{1}_{2}_{3}_{4}'.format(
+        TILES_CACHE_PREFIX, z, x, y, hashlib.blake2b(versions.encode(), digest_size=16).hexdigest(),
+    )
+
+
+def render_schools_tile(z: int, x: int, y: int, polygon: Polygon) -> bytes:
+    schools = School.objects.filter(geopoint__intersects=polygon).annotate(
+        connectivity_status=get_status_expression('connectivity_availability', CONNECTIVITY_FILTERS_BY_AVAILABILITY),
+        coverage_status=get_status_expression('coverage_availability', COVERAGE_FILTERS_BY_AVAILABILITY),
+    ).order_by().values('id', 'name', 'country_id', 'geopoint', 'connectivity_status', 'coverage_status')
+    schools_sql, schools_params = schools.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT ST_AsMVT(tile, %s, %s, 'geom') FROM (
+                SELECT id, name, country_id, connectivity_status, coverage_status,
+                    ST_AsMVTGeom(
+                        ST_Transform(schools.geopoint, 3857), ST_MakeEnvelope(%s, %s, %s, %s, 3857), %s, %s, true
+                    ) AS geom
+                FROM ({schools_sql}) schools
+            ) tile
+            WHERE geom IS NOT NULL
+            """,  # noqa: S608
+            [TILE_LAYER, TILE_EXTENT, *get_tile_bounds(z, x, y), TILE_EXTENT, TILE_BUFFER, *schools_params],
+        )
+        row = cursor.fetchone()
+
+    return bytes(row[0]) if row and row[0] else b''
+
+
+class SchoolsTile(object):
+    """
+    Schools vector tile; content is cached until data of some country within the tile is changed.
+    """
+    def __init__(self, z: int, x: int, y: int):
+        self.z, self.x, self.y = z, x, y
+        self.polygon = get_tile_polygon(z, x, y)
+        self.countries_versions = get_tile_countries(self.polygon)
+        self.cache_key = get_tile_cache_key(z, x, y, self.countries_versions)
+
+    def get_content(self) -> bytes:
+        if not self.countries_versions:
+            return b''
+
+        content = cache.get(self.cache_key)
+        if content is None:
+            content = render_schools_tile(self.z, self.x, self.y, self.polygon)
+            cache.set(self.cache_key, content, TILES_CACHE_TIMEOUT)
+        return content
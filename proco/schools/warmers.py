@@ -0,0 +1,26 @@
+from django.conf import settings
+
+from proco.locations.warmers import CountryCacheWarmer
+from proco.schools.models import School
+from proco.schools.sampling import sample_schools
+from proco.schools.serializers import ListSchoolSerializer, SchoolPointSerializer
+from proco.utils.warmers import CacheWarmer, cache_warmers
+
+
+@cache_warmers.register
+class SchoolsListCacheWarmer(CountryCacheWarmer):
+    url_name = 'schools:schools-list'
+    cache_key = 'SCHOOLS_{country_code}_'
+
+    def build(self):
+        schools = School.objects.filter(country=self.country).select_related('last_weekly_status')
+        return ListSchoolSerializer(schools, many=True, country=self.country).data
+
+
+@cache_warmers.register
+class RandomSchoolsCacheWarmer(CacheWarmer):
+    url_name = 'schools:random-schools'
+    cache_key = 'RANDOM_SCHOOLS_'
+
+    def build(self):
+        return SchoolPointSerializer(sample_schools(settings.RANDOM_SCHOOLS_DEFAULT_AMOUNT), many=True).data
@@ -42,10 +42,25 @@ def finalize_setup(sender, **kwargs):
             'schedule': crontab(hour=3, minute=0),
             'args': (),
         },
+        'proco.connection_statistics.tasks.reconcile_countries_statistics': {
+            'task': 'proco.connection_statistics.tasks.reconcile_countries_statistics',
+            'schedule': crontab(hour=2, minute=0),
+            'args': (),
+        },
+        'proco.connection_statistics.tasks.create_future_partitions': {
+            'task': 'proco.connection_statistics.tasks.create_future_partitions',
+            'schedule': crontab(hour=4, minute=30),
+            'args': (),
+        },
         'proco.connection_statistics.tasks.clean_old_realtime_data': {
             'task': 'proco.connection_statistics.tasks.clean_old_realtime_data',
             'schedule': crontab(hour=5, minute=0),
             'args': (),
         },
+        'proco.connection_statistics.tasks.create_data_export_snapshots': {
+            'task': 'proco.connection_statistics.tasks.create_data_export_snapshots',
+            'schedule': crontab(hour=5, minute=30),
+            'args': (),
+        },
         'drf_secure_token.tasks.delete_old_tokens': DELETE_OLD_TOKENS,
     })
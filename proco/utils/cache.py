@@ -1,49 +1,374 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, namedtuple
+
 from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
+from django.utils.http import quote_etag
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
 
 from proco.utils.tasks import update_cached_value
 
+logger = logging.getLogger('django.' + __name__)
+
+
+class CacheVersions(object):
+    """
+    Counters of data scopes cached values depend on. Invalidation of scope is a single increment,
+    values cached with older scope version are considered as outdated.
+    """
+    CACHE_PREFIX = 'CACHE_VERSION'
+    # processes keeping cached values in memory are notified about every bump
+    BROADCAST_CHANNEL = 'CACHE_VERSION_BUMPS'
+
+    # every cached value depends on global scope
+    GLOBAL = 'GLOBAL'
+    # data aggregated over all countries
+    COUNTRIES = 'COUNTRIES'
+    # countries and locations boundaries
+    BOUNDARY = 'BOUNDARY'
+
+    @staticmethod
+    def country(country_id):
+        return 'COUNTRY_{0}'.format(country_id)
+
+    def _key(self, scope):
+        return '{0}_{1}'.format(self.CACHE_PREFIX, scope)
+
+    def get_many(self, scopes):
+        versions = cache.get_many([self._key(scope) for scope in scopes])
+        return {scope: versions.get(self._key(scope), 0) for scope in scopes}
+
+    def bump(self, scope):
+        key = self._key(scope)
+        # add does nothing when key already exists, so concurrent bumps are not lost
+        cache.add(key, 0, None)
+        version = cache.incr(key)
+        if settings.SOFT_CACHE_LOCAL_ENABLED:
+            get_redis_connection('default').publish(self.get_broadcast_channel(), scope)
+        return version
+
+    def get_broadcast_channel(self):
+        return cache.make_key(self.BROADCAST_CHANNEL)
+
+
+cache_versions = CacheVersions()
+
+# json content of cached value with its hash and time it was changed last time
+CachedValue = namedtuple('CachedValue', ('content', 'etag', 'updated_at'))
+
+
+class LocalCache(object):
+    """
+    Bounded LRU of fresh soft cached values kept in process memory in front of redis.
+    Entries live for SOFT_CACHE_LOCAL_TTL seconds at most; any scope version bump clears all of them,
+    bumps are received by background thread subscribed to redis channel.
+    """
+    RECONNECT_INTERVAL = 1
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        # incremented by every clear, so values read from redis before it are not saved after it
+        self.generation = 0
+
+    def get_max_item_size(self, key):
+        # only keys matching configured prefixes are kept locally, each one has its own size limit
+        for prefix, max_item_size in settings.SOFT_CACHE_LOCAL_KEYS.items():
+            if key.startswith(prefix):
+                return max_item_size
+        return 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation):
+        size = len(value.content)
+        if size > self.get_max_item_size(key) or size > settings.SOFT_CACHE_LOCAL_MAX_SIZE:
+            return
+
+        self._ensure_listener()
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._pop(key)
+            self._entries[key] = (value, time.monotonic() + settings.SOFT_CACHE_LOCAL_TTL)
+            self._size += size
+            while self._size > settings.SOFT_CACHE_LOCAL_MAX_SIZE:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0].content)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.generation += 1
+
+    def _ensure_listener(self):
+        # threads are not copied to forked worker processes, so listener is started by every process
+        if self._listener_pid == os.getpid():
+            return
+
+        self._listener_pid = os.getpid()
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        threading.Thread(target=self._listen, name='soft-cache-invalidation', daemon=True).start()
+
+    def _listen(self):
+        channel = cache_versions.get_broadcast_channel()
+        reconnected = False
+        while True:
+            try:
+                pubsub = get_redis_connection('default').pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                if reconnected:
+                    # bumps could be missed while listener was disconnected
+                    self.clear()
+                for _message in pubsub.listen():
+                    self.clear()
+            except RedisError:
+                logger.exception('soft cache invalidation listener disconnected')
+                reconnected = True
+                time.sleep(self.RECONNECT_INTERVAL)
+
+
+local_cache = LocalCache()
+
 
 class SoftCacheManager(object):
+    """
+    Api responses rendered to json and compressed. Payload is stored separately from metadata,
+    so it's decompressed only when returned and never parsed back to python objects.
+    """
     CACHE_PREFIX = 'SOFT_CACHE'
+    PAYLOAD_PREFIX = 'SOFT_CACHE_PAYLOAD'
+    # only one background refresh is queued for outdated value until it's done
+    REFRESH_LEASE_PREFIX = 'SOFT_CACHE_REFRESH'
+    # only one request calculates missing value, others may wait for it
+    COMPUTE_LEASE_PREFIX = 'SOFT_CACHE_COMPUTE'
+    METRICS_PREFIX = 'SOFT_CACHE_METRICS'
 
-    def get(self, key):
-        value = cache.get('{0}_{1}'.format(self.CACHE_PREFIX, key), None)
+    HIT = 'hit'
+    MISS = 'miss'
+    STALE = 'stale'
+    COALESCED = 'coalesced'
+    METRICS = (HIT, MISS, STALE, COALESCED)
+
+    COMPRESSION_LEVEL = 6
+    LEADER_POLL_INTERVAL = 0.1
+    # metrics are flushed when this amount of events is buffered or interval in seconds is passed
+    METRICS_FLUSH_SIZE = 100
+    METRICS_FLUSH_INTERVAL = 10
 
-        if value:
+    def __init__(self):
+        self._metrics = Counter()
+        self._metrics_lock = threading.Lock()
+        self._metrics_flushed_at = time.monotonic()
+
+    def _key(self, key):
+        return '{0}_{1}'.format(self.CACHE_PREFIX, key)
+
+    def _payload_key(self, key):
+        return '{0}_{1}'.format(self.PAYLOAD_PREFIX, key)
+
+    def _get_entry(self, key):
+        # metadata and compressed payload are read by single request
+        values = cache.get_many([self._key(key), self._payload_key(key)])
+        meta, payload = values.get(self._key(key)), values.get(self._payload_key(key))
+        if not meta or payload is None:
+            return None, None
+        return meta, payload
+
+    def _get_value(self, meta, payload):
+        return CachedValue(
+            zlib.decompress(payload) if payload is not None else None, meta.get('etag'), meta.get('updated_at'),
+        )
+
+    def _metric_key(self, metric):
+        return '{0}_{1}'.format(self.METRICS_PREFIX, metric)
+
+    def _count(self, metric):
+        # events are buffered in process memory and flushed in batches, so reads make no extra redis round trips
+        with self._metrics_lock:
+            self._metrics[metric] += 1
             if (
-                (value['expired_at'] and value['expired_at'] < timezone.now().timestamp())
-                or value.get('invalidated', True)
-            ) and value.get('request_path', None):
-                update_cached_value.delay(url=value['request_path'])
-            return value['value']
-
-    def _invalidate(self, key):
-        value = cache.get(key, None)
-        if value:
-            value['invalidated'] = True
-            cache.set(key, value, None)
-
-    def invalidate_many(self, keys):
-        for key in keys:
-            self.invalidate(key)
-
-    def invalidate(self, key='*'):
-        if isinstance(key, str):
-            keys = cache.keys('{0}_{1}'.format(self.CACHE_PREFIX, key))
-            for key in keys:
-                self._invalidate(key)
-        elif isinstance(key, (list, tuple)):
-            self.invalidate_many(key)
-
-    def set(self, key, value, request_path=None, soft_timeout=settings.CACHES['default']['TIMEOUT']):
-        cache.set('{0}_{1}'.format(self.CACHE_PREFIX, key), {
-            'value': value,
-            'invalidated': False,
+                sum(self._metrics.values()) < self.METRICS_FLUSH_SIZE
+                and time.monotonic() - self._metrics_flushed_at < self.METRICS_FLUSH_INTERVAL
+            ):
+                return
+        self.flush_metrics()
+
+    def flush_metrics(self):
+        with self._metrics_lock:
+            metrics, self._metrics = self._metrics, Counter()
+            self._metrics_flushed_at = time.monotonic()
+        if not metrics:
+            return
+
+        # all counters are incremented by single pipeline, missing counters are created by incrby
+        try:
+            pipeline = get_redis_connection('default').pipeline(transaction=False)
+            for metric, delta in metrics.items():
+                pipeline.incrby(cache.make_key(self._metric_key(metric)), delta)
+            pipeline.execute()
+        except RedisError:
+            logger.exception('soft cache metrics were not flushed')
+
+    def get_metrics(self):
+        self.flush_metrics()
+        keys = {metric: self._metric_key(metric) for metric in self.METRICS}
+        values = cache.get_many(keys.values())
+        return {metric: values.get(key, 0) for metric, key in keys.items()}
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._metrics.clear()
+        cache.delete_many([self._metric_key(metric) for metric in self.METRICS])
+
+    def get_versions(self, scopes=()):
+        return cache_versions.get_many((CacheVersions.GLOBAL, *scopes))
+
+    def get(self, key, load_content=True) -> CachedValue:
+        """
+        Returns cached value rendered to json. Outdated value is returned as well
+        while actual one is calculated in background.
+        Without load_content only metadata is read, content can be loaded later by get_content.
+        """
+        if settings.SOFT_CACHE_LOCAL_ENABLED:
+            value = local_cache.get(key)
+            if value is not None:
+                self._count(self.HIT)
+                return value
+        local_generation = local_cache.generation
+
+        if load_content:
+            meta, payload = self._get_entry(key)
+        else:
+            meta, payload = cache.get(self._key(key)), None
+
+        if not meta:
+            self._count(self.MISS)
+            return None
+
+        value = self._get_value(meta, payload)
+        versions = meta.get('versions', {})
+        if (
+            (meta['expired_at'] and meta['expired_at'] < timezone.now().timestamp())
+            or cache_versions.get_many(versions.keys()) != versions
+        ) and meta.get('request_path', None):
+            self._count(self.STALE)
+            lease_key = '{0}_{1}'.format(self.REFRESH_LEASE_PREFIX, key)
+            if cache.add(lease_key, 1, settings.SOFT_CACHE_REFRESH_LEASE_TIMEOUT):
+                update_cached_value.delay(url=meta['request_path'])
+            else:
+                self._count(self.COALESCED)
+        else:
+            self._count(self.HIT)
+            if settings.SOFT_CACHE_LOCAL_ENABLED and value.content is not None:
+                local_cache.set(key, value, local_generation)
+        return value
+
+    def get_content(self, key) -> bytes:
+        payload = cache.get(self._payload_key(key))
+        return zlib.decompress(payload) if payload is not None else None
+
+    def wait_for_leader(self, key) -> CachedValue:
+        """
+        Called on cold miss. When another request is already calculating the value, wait for it
+        for up to SOFT_CACHE_LEADER_WAIT seconds and return the result.
+        None means caller should calculate value itself, compute lease is released when value is set.
+        If leader fails, lease expires after SOFT_CACHE_COMPUTE_LEASE_TIMEOUT.
+        """
+        if not settings.SOFT_CACHE_LEADER_WAIT:
+            return None
+
+        lease_key = '{0}_{1}'.format(self.COMPUTE_LEASE_PREFIX, key)
+        if cache.add(lease_key, 1, settings.SOFT_CACHE_COMPUTE_LEASE_TIMEOUT):
+            return None
+
+        deadline = time.monotonic() + settings.SOFT_CACHE_LEADER_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(self.LEADER_POLL_INTERVAL)
+            meta, payload = self._get_entry(key)
+            if meta:
+                self._count(self.COALESCED)
+                return self._get_value(meta, payload)
+        return None
+
+    def invalidate(self, scope=CacheVersions.GLOBAL):
+        cache_versions.bump(scope)
+
+    def set(
+        self, key, value, request_path=None, scopes=(), versions=None,
+        soft_timeout=settings.CACHES['default']['TIMEOUT'],
+    ) -> CachedValue:
+        from rest_framework.renderers import JSONRenderer
+
+        # versions should be taken before value calculation, so changes made during it are not lost
+        if versions is None:
+            versions = self.get_versions(scopes)
+
+        content = JSONRenderer().render(value)
+        etag = quote_etag(hashlib.blake2b(content, digest_size=16).hexdigest())
+        # modification time is kept while content is the same, so clients can revalidate it by date as well
+        previous_meta = cache.get(self._key(key))
+        if previous_meta and previous_meta.get('etag') == etag:
+            updated_at = previous_meta['updated_at']
+        else:
+            updated_at = int(timezone.now().timestamp())
+
+        # payload is written first, so metadata never points to missing one
+        cache.set(self._payload_key(key), zlib.compress(content, self.COMPRESSION_LEVEL), settings.SOFT_CACHE_TTL)
+        cache.set(self._key(key), {
+            'versions': versions,
             'request_path': request_path,
             'expired_at': (timezone.now().timestamp() + soft_timeout) if soft_timeout else None,
-        }, None)
+            'etag': etag,
+            'updated_at': updated_at,
+        }, settings.SOFT_CACHE_TTL)
+        # value is ready, next outdated read may queue refresh again
+        cache.delete_many([
+            '{0}_{1}'.format(self.REFRESH_LEASE_PREFIX, key),
+            '{0}_{1}'.format(self.COMPUTE_LEASE_PREFIX, key),
+        ])
+        return CachedValue(content, etag, updated_at)
 
 
 cache_manager = SoftCacheManager()
+
+
+class CountryDataVersions(object):
+    # versions of country scopes, so derived cached values can be keyed by them
+
+    def get_many(self, country_ids):
+        versions = cache_versions.get_many([CacheVersions.country(country_id) for country_id in country_ids])
+        return {country_id: versions[CacheVersions.country(country_id)] for country_id in country_ids}
+
+    def bump(self, country_id):
+        return cache_versions.bump(CacheVersions.country(country_id))
+
+
+country_data_versions = CountryDataVersions()
@@ -1,7 +1,12 @@
-from rest_framework.response import Response
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
 from rest_framework.utils.urls import remove_query_param
 
 from proco.utils.cache import cache_manager
+from proco.utils.responses import CachedJSONResponse
+from proco.utils.tiles import is_valid_tile
 
 
 class UseCachedDataMixin(object):
@@ -10,9 +15,40 @@ class UseCachedDataMixin(object):
     def use_cached_data(self):
         return self.request.query_params.get(self.CACHE_KEY, 'on').lower() in ['on', 'true']
 
+    def get_cached_response(self, request, cache_key):
+        """
+        Conditional requests are answered by cached value metadata, payload is loaded only if it was changed.
+        None is returned when value is not cached yet.
+        """
+        is_conditional = 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+        value = cache_manager.get(cache_key, load_content=not is_conditional)
+        if value is None:
+            value = cache_manager.wait_for_leader(cache_key)
+        if value is None:
+            return None
+
+        response = get_conditional_response(request, etag=value.etag, last_modified=value.updated_at)
+        if response is None:
+            content = value.content if value.content is not None else cache_manager.get_content(cache_key)
+            if content is None:
+                return None
+            response = CachedJSONResponse(content)
+        return self.set_cached_value_headers(response, value)
+
+    def set_cached_value_headers(self, response, value):
+        if value.etag:
+            response['ETag'] = value.etag
+        if value.updated_at:
+            response['Last-Modified'] = http_date(value.updated_at)
+        return response
+
 
 class CachedListMixin(UseCachedDataMixin):
     LIST_CACHE_KEY_PREFIX = None
+    LIST_CACHE_SCOPES = ()
+
+    def get_list_cache_scopes(self):
+        return self.LIST_CACHE_SCOPES
 
     def get_list_cache_key(self):
         params = dict(self.request.query_params)
@@ -24,24 +60,26 @@ class CachedListMixin(UseCachedDataMixin):
 
     def _get_raw_list_response(self, request, *args, **kwargs):
         cache_key = self.get_list_cache_key()
+        versions = cache_manager.get_versions(self.get_list_cache_scopes())
         response = super(CachedListMixin, self).list(request, *args, **kwargs)
         request_path = remove_query_param(request.get_full_path(), self.CACHE_KEY)
-        cache_manager.set(cache_key, response.data, request_path=request_path)
-        return response
+        value = cache_manager.set(cache_key, response.data, request_path=request_path, versions=versions)
+        return self.set_cached_value_headers(response, value)
 
     def list(self, request, *args, **kwargs):
-        if not self.use_cached_data():
-            return self._get_raw_list_response(request, *args, **kwargs)
-        else:
-            cache_key = self.get_list_cache_key()
-            data = cache_manager.get(cache_key)
-            if not data:
-                return self._get_raw_list_response(request, *args, **kwargs)
-            return Response(data=data)
+        if self.use_cached_data():
+            response = self.get_cached_response(request, self.get_list_cache_key())
+            if response is not None:
+                return response
+        return self._get_raw_list_response(request, *args, **kwargs)
 
 
 class CachedRetrieveMixin(UseCachedDataMixin):
     RETRIEVE_CACHE_KEY_PREFIX = None
+    RETRIEVE_CACHE_SCOPES = ()
+
+    def get_retrieve_cache_scopes(self):
+        return self.RETRIEVE_CACHE_SCOPES
 
     def get_retrieve_cache_key(self):
         return '{0}_{1}'.format(
@@ -51,17 +89,33 @@ class CachedRetrieveMixin(UseCachedDataMixin):
 
     def _get_raw_retrieve_response(self, request, *args, **kwargs):
         cache_key = self.get_retrieve_cache_key()
+        versions = cache_manager.get_versions(self.get_retrieve_cache_scopes())
         response = super(CachedRetrieveMixin, self).retrieve(request, *args, **kwargs)
         request_path = remove_query_param(request.get_full_path(), self.CACHE_KEY)
-        cache_manager.set(cache_key, response.data, request_path=request_path)
-        return response
+        value = cache_manager.set(cache_key, response.data, request_path=request_path, versions=versions)
+        return self.set_cached_value_headers(response, value)
 
     def retrieve(self, request, *args, **kwargs):
-        if not self.use_cached_data():
-            return self._get_raw_retrieve_response(request, *args, **kwargs)
-        else:
-            cache_key = self.get_retrieve_cache_key()
-            data = cache_manager.get(cache_key)
-            if not data:
-                return self._get_raw_retrieve_response(request, *args, **kwargs)
-            return Response(data=data)
+        if self.use_cached_data():
+            response = self.get_cached_response(request, self.get_retrieve_cache_key())
+            if response is not None:
+                return response
+        return self._get_raw_retrieve_response(request, *args, **kwargs)
+
+
+class VectorTileMixin(object):
+    # tile class should provide cache_key identifying tile data and get_content method
+    tile_class = None
+    content_type = 'application/vnd.mapbox-vector-tile'
+
+    def get(self, request, z, x, y, *args, **kwargs):
+        if not is_valid_tile(z, x, y):
+            raise Http404
+
+        tile = self.tile_class(z, x, y)
+        etag = quote_etag(tile.cache_key)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(tile.get_content(), content_type=self.content_type)
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,33 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class CachedJSONResponse(Response):
+    """
+    Response with data already rendered to json, so json requests are served without rendering.
+    Data is parsed back from json only if it's accessed or other renderer is used.
+    """
+    def __init__(self, content: bytes, **kwargs):
+        self.content_json = content
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.content_json)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        if type(renderer) is not JSONRenderer:
+            return super().rendered_content
+
+        self['Content-Type'] = self.content_type or renderer.media_type
+        return self.content_json
@@ -2,37 +2,60 @@ from django.urls import reverse
 
 from rest_framework.test import APIClient
 
-from celery import chain
-
 from proco.taskapp import app
 
 
 @app.task(soft_time_limit=10 * 60, time_limit=11 * 60)
 def update_cached_value(*args, url='', **kwargs):
+    from proco.utils.warmers import cache_warmers
+
+    warmer = cache_warmers.get_for_url(url)
+    if warmer:
+        return warmer.warm()
+
+    # views without registered warmer are refreshed by replaying request
     client = APIClient()
     client.get(url, {'cache': False}, format='json')
 
 
+@app.task(soft_time_limit=10 * 60, time_limit=11 * 60)
+def update_country_cached_values(country_id):
+    # all cached values of country are built from single country instance
+    from proco.locations.warmers import CountryCacheWarmer
+    from proco.utils.warmers import cache_warmers
+
+    country = CountryCacheWarmer.get_country_queryset().filter(id=country_id).first()
+    if not country:
+        return []
+
+    return [warmer_class(country).warm() for warmer_class in cache_warmers.get_country_warmers()]
+
+
+@app.task(soft_time_limit=5 * 60, time_limit=5 * 60)
+def update_global_cached_values():
+    from proco.utils.warmers import cache_warmers
+
+    return [warmer_class().warm() for warmer_class in cache_warmers.get_global_warmers()]
+
+
 @app.task(soft_time_limit=5 * 60, time_limit=5 * 60)
 def update_all_cached_values():
     from proco.locations.models import Country
 
-    update_cached_value.delay(url=reverse('connection_statistics:global-stat'))
-    update_cached_value.delay(url=reverse('locations:countries-boundary'))
-    update_cached_value.delay(url=reverse('locations:countries-list'))
-    update_cached_value.delay(url=reverse('schools:random-schools'))
+    update_global_cached_values.delay()
 
-    for country in Country.objects.all():
-        chain([
-            update_cached_value.s(url=reverse('locations:countries-detail', kwargs={'pk': country.code.lower()})),
-            update_cached_value.s(url=reverse('schools:schools-list', kwargs={'country_code': country.code.lower()})),
-        ]).delay()
+    for country_id in Country.objects.values_list('id', flat=True):
+        update_country_cached_values.delay(country_id)
 
 
 @app.task
 def update_country_related_cache(country_code):
+    from proco.locations.models import Country
+
     update_cached_value.delay(url=reverse('connection_statistics:global-stat'))
     update_cached_value.delay(url=reverse('locations:countries-list'))
     update_cached_value.delay(url=reverse('schools:random-schools'))
-    update_cached_value.delay(url=reverse('locations:countries-detail', kwargs={'pk': country_code.lower()}))
-    update_cached_value.delay(url=reverse('schools:schools-list', kwargs={'country_code': country_code.lower()}))
+
+    country = Country.objects.filter(code__iexact=country_code).first()
+    if country:
+        update_country_cached_values.delay(country.id)
@@ -0,0 +1,41 @@
+import math
+
+from django.contrib.gis.geos import Polygon
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_MAX_ZOOM = 22
+
+# half of web mercator world size in meters
+MERCATOR_ORIGIN = 20037508.342789244
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def get_tile_bounds(z: int, x: int, y: int) -> (float, float, float, float):
+    # web mercator (EPSG:3857) bounds of tile
+    size = 2 * MERCATOR_ORIGIN / 2 ** z
+    xmin = -MERCATOR_ORIGIN + x * size
+    ymax = MERCATOR_ORIGIN - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def mercator_to_lonlat(x: float, y: float) -> (float, float):
+    return x / MERCATOR_ORIGIN * 180, math.degrees(math.atan(math.sinh(y / MERCATOR_ORIGIN * math.pi)))
+
+
+def get_tile_polygon(z: int, x: int, y: int) -> Polygon:
+    # tile area in lon/lat extended by buffer, so points near the border are kept in both tiles
+    xmin, ymin, xmax, ymax = get_tile_bounds(z, x, y)
+    margin = (xmax - xmin) * TILE_BUFFER / TILE_EXTENT
+    lon_min, lat_min = mercator_to_lonlat(max(xmin - margin, -MERCATOR_ORIGIN), max(ymin - margin, -MERCATOR_ORIGIN))
+    lon_max, lat_max = mercator_to_lonlat(min(xmax + margin, MERCATOR_ORIGIN), min(ymax + margin, MERCATOR_ORIGIN))
+    polygon = Polygon.from_bbox((lon_min, lat_min, lon_max, lat_max))
+    polygon.srid = 4326
+    return polygon
+
+
+def bbox_intersects(first: tuple, second: tuple) -> bool:
+    return first[0] <= second[2] and second[0] <= first[2] and first[1] <= second[3] and second[1] <= first[3]
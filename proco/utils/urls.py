@@ -1,5 +1,7 @@
 from json import dumps
-from urllib.parse import ParseResult, parse_qsl, unquote, urlencode, urlparse
+from urllib.parse import ParseResult, parse_qsl, unquote, urlencode, urljoin, urlparse
+
+from django.conf import settings
 
 
 def add_url_params(url, params):
@@ -44,3 +46,11 @@ def add_url_params(url, params):
     ).geturl()
 
     return new_url
+
+
+def build_media_url(url):
+    """ Make url of uploaded file absolute by SITE_URL setting.
+
+    Urls of remote storages are absolute already, so they are returned as is.
+    """
+    return urljoin(settings.SITE_URL, url)
@@ -0,0 +1,106 @@
+import logging
+import time
+from urllib.parse import urlparse
+
+from django.urls import Resolver404, resolve, reverse
+
+from proco.utils.cache import cache_manager
+
+logger = logging.getLogger('django.' + __name__)
+
+
+class CacheWarmer(object):
+    """
+    Builds payload of soft cached view directly, without request handling,
+    and saves it under the same key view uses for request without query params.
+    """
+    url_name = None
+    cache_key = None
+    scopes = ()
+    # warmer is built from country instance, so all country warmers can be run with single country query
+    per_country = False
+
+    def __init__(self, **url_kwargs):
+        self.url_kwargs = url_kwargs
+
+    @classmethod
+    def from_url_kwargs(cls, **url_kwargs):
+        return cls(**url_kwargs)
+
+    def get_url_kwargs(self):
+        return self.url_kwargs
+
+    def get_cache_key(self):
+        # cache key format is filled with url kwargs
+        return self.cache_key.format(**self.get_url_kwargs())
+
+    def get_scopes(self):
+        return self.scopes
+
+    def is_available(self):
+        # payload that view would not return should not be cached
+        return True
+
+    def build(self):
+        raise NotImplementedError
+
+    def warm(self):
+        if not self.is_available():
+            return None
+
+        # versions should be taken before payload calculation, so changes made during it are not lost
+        versions = cache_manager.get_versions(self.get_scopes())
+
+        started_at = time.monotonic()
+        data = self.build()
+        build_time = time.monotonic() - started_at
+
+        cache_key = self.get_cache_key()
+        value = cache_manager.set(
+            cache_key, data, request_path=reverse(self.url_name, kwargs=self.get_url_kwargs()), versions=versions,
+        )
+
+        report = {
+            'cache_key': cache_key,
+            'build_time': round(build_time, 3),
+            'payload_size': len(value.content),
+        }
+        logger.info('cache warmed: %(cache_key)s in %(build_time)ss, %(payload_size)s bytes', report)
+        return report
+
+
+class CacheWarmersRegistry(object):
+    def __init__(self):
+        self._warmers = {}
+
+    def register(self, warmer_class):
+        self._warmers[warmer_class.url_name] = warmer_class
+        return warmer_class
+
+    def get(self, url_name):
+        return self._warmers.get(url_name)
+
+    def get_global_warmers(self):
+        return [warmer_class for warmer_class in self._warmers.values() if not warmer_class.per_country]
+
+    def get_country_warmers(self):
+        return [warmer_class for warmer_class in self._warmers.values() if warmer_class.per_country]
+
+    def get_for_url(self, url):
+        # warmers build only default payload, so urls with query params are not supported
+        parsed_url = urlparse(url)
+        if parsed_url.query:
+            return None
+
+        try:
+            match = resolve(parsed_url.path)
+        except Resolver404:
+            return None
+
+        warmer_class = self.get(match.view_name)
+        if not warmer_class:
+            return None
+        return warmer_class.from_url_kwargs(**match.kwargs)
+
+
+cache_warmers = CacheWarmersRegistry()